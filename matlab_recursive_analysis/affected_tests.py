@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+受影响测试选择
+按可配置的通配符识别测试脚本（test_*.m、*Test.m，以及类文件名匹配的 matlab.unittest @类目录），
+从变更脚本出发沿反向调用索引做一次多源遍历，只访问受影响的子图，返回能到达变更的最小测试集合
+"""
+
+import os
+import json
+import logging
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Sequence
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 测试脚本通配符：不含'/'时匹配文件名，含'/'时匹配相对工程目录的路径（如 'tests/*'）
+DEFAULT_TEST_PATTERNS = ('test_*.m', '*Test.m')
+
+
+def get_test_unit(script: str) -> str:
+    """
+    测试脚本所属的测试单元：@类目录中的方法文件归入类定义文件，其余为脚本本身
+
+    Args:
+        script: 相对工程目录的脚本名
+
+    Returns:
+        测试单元（脚本名）
+    """
+    parts = script.split(os.sep)
+    if len(parts) > 1 and parts[-2].startswith('@'):
+        return os.sep.join(parts[:-1] + [parts[-2][1:] + '.m'])
+    return script
+
+
+def is_test_script(script: str, test_patterns: Sequence[str] = DEFAULT_TEST_PATTERNS) -> bool:
+    """
+    判断脚本是否属于测试（@类目录按类定义文件名判断，目录中的方法文件随类一起归为测试）
+
+    Args:
+        script: 相对工程目录的脚本名
+        test_patterns: 测试通配符
+
+    Returns:
+        是测试脚本返回True
+    """
+    unit = get_test_unit(script)
+    name = os.path.basename(unit)
+    posix_path = unit.replace(os.sep, '/')
+    return any(fnmatchcase(posix_path if '/' in pattern else name, pattern) for pattern in test_patterns)
+
+
+def select_affected_tests(analyzer: RecursiveCallAnalyzer, changed_scripts: Iterable[str],
+                          test_patterns: Sequence[str] = DEFAULT_TEST_PATTERNS) -> Dict:
+    """
+    选择能经调用边到达任一变更脚本的测试
+
+    Args:
+        analyzer: 已解析的分析器
+        changed_scripts: 变更的脚本（不在工程中的忽略）
+        test_patterns: 测试通配符
+
+    Returns:
+        {'tests': 受影响的测试单元（排序）,
+         'reasons': 测试单元 -> 它能到达的一个变更脚本（多源遍历中最先到达它的来源）,
+         'changed_scripts': 参与遍历的变更脚本, 'visited_scripts': 遍历访问的脚本数}
+    """
+    callers_of = analyzer.get_callers_index()
+    changed = sorted({script for script in changed_scripts if script in analyzer.script_functions})
+    # 脚本 -> 最先到达它的变更脚本
+    source_of: Dict[str, str] = {script: script for script in changed}
+    queue = deque(changed)
+    with profile_phase('tests: reverse traversal'):
+        while queue:
+            script = queue.popleft()
+            for caller in callers_of.get(script, ()):
+                if caller not in source_of:
+                    source_of[caller] = source_of[script]
+                    queue.append(caller)
+
+    reasons: Dict[str, str] = {}
+    for script, source in source_of.items():
+        if is_test_script(script, test_patterns):
+            unit = get_test_unit(script)
+            if unit not in reasons or source < reasons[unit]:
+                reasons[unit] = source
+    logger.info(f"{len(changed)} 个变更脚本影响 {len(reasons)} 个测试（遍历 {len(source_of)} 个脚本）")
+    return {
+        'tests': sorted(reasons),
+        'reasons': {unit: reasons[unit] for unit in sorted(reasons)},
+        'changed_scripts': changed,
+        'visited_scripts': len(source_of)
+    }
+
+
+def list_test_units(analyzer: RecursiveCallAnalyzer, test_patterns: Sequence[str] = DEFAULT_TEST_PATTERNS) -> List[str]:
+    """列出工程中的全部测试单元（遍历全部脚本，仅用于统计与报告）"""
+    return sorted({get_test_unit(script) for script in analyzer.script_functions if is_test_script(script, test_patterns)})
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "affected_tests.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--test-patterns': None, '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 2:
+        print("用法: python affected_tests.py <MATLAB工程路径> <变更脚本,...> [--test-patterns 通配符,...] "
+              "[--json 输出文件] [--profile[=输出文件]]")
+        print(f"  默认测试通配符: {','.join(DEFAULT_TEST_PATTERNS)}（含'/'的通配符匹配相对路径）")
+        print("  按git版本范围选择测试: python change_impact.py <工程目录> <base..head> --tests")
+        print("示例:")
+        print("  python affected_tests.py test_project utils.m,manager.m")
+        sys.exit(1)
+
+    project_path, changed = positional
+    if not os.path.exists(project_path):
+        print(f"错误: 路径 {project_path} 不存在")
+        sys.exit(1)
+    test_patterns = tuple(options['--test-patterns'].split(',')) if options['--test-patterns'] else DEFAULT_TEST_PATTERNS
+
+    analyzer = RecursiveCallAnalyzer(project_path)
+    analyzer._ensure_parsed_and_built()
+    selection = select_affected_tests(analyzer, changed.split(','), test_patterns)
+    all_tests = list_test_units(analyzer, test_patterns)
+
+    print(f"\n=== 受影响的测试: {len(selection['tests'])} / {len(all_tests)} ===")
+    for unit, source in selection['reasons'].items():
+        print(f"  {unit}  (到达 {source})")
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(selection, f, ensure_ascii=False, indent=2)
+        print(f"测试选择结果已保存: {options['--json']}")
+    return selection
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+扩展性基准测试
+在不同规模的合成工程上分别计时并统计内存峰值：扫描解析、建图、递归分析与路径查找，
+结果输出为JSON，便于在版本之间对比性能回退
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(CURRENT_DIR)
+for _path in (CURRENT_DIR, PACKAGE_DIR):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from synthetic_project import SyntheticProjectSpec, generate_project
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def measure(func: Callable, trace_memory: bool) -> Dict:
+    """
+    执行一次函数并记录耗时与内存峰值
+
+    Args:
+        func: 被测函数
+        trace_memory: 是否使用tracemalloc统计内存峰值（会降低执行速度，因此与计时分开执行）
+
+    Returns:
+        {"seconds": 耗时, "peak_bytes": 内存峰值或None}
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"seconds": round(elapsed, 6), "peak_bytes": peak}
+
+
+def _build_phases(project_path: str) -> Dict[str, Dict]:
+    """扫描与建图两个阶段（每次使用新的分析器，避免复用缓存）"""
+    results = {}
+    for trace_memory in (False, True):
+        analyzer = RecursiveCallAnalyzer(project_path)
+        scan = measure(analyzer._parse_project, trace_memory)
+        build = measure(analyzer._build_call_graph, trace_memory)
+        key = "peak_bytes" if trace_memory else "seconds"
+        results.setdefault("scan_project", {})[key] = scan[key]
+        results.setdefault("build_call_graph", {})[key] = build[key]
+        if not trace_memory:
+            results["build_call_graph"]["edge_count"] = sum(len(v) for v in analyzer.call_graph.values())
+            results["scan_project"]["script_count"] = len(analyzer.script_functions)
+    return results
+
+
+TRAVERSAL_PHASES = (
+    "analyze_recursive_calls",
+    "find_path_to_script",
+    "find_all_paths_to_script",
+    "find_paths_to_leaves",
+)
+
+
+def _traversal_worker(project_path: str, entry_script: str, target_script: str, phase: str, queue) -> None:
+    """
+    子进程：构建调用图后执行单个遍历阶段并回报结果
+    与_build_phases相同，先做一次计时、再用新的分析器做一次内存统计，两次结果依次放入队列
+    """
+    logging.disable(logging.CRITICAL)
+    for trace_memory in (False, True):
+        analyzer = RecursiveCallAnalyzer(project_path)
+        analyzer._parse_project()
+        analyzer._build_call_graph()
+        # 路径查找方法在call_chains为空时会先做一次完整递归分析，这里预置入口避免计入
+        if phase != "analyze_recursive_calls":
+            analyzer.call_chains = {entry_script: [entry_script]}
+        funcs = {
+            "analyze_recursive_calls": lambda: analyzer.analyze_recursive_calls(entry_script),
+            "find_path_to_script": lambda: analyzer._find_path_to_script(entry_script, target_script),
+            "find_all_paths_to_script": lambda: analyzer._find_all_paths_to_script(entry_script, target_script),
+            "find_paths_to_leaves": lambda: analyzer._find_paths_to_leaves(target_script),
+        }
+        try:
+            queue.put(measure(funcs[phase], trace_memory))
+        except Exception as e:
+            # 例如深层调用链触发的RecursionError，同样属于需要暴露的扩展性问题
+            queue.put({"error": f"{type(e).__name__}: {e}"})
+            return
+
+
+# tracemalloc会明显拖慢执行，内存统计一轮的超时按计时一轮的倍数放宽
+TRACE_TIMEOUT_FACTOR = 5
+
+
+def _traversal_phases(info: Dict, timeout: float) -> Dict[str, Dict]:
+    """
+    在子进程中逐个执行遍历阶段（路径枚举可能呈指数增长，需要超时保护）
+
+    Args:
+        info: 合成工程信息
+        timeout: 单个阶段的超时时间（秒，不含子进程中的扫描与建图）
+
+    Returns:
+        阶段名 -> 计时结果（含peak_bytes），超时的阶段标记为 {"timeout": True}；
+        仅内存统计一轮超时时保留计时，peak_bytes为None并标记peak_timeout
+    """
+    ctx = multiprocessing.get_context()
+    results: Dict[str, Dict] = {}
+    # 子进程先要完成扫描与建图，这部分时间按扫描耗时的上限放宽
+    build_allowance = info.get("build_seconds", 0) * 2 + 5
+    for phase in TRAVERSAL_PHASES:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_traversal_worker,
+                           args=(info["project_path"], info["entry_script"], info["target_script"], phase, queue))
+        proc.start()
+        try:
+            results[phase] = queue.get(timeout=timeout + build_allowance)
+        except Exception:
+            results[phase] = {"timeout": True, "timeout_seconds": timeout}
+        if "seconds" in results[phase]:
+            try:
+                traced = queue.get(timeout=(timeout + build_allowance) * TRACE_TIMEOUT_FACTOR)
+                results[phase]["peak_bytes"] = traced.get("peak_bytes")
+            except Exception:
+                results[phase]["peak_timeout"] = True
+        if proc.is_alive():
+            proc.terminate()
+        proc.join()
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    """当前仓库的提交号（用于结果溯源）"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PACKAGE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(sizes: List[int], spec_template: SyntheticProjectSpec, work_dir: str,
+                   traversal_timeout: float, max_traversal_files: int) -> Dict:
+    """
+    在各规模合成工程上运行全部阶段
+
+    Args:
+        sizes: 文件数列表
+        spec_template: 合成工程参数模板（file_count会被覆盖）
+        work_dir: 合成工程存放目录
+        traversal_timeout: 单个遍历阶段的超时
+        max_traversal_files: 超过该文件数时跳过遍历阶段
+
+    Returns:
+        机器可读的完整结果
+    """
+    report = {
+        "benchmark": "matlab_recursive_analysis.scaling",
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": []
+    }
+    for size in sizes:
+        spec = SyntheticProjectSpec(**{**spec_template.to_dict(), "file_count": size})
+        project_dir = os.path.join(work_dir, f"synthetic_{size}")
+        gen_start = time.perf_counter()
+        info = generate_project(project_dir, spec, overwrite=True)
+        run = {
+            "file_count": size,
+            "spec": spec.to_dict(),
+            "generation_seconds": round(time.perf_counter() - gen_start, 6),
+            "phases": _build_phases(project_dir)
+        }
+        if size <= max_traversal_files:
+            info["build_seconds"] = run["phases"]["scan_project"]["seconds"] + run["phases"]["build_call_graph"]["seconds"]
+            run["phases"].update(_traversal_phases(info, traversal_timeout))
+        else:
+            run["traversal_skipped"] = f"file_count > {max_traversal_files}"
+        report["runs"].append(run)
+        print_run(run)
+    return report
+
+
+def print_run(run: Dict) -> None:
+    """打印单个规模的结果表"""
+    print(f"\n=== {run['file_count']} 个文件 ===")
+    print(f"  {'阶段':<28}{'耗时(s)':>12}{'内存峰值(MB)':>16}")
+    for name, result in run["phases"].items():
+        if result.get("timeout"):
+            print(f"  {name:<28}{'超时':>12}")
+            continue
+        if result.get("error"):
+            print(f"  {name:<28}{'出错':>12}  {result['error'][:60]}")
+            continue
+        peak = result.get("peak_bytes")
+        peak_str = f"{peak / 1024 / 1024:.2f}" if peak is not None else "-"
+        print(f"  {name:<28}{result['seconds']:>12.4f}{peak_str:>16}")
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description="MATLAB调用链分析器扩展性基准测试")
+    arg_parser.add_argument('--sizes', default=",".join(str(s) for s in DEFAULT_SIZES),
+                            help="逗号分隔的文件数列表（默认 100,1000,10000,100000）")
+    arg_parser.add_argument('--depth', type=int, default=3, help="目录嵌套深度")
+    arg_parser.add_argument('--dirs-per-level', type=int, default=4, help="每层子目录数量")
+    arg_parser.add_argument('--fan-out', type=int, default=3, help="每个文件调用的其他文件数量")
+    arg_parser.add_argument('--cycle-density', type=float, default=0.02, help="产生循环调用的文件比例")
+    arg_parser.add_argument('--duplicate-ratio', type=float, default=0.05, help="重名函数比例")
+    arg_parser.add_argument('--local-functions', type=int, default=3, help="每个文件的本地函数数量")
+    arg_parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    arg_parser.add_argument('--work-dir', default=None, help="合成工程目录（默认使用临时目录）")
+    arg_parser.add_argument('--traversal-timeout', type=float, default=60.0, help="单个遍历阶段的超时（秒）")
+    arg_parser.add_argument('--max-traversal-files', type=int, default=10000, help="超过该规模时跳过遍历阶段")
+    arg_parser.add_argument('--output', default='bench_results.json', help="JSON结果输出文件")
+    args = arg_parser.parse_args()
+
+    # 分析器在INFO级别会逐行记录递归过程，基准测试中关闭
+    logging.disable(logging.INFO)
+
+    spec = SyntheticProjectSpec(
+        depth=args.depth,
+        dirs_per_level=args.dirs_per_level,
+        fan_out=args.fan_out,
+        cycle_density=args.cycle_density,
+        duplicate_ratio=args.duplicate_ratio,
+        local_functions=args.local_functions,
+        seed=args.seed
+    )
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    if args.work_dir:
+        report = run_benchmarks(sizes, spec, args.work_dir, args.traversal_timeout, args.max_traversal_files)
+    else:
+        with tempfile.TemporaryDirectory(prefix="matlab_bench_") as work_dir:
+            report = run_benchmarks(sizes, spec, work_dir, args.traversal_timeout, args.max_traversal_files)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n基准测试结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+增量更新的差分检查
+对同一组变更分别做增量更新（update_source）与完整解析，逐项比较两者的结果：
+脚本级调用图、函数名 -> 定义脚本列表（含顺序，第一个为主定义）、调用边来源与反向调用索引（call_references，含顺序）。
+检查两部分内容，scope_aware 开、关各做一遍：
+1. fixtures/ 下的小型版本对（old -> new），覆盖classdef、+包、private目录与改名/删除；
+2. 在合成工程（并入全部fixture的old版本）上做多轮随机变更（修改调用、新增/删除/移动文件、
+   移入private或+包目录、新增classdef与脚本文件），每轮后原地增量更新并与完整解析比较。
+发现不一致时打印随机种子、轮次与变更记录，退出码为1
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(CURRENT_DIR)
+for _path in (CURRENT_DIR, PACKAGE_DIR):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from synthetic_project import SyntheticProjectSpec, generate_project
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(CURRENT_DIR, 'fixtures')
+SCOPE_MODES = (False, True)
+MISSING_FUNCTION = 'missing_function'
+
+
+def analyzer_state(analyzer: RecursiveCallAnalyzer) -> Dict[str, Dict]:
+    """取出参与比较的分析结果（转换为可直接比较的普通容器）"""
+    parser = analyzer.parser
+    edges = sorted((caller, callee) for caller, callees in analyzer.call_graph.items() for callee in callees)
+    return {
+        'call_graph': {caller: sorted(callees) for caller, callees in analyzer.call_graph.items() if callees},
+        'function_scripts': {name: list(scripts) for name, scripts in parser.function_scripts.items()},
+        'edge_provenance': {f"{caller} -> {callee}": analyzer.edge_provenance.explain(caller, callee)
+                            for caller, callee in edges},
+        'call_references': {name: list(callers) for name, callers in parser.call_references.items() if callers},
+    }
+
+
+def compare_states(incremental: Dict[str, Dict], full: Dict[str, Dict], limit: int = 5) -> List[str]:
+    """
+    比较增量更新与完整解析的结果
+
+    Returns:
+        不一致的描述（每项最多列出limit个键）；一致时为空列表
+    """
+    problems: List[str] = []
+    for table, expected in full.items():
+        actual = incremental[table]
+        if actual == expected:
+            continue
+        keys = sorted(key for key in actual.keys() | expected.keys() if actual.get(key) != expected.get(key))
+        for key in keys[:limit]:
+            problems.append(f"{table}[{key}]: 增量 {actual.get(key)!r} != 完整 {expected.get(key)!r}")
+        if len(keys) > limit:
+            problems.append(f"{table}: 另有 {len(keys) - limit} 处不一致")
+    return problems
+
+
+def full_state(project_path: str, scope_aware: bool) -> Dict[str, Dict]:
+    """完整解析工程并取出结果"""
+    analyzer = RecursiveCallAnalyzer(project_path, scope_aware=scope_aware)
+    analyzer._ensure_parsed_and_built()
+    return analyzer_state(analyzer)
+
+
+def check_fixtures(fixtures_dir: str = FIXTURES_DIR) -> List[str]:
+    """
+    对fixtures下的每个版本对做 old -> new 的增量更新并与new的完整解析比较
+
+    Returns:
+        不一致的描述（带用例名与scope_aware）
+    """
+    problems: List[str] = []
+    for case in sorted(os.listdir(fixtures_dir)):
+        old_dir = os.path.join(fixtures_dir, case, 'old')
+        new_dir = os.path.join(fixtures_dir, case, 'new')
+        if not (os.path.isdir(old_dir) and os.path.isdir(new_dir)):
+            continue
+        for scope_aware in SCOPE_MODES:
+            analyzer = RecursiveCallAnalyzer(old_dir, scope_aware=scope_aware)
+            analyzer._ensure_parsed_and_built()
+            analyzer.update_source(project_path=new_dir)
+            case_problems = compare_states(analyzer_state(analyzer), full_state(new_dir, scope_aware))
+            status = "一致" if not case_problems else f"{len(case_problems)} 处不一致"
+            print(f"  fixture {case:<16} scope_aware={scope_aware!s:<6} {status}")
+            problems.extend(f"fixture {case} (scope_aware={scope_aware}): {p}" for p in case_problems)
+    return problems
+
+
+class ProjectMutator:
+    """
+    在工程目录中做随机变更
+    每次写入都把文件修改时间推进到单调递增的时钟上：同一目录内的增量更新按 (大小, 修改时间) 判断文件是否变化，
+    连续的快速写入在粗粒度的时间戳上可能得到相同的修改时间，与真实编辑不符
+    """
+
+    def __init__(self, root: str, rng: random.Random):
+        self.root = root
+        self.rng = rng
+        self.clock = os.stat(root).st_mtime_ns + 10 ** 9
+        self.counter = 0
+
+    def _tick(self, path: str) -> None:
+        self.clock += 10 ** 6
+        os.utime(path, ns=(self.clock, self.clock))
+
+    def _sources(self) -> List[str]:
+        return sorted(os.path.relpath(os.path.join(dirpath, name), self.root)
+                      for dirpath, _, names in os.walk(self.root) for name in names if name.endswith('.m'))
+
+    def _directories(self) -> List[str]:
+        dirs = sorted(os.path.relpath(dirpath, self.root) for dirpath, _, _ in os.walk(self.root))
+        # 除现有目录外，也可以新建private目录或+包目录
+        base = self.rng.choice(dirs)
+        if os.path.basename(base) != 'private':
+            dirs.append(os.path.join(base, self.rng.choice(('private', '+mutpkg'))))
+        return dirs
+
+    def _write(self, relative_path: str, text: str) -> None:
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self._tick(path)
+
+    def _call_lines(self, names: List[str]) -> List[str]:
+        return [f"    {self.rng.choice(names)}(0);" for _ in range(self.rng.randint(1, 3))]
+
+    def _new_name(self, names: List[str]) -> str:
+        """新文件名：一半取已有函数名（产生重名与遮蔽），一半取新名字"""
+        existing = [name for name in names if '.' not in name and name != MISSING_FUNCTION]
+        if existing and self.rng.random() < 0.5:
+            return self.rng.choice(existing)
+        self.counter += 1
+        return f"mutated_{self.counter}"
+
+    def mutate(self, names: List[str]) -> str:
+        """
+        做一次随机变更
+
+        Args:
+            names: 新增调用时可选的函数名（含包限定名与不存在的函数名）
+
+        Returns:
+            变更描述
+        """
+        sources = self._sources()
+        op = self.rng.choice(('edit', 'edit', 'add_function', 'add_script', 'add_classdef', 'delete', 'move'))
+        if not sources:
+            op = 'add_function'
+        if op == 'edit':
+            script = self.rng.choice(sources)
+            path = os.path.join(self.root, script)
+            with open(path, encoding='utf-8', errors='replace') as f:
+                lines = f.read().split('\n')
+            call_lines = [i for i, line in enumerate(lines) if '(' in line and not line.lstrip().startswith(('function', '%'))]
+            if call_lines and self.rng.random() < 0.4:
+                removed = lines.pop(self.rng.choice(call_lines))
+                detail = f"删除 {removed.strip()}"
+            else:
+                position = self.rng.randint(1, max(len(lines) - 1, 1))
+                added = self._call_lines(names)
+                lines[position:position] = added
+                detail = f"第{position + 1}行插入 {' '.join(line.strip() for line in added)}"
+            self._write(script, '\n'.join(lines))
+            return f"edit {script}: {detail}"
+        if op in ('add_function', 'add_script', 'add_classdef'):
+            name = self._new_name(names)
+            script = os.path.join(self.rng.choice(self._directories()), f"{name}.m")
+            if op == 'add_function':
+                body = [f"function {name}(x)"] + self._call_lines(names) + ["end"]
+            elif op == 'add_script':
+                body = ["% 脚本文件"] + [line.strip() for line in self._call_lines(names)]
+            else:
+                body = [f"classdef {name}", "    methods", f"        function obj = {name}()",
+                        *("    " + line for line in self._call_lines(names)),
+                        "        end", "        function run(obj)",
+                        *("    " + line for line in self._call_lines(names)),
+                        "        end", "    end", "end", "", "function local_tail(x)",
+                        *self._call_lines(names), "end"]
+            self._write(script, '\n'.join(body) + '\n')
+            return f"{op} {script}"
+        script = self.rng.choice(sources)
+        path = os.path.join(self.root, script)
+        if op == 'delete':
+            os.remove(path)
+            return f"delete {script}"
+        stem = os.path.splitext(os.path.basename(script))[0] if self.rng.random() < 0.5 else self._new_name(names)
+        target = os.path.join(self.rng.choice(self._directories()), f"{stem}.m")
+        if os.path.normpath(target) == os.path.normpath(script):
+            return f"move {script}: 目标相同，跳过"
+        os.makedirs(os.path.dirname(os.path.join(self.root, target)), exist_ok=True)
+        os.replace(path, os.path.join(self.root, target))
+        self._tick(os.path.join(self.root, target))
+        return f"move {script} -> {target}"
+
+
+def build_mutation_project(root: str, file_count: int, seed: int) -> None:
+    """生成随机变更的起始工程：合成工程并入全部fixture的old版本（各自放在独立的子目录中）"""
+    spec = SyntheticProjectSpec(file_count=file_count, depth=2, dirs_per_level=3, duplicate_ratio=0.2,
+                                local_functions=1, script_ratio=0.2, seed=seed)
+    generate_project(root, spec)
+    if os.path.isdir(FIXTURES_DIR):
+        for case in sorted(os.listdir(FIXTURES_DIR)):
+            old_dir = os.path.join(FIXTURES_DIR, case, 'old')
+            if os.path.isdir(old_dir):
+                shutil.copytree(old_dir, os.path.join(root, f"fixture_{case}"))
+
+
+def check_mutations(rounds: int, file_count: int, seed: int, mutations_per_round: int,
+                    work_dir: Optional[str] = None) -> List[str]:
+    """
+    随机变更的差分检查：scope_aware 开、关两个分析器跟随同一组变更原地增量更新，每轮与完整解析比较
+
+    Args:
+        rounds: 变更轮数
+        file_count: 合成工程的文件数
+        seed: 随机种子（同时决定合成工程与变更序列）
+        mutations_per_round: 每轮的变更次数上限
+        work_dir: 工程存放目录（None表示使用临时目录并在结束后删除）
+
+    Returns:
+        不一致的描述（带轮次、scope_aware与此前的全部变更记录）
+    """
+    owns_dir = work_dir is None
+    root = tempfile.mkdtemp(prefix="matlab_incremental_") if owns_dir else work_dir
+    try:
+        project = os.path.join(root, 'project')
+        build_mutation_project(project, file_count, seed)
+        rng = random.Random(seed)
+        mutator = ProjectMutator(project, rng)
+        analyzers: Dict[bool, RecursiveCallAnalyzer] = {}
+        for scope_aware in SCOPE_MODES:
+            analyzers[scope_aware] = RecursiveCallAnalyzer(project, scope_aware=scope_aware)
+            analyzers[scope_aware]._ensure_parsed_and_built()
+
+        history: List[str] = []
+        for round_index in range(1, rounds + 1):
+            names = sorted(analyzers[SCOPE_MODES[0]].parser.function_scripts) + [MISSING_FUNCTION]
+            for _ in range(rng.randint(1, mutations_per_round)):
+                history.append(f"[{round_index}] {mutator.mutate(names)}")
+            for scope_aware, analyzer in analyzers.items():
+                analyzer.update_source()
+                problems = compare_states(analyzer_state(analyzer), full_state(project, scope_aware))
+                if problems:
+                    header = f"第{round_index}轮 (scope_aware={scope_aware}, seed={seed}) 不一致"
+                    return [header] + problems + ["变更记录:"] + history
+            print(f"  第{round_index:>3}轮 一致  ({len(analyzers[False].script_functions)} 个脚本, "
+                  f"{sum(len(v) for v in analyzers[False].call_graph.values())} 条调用边)")
+        return []
+    finally:
+        if owns_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description="增量更新与完整解析的差分检查")
+    arg_parser.add_argument('--rounds', type=int, default=30, help="随机变更轮数（默认 30）")
+    arg_parser.add_argument('--files', type=int, default=60, help="合成工程的文件数（默认 60）")
+    arg_parser.add_argument('--mutations', type=int, default=3, help="每轮的变更次数上限（默认 3）")
+    arg_parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    arg_parser.add_argument('--work-dir', default=None, help="工程存放目录（默认使用临时目录，结束后删除）")
+    arg_parser.add_argument('--skip-fixtures', action='store_true', help="跳过fixtures版本对的检查")
+    args = arg_parser.parse_args()
+
+    # 分析器在INFO级别会逐行记录解析过程，检查中关闭
+    logging.disable(logging.INFO)
+
+    problems: List[str] = []
+    if not args.skip_fixtures:
+        print("fixtures版本对:")
+        problems.extend(check_fixtures())
+    if args.rounds > 0:
+        print(f"随机变更 (seed={args.seed}, {args.rounds} 轮):")
+        problems.extend(check_mutations(args.rounds, args.files, args.seed, args.mutations, args.work_dir))
+
+    if problems:
+        print("\n增量更新与完整解析不一致:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\n增量更新与完整解析结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+% 形状类 - 新增方法，本地函数改名
+classdef Shape
+    properties
+        radius
+    end
+
+    methods
+        function obj = Shape(r)
+            obj.radius = r;
+        end
+
+        function a = area(obj)
+            a = circle_factor(obj.radius ^ 2);
+        end
+
+        function p = perimeter(obj)
+            p = circle_factor(2 * obj.radius);
+        end
+    end
+end
+
+function v = circle_factor(x)
+    v = pi * x;
+end
@@ -0,0 +1,4 @@
+% 独立的同名函数 - 与Shape的area方法重名
+function a = area(w, h)
+    a = w * h;
+end
@@ -0,0 +1,9 @@
+% 辅助函数 - 同名本地函数不应解析到Shape.m
+function helper_fn(x)
+    disp(x);
+    y = scale_value(x);
+end
+
+function y = scale_value(x)
+    y = 2 * x;
+end
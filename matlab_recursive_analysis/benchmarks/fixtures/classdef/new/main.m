@@ -0,0 +1,7 @@
+% 入口 - 构造类对象并调用方法（新增周长调用）
+function main()
+    s = Shape(2);
+    a = area(s);
+    p = perimeter(s);
+    helper_fn(a + p);
+end
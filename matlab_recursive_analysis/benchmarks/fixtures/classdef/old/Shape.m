@@ -0,0 +1,20 @@
+% 形状类 - 类定义之后的本地函数只对本文件可见
+classdef Shape
+    properties
+        radius
+    end
+
+    methods
+        function obj = Shape(r)
+            obj.radius = r;
+        end
+
+        function a = area(obj)
+            a = scale_value(obj.radius ^ 2);
+        end
+    end
+end
+
+function v = scale_value(x)
+    v = pi * x;
+end
@@ -0,0 +1,6 @@
+% 入口 - 构造类对象并调用方法
+function main()
+    s = Shape(2);
+    a = area(s);
+    helper_fn(a);
+end
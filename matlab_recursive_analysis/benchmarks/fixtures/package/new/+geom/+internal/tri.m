@@ -0,0 +1,4 @@
+% 子包函数 - 新增
+function tri(a)
+    util_fn();
+end
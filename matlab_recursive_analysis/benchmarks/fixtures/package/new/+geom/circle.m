@@ -0,0 +1,4 @@
+% 包函数 - 圆（改为调用子包中的函数，正方形已删除）
+function circle(r)
+    geom.internal.tri(r);
+end
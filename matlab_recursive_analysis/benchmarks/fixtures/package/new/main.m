@@ -0,0 +1,7 @@
+% 入口 - 包函数的限定调用与import
+function main()
+    geom.circle(1);
+    import geom.*
+    square(2);
+    util_fn();
+end
@@ -0,0 +1,4 @@
+% 工具函数
+function util_fn()
+    disp('util');
+end
@@ -0,0 +1,4 @@
+% 包函数 - 圆
+function circle(r)
+    geom.square(r);
+end
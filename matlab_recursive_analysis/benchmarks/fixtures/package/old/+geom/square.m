@@ -0,0 +1,4 @@
+% 包函数 - 正方形
+function square(a)
+    util_fn();
+end
@@ -0,0 +1,6 @@
+% 入口 - 私有函数已删除，调用改为解析到公共函数
+function main()
+    loader();
+    helper();
+    tool();
+end
@@ -0,0 +1,4 @@
+% 子目录中的函数 - 看不到上级目录的private函数
+function tool()
+    helper();
+end
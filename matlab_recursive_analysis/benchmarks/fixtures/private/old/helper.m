@@ -0,0 +1,4 @@
+% 公共辅助函数 - 被private中的同名函数遮蔽
+function helper()
+    disp('public helper');
+end
@@ -0,0 +1,4 @@
+% 加载器 - 同样可见private目录
+function loader()
+    helper();
+end
@@ -0,0 +1,5 @@
+% 入口 - 同目录private下的函数优先于工程中的同名函数
+function main()
+    loader();
+    helper();
+end
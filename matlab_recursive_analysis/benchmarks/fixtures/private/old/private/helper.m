@@ -0,0 +1,4 @@
+% 私有辅助函数
+function helper()
+    disp('private helper');
+end
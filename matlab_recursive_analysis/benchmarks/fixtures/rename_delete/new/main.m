@@ -0,0 +1,6 @@
+% 入口
+function main()
+    step_a();
+    step_b();
+    step_c();
+end
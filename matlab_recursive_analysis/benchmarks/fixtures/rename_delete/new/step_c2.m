@@ -0,0 +1,4 @@
+% 第三步 - 由lib/step_c.m改名移动而来
+function step_c2()
+    step_b();
+end
@@ -0,0 +1,4 @@
+% 第三步
+function step_c()
+    step_b();
+end
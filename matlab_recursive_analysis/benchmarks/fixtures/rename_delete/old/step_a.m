@@ -0,0 +1,4 @@
+% 第一步 - 调用第二步
+function step_a()
+    step_b();
+end
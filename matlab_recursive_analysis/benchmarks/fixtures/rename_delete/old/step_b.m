@@ -0,0 +1,4 @@
+% 第二步
+function step_b()
+    disp('b');
+end
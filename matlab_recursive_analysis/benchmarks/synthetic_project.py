@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+合成MATLAB工程生成器
+按文件数、目录深度、扇出、环密度、重名函数比例与本地函数数量生成可复现的MATLAB工程，
+用于基准测试解析、建图与路径查找的扩展性
+"""
+
+import json
+import random
+import shutil
+import logging
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 生成器写入输出目录的标记文件：只有带此标记的目录才允许被清空重建
+MARKER_FILE = '.synthetic_project.json'
+
+
+@dataclass
+class SyntheticProjectSpec:
+    """合成工程参数"""
+    file_count: int = 1000          # .m文件数量
+    depth: int = 3                  # 目录嵌套深度
+    dirs_per_level: int = 4         # 每层子目录数量
+    fan_out: int = 3                # 每个文件调用的其他文件数量
+    cycle_density: float = 0.02     # 产生回边（形成循环调用）的文件比例
+    duplicate_ratio: float = 0.05   # 与其他目录中文件同名的比例
+    local_functions: int = 3        # 每个文件中的本地函数数量
+    script_ratio: float = 0.1       # 无function定义的脚本文件比例
+    seed: int = 42                  # 随机种子
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def validate(self) -> None:
+        """检查参数取值，不合法时抛出ValueError"""
+        if self.file_count < 1:
+            raise ValueError(f"file_count 至少为1（入口脚本）: {self.file_count}")
+        if self.depth < 0 or self.dirs_per_level < 0 or self.fan_out < 0 or self.local_functions < 0:
+            raise ValueError("depth / dirs_per_level / fan_out / local_functions 不能为负数")
+        for field in ('cycle_density', 'duplicate_ratio', 'script_ratio'):
+            if not 0.0 <= getattr(self, field) <= 1.0:
+                raise ValueError(f"{field} 应在 [0, 1] 范围内: {getattr(self, field)}")
+
+
+def _build_directories(spec: SyntheticProjectSpec) -> List[Path]:
+    """按深度与分支数生成相对目录列表（包含根目录）"""
+    dirs = [Path('.')]
+    level = [Path('.')]
+    for d in range(spec.depth):
+        next_level = []
+        for parent in level:
+            for k in range(spec.dirs_per_level):
+                next_level.append(parent / f"dir{d}_{k}")
+        dirs.extend(next_level)
+        level = next_level
+    return dirs
+
+
+def generate_project(output_dir: str, spec: SyntheticProjectSpec, overwrite: bool = False) -> Dict:
+    """
+    生成合成MATLAB工程
+
+    Args:
+        output_dir: 输出目录（不存在或为空目录）
+        spec: 工程参数
+        overwrite: 输出目录是此前生成的工程（带有标记文件）时清空重建；其他非空目录一律拒绝
+
+    Returns:
+        生成信息（入口脚本、文件数、边数等）
+    """
+    spec.validate()
+    rng = random.Random(spec.seed)
+    root = Path(output_dir)
+    if root.exists() and any(root.iterdir()):
+        if not (root / MARKER_FILE).is_file():
+            raise ValueError(f"输出目录 {root} 非空且不是生成器创建的工程，拒绝写入")
+        if not overwrite:
+            raise ValueError(f"输出目录 {root} 已有生成的工程（需要 overwrite=True / --force 重建）")
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    dirs = _build_directories(spec)
+    for d in dirs:
+        (root / d).mkdir(parents=True, exist_ok=True)
+
+    # 文件名：部分文件复用前面文件的名字，模拟不同目录下的同名函数
+    # （同名文件数不超过目录数，只有根目录时不产生重名）
+    names: List[str] = []
+    name_counts: Dict[str, int] = {}
+    for i in range(spec.file_count):
+        name = f"mod{i:06d}"
+        if i > 0 and rng.random() < spec.duplicate_ratio:
+            reused = names[rng.randrange(i)]
+            if name_counts[reused] < len(dirs):
+                name = reused
+        names.append(name)
+        name_counts[name] = name_counts.get(name, 0) + 1
+
+    # 文件放置：入口放在根目录，其余按轮转分配到各目录，保证同名文件位于不同目录
+    placements: List[Path] = []
+    used = set()
+    for i, name in enumerate(names):
+        slot = 0 if i == 0 else i % len(dirs)
+        while (dirs[slot], name) in used:
+            slot = (slot + 1) % len(dirs)
+        used.add((dirs[slot], name))
+        placements.append(dirs[slot] / f"{name}.m")
+
+    edge_count = 0
+    cycle_edges = 0
+    for i, name in enumerate(names):
+        # 主要向后调用（形成DAG），按环密度加入指向前面文件的回边
+        callees = set()
+        if i + 1 < spec.file_count:
+            window = range(i + 1, min(spec.file_count, i + 1 + max(spec.fan_out * 8, 16)))
+            callees.update(rng.sample(list(window), min(spec.fan_out, len(window))))
+        if i > 0 and rng.random() < spec.cycle_density:
+            callees.add(rng.randrange(i))
+            cycle_edges += 1
+        edge_count += len(callees)
+        called_names = sorted({names[c] for c in callees})
+
+        is_script = i > 0 and rng.random() < spec.script_ratio
+        lines = [f"% synthetic file {i}"]
+        if is_script:
+            lines.append("x = 1;")
+            lines.extend(f"result_{k} = {callee}(x);" for k, callee in enumerate(called_names))
+        else:
+            lines.append(f"function out = {name}(x)")
+            lines.append("    out = x;")
+            lines.extend(f"    out = {callee}(out);" for callee in called_names)
+            lines.extend(f"    local_helper{k}(out);" for k in range(spec.local_functions))
+            lines.append("end")
+            for k in range(spec.local_functions):
+                lines.append("")
+                lines.append(f"function local_helper{k}(value)")
+                lines.append("    if value > 0")
+                lines.append(f"        fprintf('helper {k}: %f\\n', value);")
+                lines.append("    end")
+                lines.append("end")
+        (root / placements[i]).write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    info = {
+        "project_path": str(root),
+        "entry_script": str(placements[0]),
+        "target_script": str(placements[spec.file_count // 2]),
+        "file_count": spec.file_count,
+        "directory_count": len(dirs),
+        "generated_edges": edge_count,
+        "cycle_edges": cycle_edges,
+        "spec": spec.to_dict()
+    }
+    (root / MARKER_FILE).write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding='utf-8')
+    logger.info(f"合成工程已生成: {root} ({spec.file_count} 个文件, {len(dirs)} 个目录, {edge_count} 条调用)")
+    return info
+
+
+def main():
+    """主函数"""
+    import sys
+
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    force = len(args) != len(sys.argv) - 1
+    if len(args) < 2:
+        print("用法: python synthetic_project.py <输出目录> <文件数> [扇出] [环密度] [重名比例] [--force]")
+        print("  输出目录须不存在或为空；--force 只重建此前生成的工程目录（带有标记文件）")
+        sys.exit(1)
+
+    spec = SyntheticProjectSpec(file_count=int(args[1]))
+    if len(args) > 2:
+        spec.fan_out = int(args[2])
+    if len(args) > 3:
+        spec.cycle_density = float(args[3])
+    if len(args) > 4:
+        spec.duplicate_ratio = float(args[4])
+
+    try:
+        info = generate_project(args[0], spec, overwrite=force)
+    except ValueError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    for key, value in info.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
 from collections import defaultdict, deque
 from script_parser import ImprovedMATLABScriptParser
+from profiling import profile_phase, pop_profile_option, run_profiled
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,15 +21,16 @@ logger = logging.getLogger(__name__)
 class CallChainBuilder:
     """MATLAB调用链构建器"""
     
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, **parser_options):
         """
         初始化调用链构建器
         
         Args:
             project_path: MATLAB工程根目录路径
+            **parser_options: 传递给 ImprovedMATLABScriptParser 的选项（如 exclude_patterns、use_gitignore）
         """
         self.project_path = Path(project_path)
-        self.parser = ImprovedMATLABScriptParser(project_path)
+        self.parser = ImprovedMATLABScriptParser(project_path, **parser_options)
         self.script_functions: Dict[str, Set[str]] = {}
         self.function_scripts: Dict[str, List[str]] = {}
         self.script_calls: Dict[str, Set[str]] = {}
@@ -57,14 +59,16 @@ class CallChainBuilder:
             return {}
         
         # 构建调用关系图
-        self._build_call_graph()
+        with profile_phase('build_call_graph'):
+            self._build_call_graph()
         
         # 从入口脚本开始递归构建调用链
         self.call_chains = {}
         self.visited = set()
         
         # 使用递归方式构建所有可能的调用链
-        self._build_all_chains_recursive(entry_script)
+        with profile_phase('traversal: build chains'):
+            self._build_all_chains_recursive(entry_script)
         
         logger.info(f"调用链构建完成，共找到 {len(self.call_chains)} 个脚本的调用链")
         return self.call_chains
@@ -72,7 +76,8 @@ class CallChainBuilder:
     def _parse_project(self) -> None:
         """解析整个工程"""
         logger.info("开始解析MATLAB工程...")
-        self.script_functions = self.parser.scan_project()
+        with profile_phase('scan_project'):
+            self.script_functions = self.parser.scan_project()
         self.function_scripts = self.parser.get_function_scripts()
         self.script_calls = self.parser.get_script_calls()
         logger.info(f"解析完成，共 {len(self.script_functions)} 个脚本文件")
@@ -83,33 +88,11 @@ class CallChainBuilder:
         
         for script_name, calls in self.script_calls.items():
             for func_call in calls:
-                # 检查这个函数调用是否对应某个脚本中定义的函数
-                if func_call in self.function_scripts:
-                    # 检查是否应该建立外部调用关系
-                    should_create_external_call = True
-                    
-                    # 如果调用脚本有内部定义，检查优先级
-                    if script_name in self.function_scripts[func_call]:
-                        # 使用新的优先级检查方法
-                        func_info = self.parser.get_function_definition_for_script(func_call, script_name)
-                        if func_info.get('is_internal_definition', False):
-                            should_create_external_call = False
-                            logger.debug(f"脚本 {script_name} 有 {func_call} 的内部定义，跳过外部调用关系")
-                    
-                    # 只有在需要外部调用时才建立关系
-                    if should_create_external_call:
-                        # 处理多关联映射：function_scripts[func_call] 现在是 List[str]
-                        called_scripts = self.function_scripts[func_call]
-                        if isinstance(called_scripts, list):
-                            # 使用主定义（列表中的第一个）
-                            called_script = called_scripts[0] if called_scripts else None
-                        else:
-                            # 兼容旧版本（单一映射）
-                            called_script = called_scripts
-                        
-                        if called_script and called_script != script_name:  # 避免自调用
-                            self.call_graph[script_name].add(called_script)
-                            logger.debug(f"建立调用关系: {script_name} -> {called_script} (函数: {func_call})")
+                # 按MATLAB作用域与优先级规则解析：内部定义优先，其他文件只能看到主函数/脚本文件
+                called_script = self.parser.resolve_function_call(func_call, script_name)
+                if called_script:
+                    self.call_graph[script_name].add(called_script)
+                    logger.debug(f"建立调用关系: {script_name} -> {called_script} (函数: {func_call})")
         
         logger.info(f"调用关系图构建完成，共 {len(self.call_graph)} 个脚本有调用关系")
     
@@ -292,8 +275,13 @@ def main():
     """主函数，用于测试"""
     import sys
     
+    argv, profile_output = pop_profile_option(sys.argv, "call_chain_builder.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+    
     if len(sys.argv) < 3:
-        print("用法: python call_chain_builder.py <MATLAB工程路径> <入口脚本>")
+        print("用法: python call_chain_builder.py <MATLAB工程路径> <入口脚本> [--profile[=输出文件]]")
         sys.exit(1)
     
     project_path = sys.argv[1]
@@ -310,14 +298,16 @@ def main():
     call_chains = builder.build_call_chains(entry_script)
     
     # 打印结果
-    builder.print_call_chains(entry_script)
+    with profile_phase('report: print chains'):
+        builder.print_call_chains(entry_script)
     
     # 保存结果到JSON文件
     output_file = f"call_chains_{entry_script.replace('/', '_').replace('.m', '')}.json"
-    call_tree = builder.get_call_tree(entry_script)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(call_tree, f, indent=2, ensure_ascii=False)
+    with profile_phase('report: export call tree'):
+        call_tree = builder.get_call_tree(entry_script)
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(call_tree, f, indent=2, ensure_ascii=False)
     
     print(f"\n调用链结果已保存到: {output_file}")
 
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+按git版本范围做变更影响分析
+由 base..head 直接得到新增/修改/删除/重命名的.m文件，从base版本的调用图增量更新到head，
+删除的脚本按base版本的调用关系检查调用者（head中仍调用且已无法解析的即为断开的调用），
+再对全部变更脚本一次性做上游影响分析
+"""
+
+import json
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from recursive_call_analyzer import GRANULARITIES, RecursiveCallAnalyzer
+from function_graph import function_node
+from git_source import list_changed_files, resolve_range
+from parse_store import ParseStore
+from affected_tests import DEFAULT_TEST_PATTERNS, select_affected_tests
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def analyze_change_range(project_path: str, range_spec: str, entry_roots: Optional[Sequence[str]] = None,
+                         snapshot_path: Optional[str] = None, include_paths: bool = False,
+                         test_patterns: Optional[Sequence[str]] = None, granularity: str = 'script',
+                         **parser_options) -> Dict:
+    """
+    分析git版本范围内的变更对调用图的影响
+
+    Args:
+        project_path: 工程目录（位于git仓库内，可以是子目录）
+        range_spec: 'base..head'、'base...head' 或单个版本（与HEAD比较）
+        entry_roots: 入口脚本（None表示使用head版本中未被调用的根脚本）
+        snapshot_path: base版本的分析快照（存在且有效时直接恢复，否则完整解析base后保存到该路径）
+        include_paths: 是否为每个变更脚本枚举入口到该脚本、该脚本到叶子的全部路径（大工程中可能很慢）
+        test_patterns: 指定时按这些测试通配符选择受影响的测试（见 affected_tests.select_affected_tests）
+        granularity: 影响范围与路径的图粒度 'script' 或 'function'（函数粒度下变更脚本展开为其中的全部函数，
+            断开的调用取调用点所在的函数，受影响范围与路径由 '脚本>函数' 节点组成；测试选择始终按脚本）
+        **parser_options: 传递给 ImprovedMATLABScriptParser 的选项
+
+    Returns:
+        {'base', 'head', 'changes', 'broken_callers', 'rebound_callers', 'impact', 'graph_diff'}，
+        include_paths为True时另含 'impact_paths'，指定test_patterns时另含 'affected_tests'
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"未知的图粒度: {granularity}（可选 {', '.join(GRANULARITIES)}）")
+    base, head = resolve_range(project_path, range_spec)
+    analyzer = RecursiveCallAnalyzer(project_path, git_revision=base, **parser_options)
+    with profile_phase('impact: load base version'):
+        if snapshot_path is None or not analyzer.load_snapshot(snapshot_path):
+            analyzer._ensure_parsed_and_built()
+            if snapshot_path is not None:
+                analyzer.save_snapshot(snapshot_path)
+
+    changes = list_changed_files(project_path, base, head,
+                                 analyzer.parser.include_patterns, analyzer.parser.exclude_patterns)
+    added = [change.path for change in changes if change.status == 'added']
+    modified = [change.path for change in changes if change.status == 'modified']
+    deleted = [change.path for change in changes if change.status == 'deleted']
+    renamed = [{'old': change.old_path, 'new': change.path} for change in changes if change.status == 'renamed']
+    logger.info(f"{base}..{head}: 新增 {len(added)} 个, 修改 {len(modified)} 个, "
+                f"删除 {len(deleted)} 个, 重命名 {len(renamed)} 个源文件")
+
+    # 删除（含重命名前）的脚本按base版本的调用关系找出调用者
+    with profile_phase('impact: callers of deleted scripts'):
+        incoming = {script: analyzer.get_incoming_calls(script)
+                    for script in deleted + [rename['old'] for rename in renamed]}
+
+    with profile_phase('impact: update to head'):
+        graph_diff = analyzer.update_source(git_revision=head, entry_scripts=entry_roots or ())
+
+    parser = analyzer.parser
+    broken_callers: List[Dict] = []
+    rebound_callers: List[Dict] = []
+    for script, calls in incoming.items():
+        for call in calls:
+            caller = call['caller']
+            if call['function'] not in parser.script_calls.get(caller, ()):
+                continue  # 调用者已删除或不再调用该函数
+            resolved_script, rule = parser.resolve_function_call_with_rule(call['function'], caller)
+            record = dict(call, deleted_script=script)
+            if resolved_script is None:
+                broken_callers.append(record)
+            elif resolved_script != caller:
+                record.update(resolved_script=resolved_script, rule=rule)
+                rebound_callers.append(record)
+
+    # 变更脚本与调用断开的脚本一次性做反向遍历
+    with profile_phase('impact: upstream'):
+        changed_scripts = {script for script in added + modified + [rename['new'] for rename in renamed]
+                           if script in analyzer.script_functions}
+        targets = sorted(changed_scripts | {call['caller'] for call in broken_callers})
+        impact_targets = targets
+        if granularity == 'function':
+            # 变更脚本取其中的全部函数，断开的调用只取调用点所在的函数
+            function_graph = analyzer.get_function_graph()
+            nodes = set(function_graph.resolve_targets(sorted(changed_scripts)))
+            for call in broken_callers:
+                enclosing = parser.get_enclosing_function(call['caller'], call['line']) if call['line'] else None
+                nodes.add(function_node(call['caller'], enclosing) if enclosing
+                          else function_graph.resolve_entry(call['caller']))
+            impact_targets = sorted(nodes)
+        upstream = analyzer.get_upstream_scripts(impact_targets, granularity)
+        roots = list(entry_roots) if entry_roots is not None else analyzer.get_root_scripts(granularity)
+        if granularity == 'function':
+            roots = [function_graph.resolve_entry(root) or root for root in roots]
+
+    result = {
+        'base': base,
+        'head': head,
+        'changes': {'added': added, 'modified': modified, 'deleted': deleted, 'renamed': renamed},
+        'broken_callers': broken_callers,
+        'rebound_callers': rebound_callers,
+        'impact': {
+            'granularity': granularity,
+            'changed_scripts': impact_targets,
+            'affected_scripts': sorted(upstream),
+            'affected_entry_roots': sorted(root for root in roots if root in upstream)
+        },
+        'graph_diff': graph_diff
+    }
+    if test_patterns is not None:
+        result['affected_tests'] = select_affected_tests(analyzer, targets, test_patterns)
+    if include_paths:
+        with profile_phase('impact: paths'):
+            result['impact_paths'] = analyzer.analyze_impact_for_changes(impact_targets, roots, granularity)
+    return result
+
+
+def print_change_impact(result: Dict) -> None:
+    """打印变更影响分析结果"""
+    changes = result['changes']
+    print(f"\n=== 变更影响分析: {result['base']}..{result['head']} ===")
+    for key, title in (('added', '新增'), ('modified', '修改'), ('deleted', '删除')):
+        print(f"{title}: {len(changes[key])} 个")
+        for script in changes[key]:
+            print(f"  {script}")
+    print(f"重命名: {len(changes['renamed'])} 个")
+    for rename in changes['renamed']:
+        print(f"  {rename['old']} -> {rename['new']}")
+
+    print(f"\n断开的调用: {len(result['broken_callers'])} 处")
+    for call in result['broken_callers']:
+        print(f"  {call['caller']}:{call['line']}:{call['column']}  {call['function']}  (原定义于 {call['deleted_script']})")
+    if result['rebound_callers']:
+        print(f"改为解析到其他脚本的调用: {len(result['rebound_callers'])} 处")
+        for call in result['rebound_callers']:
+            print(f"  {call['caller']}:{call['line']}:{call['column']}  {call['function']}  "
+                  f"{call['deleted_script']} -> {call['resolved_script']}")
+
+    impact = result['impact']
+    unit = '函数' if impact['granularity'] == 'function' else '脚本'
+    print(f"\n受影响{unit}: {len(impact['affected_scripts'])} 个（变更 {len(impact['changed_scripts'])} 个）")
+    print(f"受影响入口: {len(impact['affected_entry_roots'])} 个")
+    for root in impact['affected_entry_roots']:
+        print(f"  {root}")
+    if 'affected_tests' in result:
+        print(f"\n受影响的测试: {len(result['affected_tests']['tests'])} 个")
+        for unit, source in result['affected_tests']['reasons'].items():
+            print(f"  {unit}  (到达 {source})")
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "change_impact.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--entry': None, '--snapshot': None, '--parse-store': None, '--json': None, '--test-patterns': None,
+               '--granularity': 'script'}
+    flags = {'--paths': False, '--tests': False}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        elif args[i] in flags:
+            flags[args[i]] = True
+            i += 1
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 2:
+        print("用法: python change_impact.py <工程目录> <base..head> [--entry 入口脚本,...] [--snapshot base版本快照] "
+              "[--parse-store 文件] [--paths] [--tests] [--test-patterns 通配符,...] [--granularity script|function] "
+              "[--json 输出文件] [--profile[=输出文件]]")
+        print("  函数粒度下受影响范围与 --paths 的路径由 '脚本>函数' 节点组成")
+        print("示例:")
+        print("  python change_impact.py test_project v1.0..HEAD --entry main.m")
+        print("  python change_impact.py test_project origin/main...HEAD --json impact.json")
+        print("  python change_impact.py test_project origin/main...HEAD --tests --test-patterns 'test_*.m,tests/*'")
+        print("  python change_impact.py test_project v1.0..HEAD --paths --granularity function")
+        sys.exit(1)
+    if options['--granularity'] not in GRANULARITIES:
+        print(f"错误: 未知的图粒度 {options['--granularity']}（可选 {', '.join(GRANULARITIES)}）")
+        sys.exit(1)
+
+    project_path, range_spec = positional
+    parse_store = ParseStore(options['--parse-store']) if options['--parse-store'] else None
+    test_patterns = None
+    if options['--test-patterns']:
+        test_patterns = tuple(options['--test-patterns'].split(','))
+    elif flags['--tests']:
+        test_patterns = DEFAULT_TEST_PATTERNS
+    result = analyze_change_range(project_path, range_spec,
+                                  entry_roots=options['--entry'].split(',') if options['--entry'] else None,
+                                  snapshot_path=options['--snapshot'], include_paths=flags['--paths'],
+                                  test_patterns=test_patterns, granularity=options['--granularity'],
+                                  parse_store=parse_store)
+    if parse_store is not None:
+        parse_store.save()
+    print_change_impact(result)
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"影响分析结果已保存: {options['--json']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
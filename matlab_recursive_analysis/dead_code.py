@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+死代码与不可达脚本检测
+从配置的入口集合（main.m、GUI启动脚本等）出发对调用图做一次多源遍历，报告：
+- 不可达脚本：任何入口都无法经调用边到达的脚本（可据此裁剪工程、缩小扫描与索引规模）
+- 未被引用的函数：文件内从未调用、也未作为函数句柄（@local_fn）引用的本地/嵌套函数，以及没有任何其他脚本调用或引用的文件主函数
+- 被遮蔽的定义：同名且优先级更高的定义存在，按MATLAB解析规则永远不会被选中的主函数/脚本文件
+全部检查对脚本、调用边与定义各线性扫描一次；判断基于解析到的调用点与函数句柄：
+arrayfun(@cb, x)、set(h, 'Callback', @onClick) 等句柄引用按调用的解析规则解析为引用边（每个文件读取一次），
+obj.method(...) 形式的方法调用无法静态解析，@类目录中的方法随类一起视为可达，classdef方法不参与未引用检查
+"""
+
+import os
+import re
+import json
+import logging
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from script_parser import VISIBLE_SCOPES
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 函数句柄 @name / @pkg.name（匿名函数 @(x) 不匹配）
+_HANDLE_PATTERN = re.compile(rb'@\s*([A-Za-z]\w*(?:\.[A-Za-z]\w*)*)')
+
+
+def match_entry_scripts(scripts: Iterable[str], entry_patterns: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """
+    按入口配置匹配工程中的脚本：脚本路径原样匹配，或按通配符匹配
+    （不含'/'的通配符匹配文件名，如 'launch_*.m'；含'/'时匹配相对路径，如 'gui/*.m'）
+
+    Args:
+        scripts: 工程中的全部脚本
+        entry_patterns: 入口脚本或通配符
+
+    Returns:
+        (匹配到的入口脚本（排序）, 没有匹配到任何脚本的配置项)
+    """
+    scripts = list(scripts)
+    known = set(scripts)
+    matched = set()
+    unmatched: List[str] = []
+    for pattern in entry_patterns:
+        if pattern in known:
+            matched.add(pattern)
+            continue
+        hits = [script for script in scripts
+                if fnmatchcase(script.replace(os.sep, '/') if '/' in pattern else os.path.basename(script), pattern)]
+        if hits:
+            matched.update(hits)
+        else:
+            unmatched.append(pattern)
+    return sorted(matched), unmatched
+
+
+def find_dead_code(analyzer: RecursiveCallAnalyzer, entry_patterns: Sequence[str]) -> Dict:
+    """
+    从入口集合出发检测不可达脚本、未被引用的函数与被遮蔽的定义
+
+    Args:
+        analyzer: 分析器（未解析时先解析并建图）
+        entry_patterns: 入口脚本或通配符（见 match_entry_scripts）
+
+    Returns:
+        {'entry_scripts', 'unmatched_entries', 'unreachable_scripts', 'unreferenced_functions',
+         'shadowed_definitions', 'summary'}
+    """
+    analyzer._ensure_parsed_and_built()
+    parser = analyzer.parser
+    call_graph = analyzer.call_graph
+    entries, unmatched = match_entry_scripts(analyzer.script_functions, entry_patterns)
+    if unmatched:
+        logger.warning(f"以下入口配置没有匹配到脚本: {', '.join(unmatched)}")
+
+    # @类目录 -> 目录中的脚本：obj.method(...) 调用无法解析，到达类的任一脚本时整个类目录可达
+    class_members: Dict[str, List[str]] = {}
+    for script in analyzer.script_functions:
+        _, kind, owner_dir = parser._get_script_location(script)
+        if kind == 'class':
+            class_members.setdefault(owner_dir, []).append(script)
+
+    # 函数句柄：调用点表不记录句柄，按文件内容提取一次，按调用的解析规则解析为引用边
+    with profile_phase('dead code: function handles'):
+        handle_names: Dict[str, Set[str]] = {}
+        handle_edges: Dict[str, Set[str]] = {}
+        for script in analyzer.script_functions:
+            content = parser.read_script_bytes(script)
+            if b'@' not in content:
+                continue
+            names = {match.group(1).decode('ascii') for match in _HANDLE_PATTERN.finditer(content)}
+            handle_names[script] = names
+            for name in names:
+                target = parser.resolve_function_call_with_rule(name, script)[0]
+                if target is not None and target != script:
+                    handle_edges.setdefault(script, set()).add(target)
+        handle_targets = set().union(*handle_edges.values())
+
+    with profile_phase('dead code: reachability'):
+        reachable = set(entries)
+        queue = deque(entries)
+        while queue:
+            script = queue.popleft()
+            _, kind, owner_dir = parser._get_script_location(script)
+            successors = list(call_graph.get(script, ()))
+            successors.extend(handle_edges.get(script, ()))
+            if kind == 'class':
+                successors.extend(class_members.get(owner_dir, ()))
+            for callee in successors:
+                if callee not in reachable:
+                    reachable.add(callee)
+                    queue.append(callee)
+
+    unreachable_scripts: List[Dict] = []
+    for script in sorted(set(analyzer.script_functions) - reachable):
+        stats = parser.file_parse_stats.get(script, {})
+        unreachable_scripts.append({
+            'script': script,
+            'kind': parser._get_script_location(script)[1],
+            'size_bytes': stats.get('size_bytes', 0),
+            'line_count': stats.get('line_count', 0)
+        })
+
+    with profile_phase('dead code: unreferenced functions'):
+        callers_of = analyzer.get_callers_index()
+        entry_set = set(entries)
+        unreferenced_functions: List[Dict] = []
+        for script in sorted(analyzer.script_functions):
+            calls = parser.script_calls.get(script, ())
+            primary = None
+            uncalled: List[Tuple[str, str, int]] = []
+            for func_name in sorted(analyzer.script_functions[script]):
+                info = parser.function_definitions.get(func_name, {}).get(script)
+                scope = parser._get_definition_scope(func_name, script)
+                if scope in ('local', 'nested'):
+                    # 本地/嵌套函数只能被本文件调用，且调用须解析到内部定义（未被import的同名包函数遮蔽）
+                    if func_name in calls and parser.resolve_function_call_with_rule(func_name, script)[1] == 'internal':
+                        continue
+                    uncalled.append((func_name, scope, info.line_number if info else 0))
+                elif scope in VISIBLE_SCOPES and (primary is None or (scope == 'primary' and primary[1] != 'primary')):
+                    primary = (func_name, scope, info.line_number if info else 0)
+            # 作为回调（@local_fn）引用的本地/嵌套函数也算被引用
+            handles = handle_names.get(script, ())
+            for func_name, scope, line in uncalled:
+                if func_name not in handles:
+                    unreferenced_functions.append({'function': func_name, 'script': script,
+                                                   'scope': scope, 'line': line})
+            # 文件主函数（无显式主函数时为脚本文件本身）：没有任何其他脚本调用或以句柄引用且不是入口
+            if primary is not None and script not in entry_set and not callers_of.get(script) \
+                    and script not in handle_targets and parser._get_script_location(script)[1] != 'class':
+                func_name, scope, line = primary
+                unreferenced_functions.append({'function': func_name, 'script': script, 'scope': scope, 'line': line})
+
+    with profile_phase('dead code: shadowed definitions'):
+        shadowed_definitions: List[Dict] = []
+        if parser.scope_aware:
+            tables = ((parser.visible_function_scripts.items(), 'path'),
+                      (((f"{namespace}.{name}", scripts) for (namespace, name), scripts in parser.namespace_index.items()),
+                       'qualified'),
+                      (((name, scripts) for (_, name), scripts in parser.private_index.items()), 'private'))
+        else:
+            tables = ((((func_name, [script for script in scripts
+                                     if parser._get_definition_scope(func_name, script) in VISIBLE_SCOPES])
+                        for func_name, scripts in parser.function_scripts.items()), 'path'),)
+        for items, rule in tables:
+            for func_name, scripts in items:
+                for script in scripts[1:]:
+                    info = parser.function_definitions.get(func_name, {}).get(script)
+                    shadowed_definitions.append({
+                        'function': func_name, 'script': script,
+                        'scope': parser._get_definition_scope(func_name, script),
+                        'line': info.line_number if info else 0,
+                        'shadowed_by': scripts[0], 'rule': rule
+                    })
+        shadowed_definitions.sort(key=lambda record: (record['function'], record['script']))
+
+    summary = {
+        'total_scripts': len(analyzer.script_functions),
+        'entry_scripts': len(entries),
+        'handle_references': sum(len(targets) for targets in handle_edges.values()),
+        'reachable_scripts': len(reachable),
+        'unreachable_scripts': len(unreachable_scripts),
+        'unreachable_bytes': sum(record['size_bytes'] for record in unreachable_scripts),
+        'unreachable_lines': sum(record['line_count'] for record in unreachable_scripts),
+        'unreferenced_functions': len(unreferenced_functions),
+        'shadowed_definitions': len(shadowed_definitions)
+    }
+    logger.info(f"{len(entries)} 个入口可达 {len(reachable)} / {summary['total_scripts']} 个脚本，"
+                f"未引用函数 {len(unreferenced_functions)} 个，被遮蔽定义 {len(shadowed_definitions)} 个")
+    return {
+        'entry_scripts': entries,
+        'unmatched_entries': unmatched,
+        'unreachable_scripts': unreachable_scripts,
+        'unreferenced_functions': unreferenced_functions,
+        'shadowed_definitions': shadowed_definitions,
+        'summary': summary
+    }
+
+
+def print_dead_code_report(report: Dict) -> None:
+    """打印死代码检测结果"""
+    summary = report['summary']
+    print(f"\n=== 死代码检测: {summary['entry_scripts']} 个入口 ===")
+    for entry in report['entry_scripts']:
+        print(f"  {entry}")
+    for pattern in report['unmatched_entries']:
+        print(f"  (未匹配) {pattern}")
+
+    print(f"\n不可达脚本: {summary['unreachable_scripts']} / {summary['total_scripts']} 个"
+          f"（{summary['unreachable_lines']} 行, {summary['unreachable_bytes']} 字节）")
+    for record in report['unreachable_scripts']:
+        print(f"  {record['script']}  [{record['kind']}]")
+
+    print(f"\n未被引用的函数: {summary['unreferenced_functions']} 个")
+    for record in report['unreferenced_functions']:
+        print(f"  {record['script']}:{record['line']}  {record['function']}  [{record['scope']}]")
+
+    print(f"\n被遮蔽的定义: {summary['shadowed_definitions']} 个")
+    for record in report['shadowed_definitions']:
+        print(f"  {record['script']}:{record['line']}  {record['function']}  "
+              f"(被 {record['shadowed_by']} 遮蔽, {record['rule']})")
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "dead_code.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--entry': None, '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 1 or not options['--entry']:
+        print("用法: python dead_code.py <MATLAB工程路径> --entry 入口脚本或通配符,... [--json 输出文件] "
+              "[--profile[=输出文件]]")
+        print("  不含'/'的通配符匹配文件名，含'/'时匹配相对路径")
+        print("示例:")
+        print("  python dead_code.py test_project --entry main.m")
+        print("  python dead_code.py test_project --entry 'main.m,gui/launch_*.m' --json dead_code.json")
+        sys.exit(1)
+
+    project_path = positional[0]
+    if not os.path.exists(project_path):
+        print(f"错误: 路径 {project_path} 不存在")
+        sys.exit(1)
+
+    analyzer = RecursiveCallAnalyzer(project_path)
+    report = find_dead_code(analyzer, options['--entry'].split(','))
+    print_dead_code_report(report)
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"死代码检测结果已保存: {options['--json']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
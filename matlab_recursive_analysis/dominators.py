@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+调用图的支配树与后支配树
+支配树：从入口出发到达目标的每条调用路径都必须经过的脚本（如查看器之前总会执行的 signalsTimeSync.m）；
+后支配树：从脚本出发到达任一叶子（不再调用其他脚本的脚本）的每条路径都必须经过的脚本。
+采用 Cooper–Harvey–Kennedy 迭代算法在入口可达子图的CSR数组上计算直接支配者，
+再为支配树做先序区间编号，dominators/dominates 等查询直接由预计算的树回答，不再枚举路径
+"""
+
+import json
+import logging
+from array import array
+from typing import Dict, List, Optional, Set
+
+from graph_snapshot import build_csr, reverse_csr
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def compute_immediate_dominators(node_count: int, root: int, offsets, targets) -> array:
+    """
+    Cooper–Harvey–Kennedy 迭代算法计算直接支配者
+
+    Args:
+        node_count: 节点数
+        root: 根节点
+        offsets: CSR偏移数组
+        targets: CSR目标数组
+
+    Returns:
+        每个节点的直接支配者（根节点为自身，根不可达的节点为-1）
+    """
+    # 迭代DFS得到后序
+    postorder: List[int] = []
+    visited = bytearray(node_count)
+    visited[root] = 1
+    work = [(root, offsets[root])]
+    while work:
+        node, pos = work[-1]
+        if pos < offsets[node + 1]:
+            work[-1] = (node, pos + 1)
+            succ = targets[pos]
+            if not visited[succ]:
+                visited[succ] = 1
+                work.append((succ, offsets[succ]))
+            continue
+        work.pop()
+        postorder.append(node)
+    post_number = [-1] * node_count
+    for i, node in enumerate(postorder):
+        post_number[node] = i
+
+    pred_offsets, pred_targets = reverse_csr(node_count, offsets, targets)
+    idom = array('i', [-1] * node_count)
+    idom[root] = root
+    reverse_postorder = postorder[-2::-1]  # 逆后序，去掉根
+    changed = True
+    while changed:
+        changed = False
+        for node in reverse_postorder:
+            new_idom = -1
+            for k in range(pred_offsets[node], pred_offsets[node + 1]):
+                pred = pred_targets[k]
+                if idom[pred] == -1:
+                    continue  # 尚未处理或根不可达的前驱
+                if new_idom == -1:
+                    new_idom = pred
+                    continue
+                # 两个手指沿支配树向上走到公共祖先（后序编号小者先走）
+                finger1, finger2 = pred, new_idom
+                while finger1 != finger2:
+                    while post_number[finger1] < post_number[finger2]:
+                        finger1 = idom[finger1]
+                    while post_number[finger2] < post_number[finger1]:
+                        finger2 = idom[finger2]
+                new_idom = finger1
+            if idom[node] != new_idom:
+                idom[node] = new_idom
+                changed = True
+    return idom
+
+
+class DominatorTree:
+    """
+    支配树（或后支配树），按整数编号存储
+    后支配树的根是虚拟出口（名称为None），不出现在查询结果中
+    """
+
+    def __init__(self, entry: str, node_list: List[Optional[str]], idom: array, root: int, post: bool):
+        """
+        Args:
+            entry: 入口脚本
+            node_list: 节点编号 -> 脚本名（后支配树的虚拟出口为None）
+            idom: 直接支配者数组（根为自身，不在树中的节点为-1）
+            root: 根节点编号
+            post: 是否为后支配树
+        """
+        self.entry = entry
+        self.post = post
+        self.node_list = node_list
+        self.node_ids: Dict[str, int] = {name: i for i, name in enumerate(node_list) if name is not None}
+        self._idom = idom
+        self._root = root
+
+        # 子节点表与先序区间：a支配b 当且仅当 b的先序编号落在a的子树区间内
+        node_count = len(node_list)
+        children: List[List[int]] = [[] for _ in range(node_count)]
+        for node in range(node_count):
+            if idom[node] != -1 and node != root:
+                children[idom[node]].append(node)
+        self._children = children
+        self._pre = array('i', [-1] * node_count)
+        self._last = array('i', [-1] * node_count)  # 子树中最大的先序编号
+        counter = 0
+        self._pre[root] = counter
+        work = [(root, 0)]
+        while work:
+            node, pos = work[-1]
+            if pos < len(children[node]):
+                work[-1] = (node, pos + 1)
+                child = children[node][pos]
+                counter += 1
+                self._pre[child] = counter
+                work.append((child, 0))
+                continue
+            work.pop()
+            self._last[node] = counter
+
+    def __contains__(self, script: str) -> bool:
+        node = self.node_ids.get(script)
+        return node is not None and self._idom[node] != -1
+
+    def __len__(self) -> int:
+        return sum(1 for name, dominator in zip(self.node_list, self._idom) if name is not None and dominator != -1)
+
+    def immediate_dominator(self, script: str) -> Optional[str]:
+        """
+        直接支配者（后支配树中为直接后支配者）
+
+        Returns:
+            脚本名；script为根、只被虚拟出口后支配或不在树中时返回None
+        """
+        if script not in self:
+            return None
+        node = self.node_ids[script]
+        if node == self._root:
+            return None
+        return self.node_list[self._idom[node]]
+
+    def dominators(self, script: str) -> List[str]:
+        """
+        严格支配script的全部脚本（不含script本身）
+        支配树按从入口到script的顺序返回；后支配树按从script出发的执行顺序（最近的在前）返回
+
+        Args:
+            script: 目标脚本
+
+        Returns:
+            脚本列表；script不在树中时为空列表
+        """
+        if script not in self:
+            return []
+        chain: List[str] = []
+        node = self.node_ids[script]
+        while node != self._root:
+            node = self._idom[node]
+            if self.node_list[node] is not None:
+                chain.append(self.node_list[node])
+        return chain if self.post else chain[::-1]
+
+    def dominates(self, dominator: str, script: str) -> bool:
+        """dominator是否支配script（自身支配自身；O(1)）"""
+        if dominator not in self or script not in self:
+            return False
+        a = self.node_ids[dominator]
+        b = self.node_ids[script]
+        return self._pre[a] <= self._pre[b] <= self._last[a]
+
+    def children(self, script: str) -> List[str]:
+        """支配树中直接被script支配的脚本（排序）"""
+        if script not in self:
+            return []
+        return sorted(self.node_list[child] for child in self._children[self.node_ids[script]])
+
+    def dominated_scripts(self, script: str) -> List[str]:
+        """
+        被script严格支配的全部脚本（支配树中的子树，排序）
+        支配树中即只能经过script才能从入口到达的脚本
+        """
+        if script not in self:
+            return []
+        dominated: List[str] = []
+        stack = list(self._children[self.node_ids[script]])
+        while stack:
+            node = stack.pop()
+            dominated.append(self.node_list[node])
+            stack.extend(self._children[node])
+        return sorted(dominated)
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """脚本 -> 直接支配者（根、只被虚拟出口后支配的脚本为None）"""
+        return {name: self.immediate_dominator(name) for name in self.node_list if name is not None and name in self}
+
+
+def build_dominator_tree(call_graph: Dict[str, Set[str]], entry: str, reachable: Set[str],
+                         post: bool = False) -> DominatorTree:
+    """
+    在入口可达子图上计算支配树或后支配树
+
+    后支配树以虚拟出口为根：叶子脚本连到出口；调用环中无法到达任何叶子的脚本（如只互相调用的一组脚本）
+    也直接连到出口，使每个可达脚本都在树中
+
+    Args:
+        call_graph: 脚本 -> 被调用脚本集合
+        entry: 入口脚本
+        reachable: 从入口可达的脚本（含入口）
+        post: True计算后支配树
+
+    Returns:
+        DominatorTree
+    """
+    node_list, offsets, targets = build_csr({script: call_graph.get(script, ()) for script in reachable}, reachable)
+    node_count = len(node_list)
+    if not post:
+        idom = compute_immediate_dominators(node_count, node_list.index(entry), offsets, targets)
+        return DominatorTree(entry, node_list, idom, node_list.index(entry), post)
+
+    # 能到达叶子的脚本：从叶子出发沿反向边遍历
+    pred_offsets, pred_targets = reverse_csr(node_count, offsets, targets)
+    exits = [node for node in range(node_count) if offsets[node] == offsets[node + 1]]
+    reaches_leaf = bytearray(node_count)
+    stack = list(exits)
+    for node in exits:
+        reaches_leaf[node] = 1
+    while stack:
+        node = stack.pop()
+        for k in range(pred_offsets[node], pred_offsets[node + 1]):
+            pred = pred_targets[k]
+            if not reaches_leaf[pred]:
+                reaches_leaf[pred] = 1
+                stack.append(pred)
+    exits.extend(node for node in range(node_count) if not reaches_leaf[node])
+    exits.sort()
+
+    # 反向图加虚拟出口（编号node_count）：出口 -> 各出口脚本，脚本 -> 它的调用者
+    exit_node = node_count
+    rev_offsets = array('i', [0])
+    rev_targets = array('i')
+    for node in range(node_count):
+        rev_targets.extend(pred_targets[pred_offsets[node]:pred_offsets[node + 1]])
+        rev_offsets.append(len(rev_targets))
+    rev_targets.extend(exits)
+    rev_offsets.append(len(rev_targets))
+    idom = compute_immediate_dominators(node_count + 1, exit_node, rev_offsets, rev_targets)
+    return DominatorTree(entry, node_list + [None], idom, exit_node, post)
+
+
+def print_dominator_report(tree: DominatorTree, post_tree: DominatorTree, targets: List[str]) -> None:
+    """打印目标脚本的支配者与后支配者；未指定目标时打印支配树"""
+    if not targets:
+        print(f"\n=== 支配树: {tree.entry}（{len(tree)} 个可达脚本）===")
+        stack = [(tree.entry, 0)]
+        while stack:
+            script, depth = stack.pop()
+            print(f"{'  ' * depth}{script}")
+            stack.extend((child, depth + 1) for child in reversed(tree.children(script)))
+        return
+
+    for target in targets:
+        print(f"\n=== {tree.entry} -> {target} ===")
+        if target not in tree:
+            print("  从入口不可达")
+            continue
+        print(f"必经脚本（入口到目标的每条路径都经过）: {' -> '.join(tree.dominators(target)) or '(无)'}")
+        print(f"之后必经脚本（目标到叶子的每条路径都经过）: {' -> '.join(post_tree.dominators(target)) or '(无)'}")
+        dominated = tree.dominated_scripts(target)
+        print(f"只能经过目标到达的脚本: {len(dominated)} 个")
+        for script in dominated:
+            print(f"  {script}")
+
+
+def main():
+    """主函数"""
+    import os
+    import sys
+    from recursive_call_analyzer import GRANULARITIES, RecursiveCallAnalyzer
+
+    argv, profile_output = pop_profile_option(sys.argv, "dominators.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--granularity': 'script', '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) not in (2, 3):
+        print("用法: python dominators.py <MATLAB工程路径> <入口脚本> [目标脚本,...] [--granularity script|function] "
+              "[--json 输出文件] [--profile[=输出文件]]")
+        print("  未指定目标脚本时打印整棵支配树；函数粒度下节点记为 '脚本>函数'，入口脚本取其入口函数")
+        print("示例:")
+        print("  python dominators.py test_project main.m")
+        print("  python dominators.py test_project main.m display.m,utils.m")
+        print("  python dominators.py test_project main.m 'display.m>show_details' --granularity function")
+        sys.exit(1)
+
+    project_path, entry = positional[:2]
+    targets = positional[2].split(',') if len(positional) == 3 else []
+    if not os.path.exists(project_path):
+        print(f"错误: 路径 {project_path} 不存在")
+        sys.exit(1)
+
+    granularity = options['--granularity']
+    if granularity not in GRANULARITIES:
+        print(f"错误: 未知的图粒度 {granularity}（可选 {', '.join(GRANULARITIES)}）")
+        sys.exit(1)
+
+    analyzer = RecursiveCallAnalyzer(project_path)
+    with profile_phase('dominators: build trees'):
+        tree = analyzer.get_dominator_tree(entry, granularity=granularity)
+        post_tree = analyzer.get_dominator_tree(entry, post=True, granularity=granularity)
+    if tree is None:
+        print(f"错误: 入口脚本 {entry} 不在工程中")
+        sys.exit(1)
+    if granularity == 'function':
+        targets = [analyzer.get_function_graph().resolve_entry(target) or target for target in targets]
+    print_dominator_report(tree, post_tree, targets)
+
+    result = {
+        'entry': tree.entry,
+        'granularity': granularity,
+        'immediate_dominators': tree.to_dict(),
+        'immediate_post_dominators': post_tree.to_dict(),
+        'targets': {target: {'dominators': tree.dominators(target), 'post_dominators': post_tree.dominators(target),
+                             'dominated_scripts': tree.dominated_scripts(target)} for target in targets}
+    }
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"支配关系已保存: {options['--json']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+调用边来源记录
+为脚本级调用图的每条边记录产生它的函数名、调用点行列号与解析规则，
+以平行整数数组存放，无需重新读取和解析源文件即可回答“A为什么调用B”
+"""
+
+import logging
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from script_parser import RESOLUTION_RULES
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_RULE_IDS = {rule: i for i, rule in enumerate(RESOLUTION_RULES)}
+
+
+class EdgeProvenance:
+    """调用边来源表：每条边一行，保留位置最靠前的调用点"""
+
+    def __init__(self):
+        self.function_names: List[str] = []  # 函数编号 -> 函数名
+        self._function_ids: Dict[str, int] = {}
+        self.edge_rows: Dict[Tuple[str, str], int] = {}  # (调用脚本, 被调用脚本) -> 行号
+        # 平行数组，下标为行号
+        self.functions = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+        self.rules = array('b')
+
+    def __len__(self) -> int:
+        return len(self.edge_rows)
+
+    def _function_id(self, func_name: str) -> int:
+        func_id = self._function_ids.get(func_name)
+        if func_id is None:
+            func_id = len(self.function_names)
+            self._function_ids[func_name] = func_id
+            self.function_names.append(func_name)
+        return func_id
+
+    def record(self, caller: str, callee: str, func_name: str, line: int, column: int, rule: str) -> None:
+        """
+        记录一次产生调用边的函数调用；同一条边只保留位置最靠前的调用点（与集合遍历顺序无关）
+
+        Args:
+            caller: 调用脚本
+            callee: 被调用脚本
+            func_name: 调用的函数名
+            line: 调用点行号（未知时为0）
+            column: 调用点列号（未知时为0）
+            rule: 解析规则名（RESOLUTION_RULES之一）
+        """
+        key = (caller, callee)
+        row = self.edge_rows.get(key)
+        if row is None:
+            self.edge_rows[key] = len(self.functions)
+            self.functions.append(self._function_id(func_name))
+            self.lines.append(line)
+            self.columns.append(column)
+            self.rules.append(_RULE_IDS[rule])
+            return
+        current = (self.lines[row], self.columns[row], self.function_names[self.functions[row]])
+        if (line, column, func_name) < current:
+            self.functions[row] = self._function_id(func_name)
+            self.lines[row] = line
+            self.columns[row] = column
+            self.rules[row] = _RULE_IDS[rule]
+
+    def forget(self, caller: str, callees) -> None:
+        """
+        删除调用脚本的出边记录（增量更新重新建边前调用；数组中的旧行不再被引用，不做压缩）
+
+        Args:
+            caller: 调用脚本
+            callees: 该脚本原有的被调用脚本
+        """
+        for callee in callees:
+            self.edge_rows.pop((caller, callee), None)
+
+    def explain(self, caller: str, callee: str) -> Optional[Dict]:
+        """
+        查询调用边的来源
+
+        Args:
+            caller: 调用脚本
+            callee: 被调用脚本
+
+        Returns:
+            {'caller', 'callee', 'function', 'line', 'column', 'rule'}，边不存在时返回None
+        """
+        row = self.edge_rows.get((caller, callee))
+        if row is None:
+            return None
+        return {
+            'caller': caller,
+            'callee': callee,
+            'function': self.function_names[self.functions[row]],
+            'line': self.lines[row],
+            'column': self.columns[row],
+            'rule': RESOLUTION_RULES[self.rules[row]]
+        }
+
+    def edges_from(self, caller: str, callees) -> List[Dict]:
+        """按被调用脚本顺序返回调用脚本全部出边的来源"""
+        return [info for info in (self.explain(caller, callee) for callee in sorted(callees)) if info]
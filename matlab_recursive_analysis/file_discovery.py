@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+MATLAB源文件发现
+基于os.scandir单次遍历工程目录，按包含/排除通配符与.gitignore规则提前剪枝，
+直接产出相对路径和stat信息，供解析与指纹计算使用
+"""
+
+import os
+import re
+import logging
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCLUDE_PATTERNS: Tuple[str, ...] = ('*.m',)
+
+# 不含有用MATLAB源码的目录：版本库元数据、Simulink缓存与代码生成目录
+DEFAULT_EXCLUDE_PATTERNS: Tuple[str, ...] = (
+    '.git', '.svn', '.hg',
+    'slprj', 'codegen', '*_rtw', '*_ert_rtw', '*_grt_rtw',
+    '__pycache__',
+)
+
+
+class DiscoveredFile(NamedTuple):
+    """发现的源文件"""
+    relative_path: str  # 相对工程根目录的路径（与 str(Path.relative_to()) 一致）
+    absolute_path: str
+    size: int
+    mtime_ns: int
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """将gitignore风格通配符转换为正则（支持 **、*、?、[...]）"""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 3] == '**/':
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRule(NamedTuple):
+    """单条忽略规则"""
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool  # 含'/'的规则相对于所在.gitignore目录匹配完整路径，否则只匹配名称
+
+
+def parse_ignore_lines(lines: Sequence[str]) -> List[IgnoreRule]:
+    """
+    解析.gitignore风格的规则
+
+    Args:
+        lines: 规则文本行
+
+    Returns:
+        规则列表（按出现顺序，后面的规则优先）
+    """
+    rules = []
+    for raw in lines:
+        line = raw.rstrip('\n').rstrip('\r')
+        if not line.strip() or line.startswith('#'):
+            continue
+        line = line.rstrip(' ') if not line.endswith('\\ ') else line
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        if line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        anchored = '/' in line
+        line = line.lstrip('/')
+        rules.append(IgnoreRule(re.compile(_glob_to_regex(line) + r'\Z'), negate, dir_only, anchored))
+    return rules
+
+
+def _is_ignored(rule_sets: List[Tuple[str, List[IgnoreRule]]], rel_posix: str, name: str, is_dir: bool) -> Optional[bool]:
+    """按从浅到深的顺序应用规则，最后一条匹配的规则生效；无匹配时返回None"""
+    result = None
+    for base, rules in rule_sets:
+        if base:
+            if not rel_posix.startswith(base + '/'):
+                continue
+            local = rel_posix[len(base) + 1:]
+        else:
+            local = rel_posix
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            target = local if rule.anchored else name
+            if rule.regex.match(target):
+                result = not rule.negate
+    return result
+
+
+def discover_matlab_files(root: str,
+                          include_patterns: Sequence[str] = DEFAULT_INCLUDE_PATTERNS,
+                          exclude_patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS,
+                          use_gitignore: bool = True,
+                          dir_mtimes: Optional[Dict[str, int]] = None) -> Iterator[DiscoveredFile]:
+    """
+    单次遍历工程目录，产出匹配的源文件
+
+    Args:
+        root: 工程根目录
+        include_patterns: 文件名包含通配符
+        exclude_patterns: 排除通配符（不含'/'时匹配文件/目录名，含'/'时匹配相对路径），被排除的目录整体剪枝
+        use_gitignore: 是否应用各级目录中的.gitignore
+        dir_mtimes: 若提供，记录遍历到的每个目录的修改时间（相对目录 -> mtime_ns，根目录为'.'）
+
+    Yields:
+        DiscoveredFile
+    """
+    exclude_sets = [('', parse_ignore_lines(list(exclude_patterns)))]
+    root = os.fspath(root)
+    if dir_mtimes is not None:
+        dir_mtimes['.'] = os.stat(root).st_mtime_ns
+
+    # 栈元素: (绝对目录, 相对目录(os.sep), 相对目录(posix), 生效的gitignore规则集)
+    stack = [(root, '', '', [])]
+    while stack:
+        abs_dir, rel_dir, rel_posix_dir, rule_sets = stack.pop()
+        if use_gitignore:
+            gitignore = os.path.join(abs_dir, '.gitignore')
+            if os.path.isfile(gitignore):
+                try:
+                    with open(gitignore, 'r', encoding='utf-8', errors='ignore') as f:
+                        rules = parse_ignore_lines(f.readlines())
+                    if rules:
+                        rule_sets = rule_sets + [(rel_posix_dir, rules)]
+                except OSError as e:
+                    logger.warning(f"读取 {gitignore} 失败: {e}")
+
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = list(it)
+        except OSError as e:
+            logger.warning(f"无法读取目录 {abs_dir}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            rel_path = os.path.join(rel_dir, name) if rel_dir else name
+            rel_posix = f"{rel_posix_dir}/{name}" if rel_posix_dir else name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if _is_ignored(exclude_sets, rel_posix, name, is_dir):
+                continue
+            if rule_sets and _is_ignored(rule_sets, rel_posix, name, is_dir):
+                continue
+
+            if is_dir:
+                if dir_mtimes is not None:
+                    try:
+                        dir_mtimes[rel_path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                    except OSError:
+                        pass
+                subdirs.append((entry.path, rel_path, rel_posix, rule_sets))
+                continue
+
+            if not any(fnmatchcase(name, pattern) for pattern in include_patterns):
+                continue
+            try:
+                st = entry.stat()
+            except OSError as e:
+                logger.warning(f"无法获取文件信息 {entry.path}: {e}")
+                continue
+            yield DiscoveredFile(rel_path, entry.path, st.st_size, st.st_mtime_ns)
+
+        # 逆序入栈，使目录按名称顺序展开
+        stack.extend(sorted(subdirs, reverse=True))
+
+
+def filter_source_paths(paths: Iterable[str],
+                        include_patterns: Sequence[str] = DEFAULT_INCLUDE_PATTERNS,
+                        exclude_patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS) -> Iterator[str]:
+    """
+    按与 discover_matlab_files 相同的包含/排除规则过滤不在磁盘上的文件列表（如git树中的路径）
+
+    Args:
+        paths: posix风格的相对路径
+        include_patterns: 文件名包含通配符
+        exclude_patterns: 排除通配符，任一上级目录被排除时文件也被排除
+
+    Yields:
+        保留的路径（保持输入顺序）
+    """
+    exclude_sets = [('', parse_ignore_lines(list(exclude_patterns)))]
+    excluded_dirs: Dict[str, bool] = {}
+    for path in paths:
+        parts = path.split('/')
+        name = parts[-1]
+        if not any(fnmatchcase(name, pattern) for pattern in include_patterns):
+            continue
+        excluded = False
+        for depth in range(1, len(parts)):
+            directory = '/'.join(parts[:depth])
+            if directory not in excluded_dirs:
+                excluded_dirs[directory] = bool(_is_ignored(exclude_sets, directory, parts[depth - 1], True))
+            if excluded_dirs[directory]:
+                excluded = True
+                break
+        if not excluded and not _is_ignored(exclude_sets, path, name, False):
+            yield path
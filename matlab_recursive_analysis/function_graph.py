@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+函数级调用图
+节点为 (脚本, 函数)，按MATLAB表示本地函数的写法记为 '脚本>函数'（如 'utils.m>print_info'），
+脚本文件顶层代码与文件主函数合为该脚本的入口函数节点。
+每个调用点先按所在行归入调用它的函数，再按与脚本级调用图相同的MATLAB作用域与优先级规则解析被调用函数：
+内部定义解析到本文件的本地/嵌套函数，其他文件解析到被调用文件的入口函数。
+邻接关系以CSR整数数组存储，每条边的来源（函数名、调用点、规则）沿用 EdgeProvenance
+"""
+
+import os
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from edge_provenance import EdgeProvenance
+from graph_snapshot import build_csr, reverse_csr
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 脚本与函数名之间的分隔符（与MATLAB的 'file>localfn' 写法一致，函数名中不会出现）
+FUNCTION_NODE_SEPARATOR = '>'
+
+
+def function_node(script: str, func_name: str) -> str:
+    """由脚本与函数名得到函数级节点名"""
+    return f"{script}{FUNCTION_NODE_SEPARATOR}{func_name}"
+
+
+def split_function_node(node: str) -> Tuple[str, str]:
+    """函数级节点名 -> (脚本, 函数名)"""
+    script, _, func_name = node.rpartition(FUNCTION_NODE_SEPARATOR)
+    return script, func_name
+
+
+class _CSRAdjacency(Mapping):
+    """CSR数组的只读邻接字典视图：节点名 -> 被调用节点名列表（供按字典遍历的查询直接使用）"""
+
+    def __init__(self, graph: 'FunctionCallGraph'):
+        self._graph = graph
+
+    def __getitem__(self, node: str) -> List[str]:
+        node_id = self._graph.node_ids[node]
+        return self._graph._names_in(self._graph.offsets, self._graph.targets, node_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._graph.node_list)
+
+    def __len__(self) -> int:
+        return len(self._graph.node_list)
+
+
+class FunctionCallGraph:
+    """
+    函数级调用图
+    节点按名称排序编号，同一脚本的节点编号连续；出边为CSR (offsets, targets)，反向边按需建立
+    """
+
+    def __init__(self, node_list: List[str], offsets: array, targets: array,
+                 edge_provenance: EdgeProvenance, entry_nodes: Dict[str, str]):
+        """
+        Args:
+            node_list: 排序后的节点名
+            offsets: CSR偏移数组
+            targets: CSR目标数组
+            edge_provenance: 每条边的来源（以节点名为键）
+            entry_nodes: 脚本 -> 入口函数节点
+        """
+        self.node_list = node_list
+        self.node_ids: Dict[str, int] = {name: i for i, name in enumerate(node_list)}
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_provenance = edge_provenance
+        self.entry_nodes = entry_nodes
+        self.adjacency = _CSRAdjacency(self)
+        self._reverse: Optional[Tuple[array, array]] = None
+        self._callers_index: Optional[Dict[str, List[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.node_list)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.node_ids
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def _names_in(self, offsets, targets, node_id: int) -> List[str]:
+        return [self.node_list[targets[k]] for k in range(offsets[node_id], offsets[node_id + 1])]
+
+    def successors(self, node: str) -> List[str]:
+        """被节点直接调用的节点（排序；节点不存在时为空列表）"""
+        node_id = self.node_ids.get(node)
+        return [] if node_id is None else self._names_in(self.offsets, self.targets, node_id)
+
+    def predecessors(self, node: str) -> List[str]:
+        """直接调用节点的节点（排序；节点不存在时为空列表）"""
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            return []
+        if self._reverse is None:
+            self._reverse = reverse_csr(len(self.node_list), self.offsets, self.targets)
+        return self._names_in(*self._reverse, node_id)
+
+    def get_callers_index(self) -> Dict[str, List[str]]:
+        """反向调用索引：被调用节点 -> 直接调用它的节点（首次使用时由反向CSR一次建立）"""
+        if self._callers_index is None:
+            if self._reverse is None:
+                self._reverse = reverse_csr(len(self.node_list), self.offsets, self.targets)
+            rev_offsets, rev_targets = self._reverse
+            self._callers_index = {self.node_list[node_id]: self._names_in(rev_offsets, rev_targets, node_id)
+                                   for node_id in range(len(self.node_list))
+                                   if rev_offsets[node_id] != rev_offsets[node_id + 1]}
+        return self._callers_index
+
+    def script_nodes(self, script: str) -> List[str]:
+        """脚本中的全部函数节点（同一脚本的节点在排序后的节点表中连续）"""
+        prefix = script + FUNCTION_NODE_SEPARATOR
+        start = bisect_left(self.node_list, prefix)
+        end = start
+        while end < len(self.node_list) and self.node_list[end].startswith(prefix) \
+                and FUNCTION_NODE_SEPARATOR not in self.node_list[end][len(prefix):]:
+            end += 1
+        return self.node_list[start:end]
+
+    def resolve_entry(self, name: str) -> Optional[str]:
+        """查询起点：函数节点原样返回，脚本名取其入口函数节点；都不是时返回None"""
+        if name in self.node_ids:
+            return name
+        return self.entry_nodes.get(name)
+
+    def resolve_targets(self, names: Iterable[str]) -> List[str]:
+        """查询目标：函数节点原样保留，脚本名展开为脚本中的全部函数节点（不存在的忽略）"""
+        nodes: List[str] = []
+        for name in names:
+            if name in self.node_ids:
+                nodes.append(name)
+            elif name in self.entry_nodes:
+                nodes.extend(self.script_nodes(name))
+        return nodes
+
+    def explain(self, caller: str, callee: str) -> Optional[Dict]:
+        """函数级调用边的来源 {'caller', 'callee', 'function', 'line', 'column', 'rule'}，边不存在时返回None"""
+        return self.edge_provenance.explain(caller, callee)
+
+
+def _entry_function(parser, script: str) -> str:
+    """
+    脚本的入口函数：显式主函数，否则为脚本文件本身（文件名映射的函数名），
+    classdef文件取与文件同名的方法（构造函数）
+    """
+    names = parser.script_functions.get(script, ())
+    stem = os.path.splitext(os.path.basename(script))[0]
+    for scope in ('primary', 'script'):
+        candidates = [name for name in names if parser._get_definition_scope(name, script) == scope]
+        if candidates:
+            return min(candidates)
+    return next((name for name in names if name.rpartition('.')[2] == stem), stem)
+
+
+def build_function_graph(parser) -> FunctionCallGraph:
+    """
+    由解析结果建立函数级调用图
+
+    Args:
+        parser: 已完成扫描与解析索引的 ImprovedMATLABScriptParser
+
+    Returns:
+        FunctionCallGraph
+    """
+    entry_nodes = {script: function_node(script, _entry_function(parser, script)) for script in parser.script_functions}
+    nodes: Set[str] = set(entry_nodes.values())
+    for script, names in parser.script_functions.items():
+        for func_name in names:
+            info = parser.function_definitions.get(func_name, {}).get(script)
+            if info is not None and info.definition_type == 'explicit_function':
+                nodes.add(function_node(script, func_name))
+
+    edges: Dict[str, Set[str]] = {}
+    provenance = EdgeProvenance()
+    for script, calls in parser.script_calls.items():
+        sites = parser.script_call_sites.get(script)
+        for func_call in calls:
+            called_script, rule = parser.resolve_function_call_with_rule(func_call, script)
+            if called_script is None:
+                continue
+            # 调用名是被调用文件中的显式定义时指向该函数（内部调用的本地/嵌套函数），否则进入文件的入口函数
+            info = parser.function_definitions.get(func_call, {}).get(called_script)
+            if info is not None and info.definition_type == 'explicit_function':
+                callee = function_node(called_script, func_call)
+            else:
+                callee = entry_nodes[called_script]
+            for line, column in (sites.sites(func_call) if sites else None) or [(0, 0)]:
+                enclosing = parser.get_enclosing_function(script, line) if line else None
+                caller = function_node(script, enclosing) if enclosing else entry_nodes[script]
+                if caller == callee:
+                    continue  # 递归调用自身不建边（与脚本级调用图一致）
+                edges.setdefault(caller, set()).add(callee)
+                provenance.record(caller, callee, func_call, line, column, rule)
+
+    node_list, offsets, targets = build_csr(edges, nodes)
+    logger.info(f"函数级调用图建立完成: {len(node_list)} 个函数节点, {len(targets)} 条调用边")
+    return FunctionCallGraph(node_list, offsets, targets, provenance, entry_nodes)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+git版本库作为解析源
+直接从对象库读取指定版本（tag/分支/提交）的.m文件：git ls-tree 列出blob，
+再经一个常驻的 git cat-file --batch 进程流式读取内容，无需检出工作区或复制仓库
+"""
+
+import os
+import threading
+import subprocess
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from file_discovery import DEFAULT_EXCLUDE_PATTERNS, DEFAULT_INCLUDE_PATTERNS, filter_source_paths
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 普通文件的git模式（跳过符号链接120000与子模块160000）
+_FILE_MODES = (b'100644', b'100755')
+
+
+class GitSourceError(RuntimeError):
+    """git命令执行失败或对象不存在"""
+
+
+class GitBlob(NamedTuple):
+    """git树中的源文件"""
+    relative_path: str  # 相对工程目录的路径（os.sep分隔，与磁盘扫描的脚本名一致）
+    oid: str
+    size: int
+
+    @property
+    def version_stamp(self) -> int:
+        """由blob id导出的版本标记，在指纹/编码缓存中代替mtime：内容变化时必然变化"""
+        return int(self.oid[:15], 16)
+
+
+def _run_git(repo: str, *args: str) -> bytes:
+    try:
+        result = subprocess.run(['git', '-C', os.fspath(repo)] + list(args),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except FileNotFoundError as e:
+        raise GitSourceError(f"未找到git命令: {e}")
+    except subprocess.CalledProcessError as e:
+        raise GitSourceError(f"git {' '.join(args)} 失败: {e.stderr.decode('utf-8', errors='replace').strip()}")
+    return result.stdout
+
+
+def resolve_tree(repo: str, revision: str) -> str:
+    """
+    解析版本对应的树对象id（同一内容的不同tag/提交得到相同的id）
+
+    Args:
+        repo: 仓库内的目录
+        revision: tag、分支名或提交id
+
+    Returns:
+        工程目录在该版本中的树对象id
+    """
+    prefix = _run_git(repo, 'rev-parse', '--show-prefix').decode('utf-8').strip()
+    spec = f"{revision}:{prefix}" if prefix else f"{revision}^{{tree}}"
+    return _run_git(repo, 'rev-parse', '--verify', spec).decode('ascii').strip()
+
+
+def list_matlab_blobs(repo: str, revision: str,
+                      include_patterns: Sequence[str] = DEFAULT_INCLUDE_PATTERNS,
+                      exclude_patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS) -> List[GitBlob]:
+    """
+    列出版本中工程目录下匹配的源文件（不读取内容）
+
+    Args:
+        repo: 工程目录（位于git仓库内，可以是子目录）
+        revision: tag、分支名或提交id
+        include_patterns: 文件名包含通配符
+        exclude_patterns: 排除通配符（版本中已提交的文件不再应用.gitignore）
+
+    Returns:
+        按相对路径排序的GitBlob列表
+    """
+    output = _run_git(repo, 'ls-tree', '-r', '-z', '--long', revision)
+    entries: Dict[str, Tuple[str, int]] = {}
+    for record in output.split(b'\0'):
+        if not record:
+            continue
+        meta, _, path = record.partition(b'\t')
+        mode, obj_type, oid, size = meta.split()
+        if obj_type != b'blob' or mode not in _FILE_MODES:
+            continue
+        entries[path.decode('utf-8', errors='surrogateescape')] = (oid.decode('ascii'), int(size))
+
+    blobs = []
+    for path in filter_source_paths(sorted(entries), include_patterns, exclude_patterns):
+        oid, size = entries[path]
+        blobs.append(GitBlob(path.replace('/', os.sep), oid, size))
+    return blobs
+
+
+class GitChange(NamedTuple):
+    """两个版本之间的源文件变化"""
+    status: str  # 'added' / 'modified' / 'deleted' / 'renamed'
+    path: str  # 相对工程目录的路径（删除时为旧路径），os.sep分隔
+    old_path: Optional[str] = None  # 重命名前的路径
+
+
+def resolve_range(repo: str, range_spec: str) -> Tuple[str, str]:
+    """
+    解析版本范围
+
+    Args:
+        repo: 仓库内的目录
+        range_spec: 'base..head'、'base...head'（以两者的合并基础为base）或单个版本（与HEAD比较）
+
+    Returns:
+        (base, head)
+    """
+    if '...' in range_spec:
+        base, _, head = range_spec.partition('...')
+        head = head or 'HEAD'
+        base = _run_git(repo, 'merge-base', base or 'HEAD', head).decode('ascii').strip()
+        return base, head
+    if '..' in range_spec:
+        base, _, head = range_spec.partition('..')
+        return base or 'HEAD', head or 'HEAD'
+    return range_spec, 'HEAD'
+
+
+def list_changed_files(repo: str, base: str, head: str,
+                       include_patterns: Sequence[str] = DEFAULT_INCLUDE_PATTERNS,
+                       exclude_patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS) -> List[GitChange]:
+    """
+    列出两个版本之间工程目录下源文件的变化（含重命名检测）
+
+    Args:
+        repo: 工程目录（位于git仓库内，可以是子目录；只比较该目录下的文件）
+        base: 旧版本
+        head: 新版本
+        include_patterns: 文件名包含通配符
+        exclude_patterns: 排除通配符
+
+    Returns:
+        按路径排序的GitChange列表；只有一侧是源文件的重命名按新增或删除处理
+    """
+    output = _run_git(repo, 'diff', '--name-status', '-z', '-M', '--relative', base, head, '--')
+    records = []
+    fields = output.split(b'\0')
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i].decode('ascii')
+        path_count = 2 if status[0] in 'RC' else 1
+        paths = [path.decode('utf-8', errors='surrogateescape')
+                 for path in fields[i + 1:i + 1 + path_count]]
+        records.append((status[0], paths))
+        i += 1 + path_count
+
+    matching = set(filter_source_paths(sorted({path for _, paths in records for path in paths}),
+                                       include_patterns, exclude_patterns))
+    changes = []
+    for status, paths in records:
+        old_path, new_path = paths[0], paths[-1]
+        if status == 'R' and old_path in matching and new_path in matching:
+            changes.append(GitChange('renamed', new_path.replace('/', os.sep), old_path.replace('/', os.sep)))
+            continue
+        if status == 'R' and old_path in matching:
+            changes.append(GitChange('deleted', old_path.replace('/', os.sep)))
+        if new_path not in matching:
+            continue
+        if status in 'ARC':
+            changes.append(GitChange('added', new_path.replace('/', os.sep)))
+        elif status == 'D':
+            changes.append(GitChange('deleted', new_path.replace('/', os.sep)))
+        else:
+            changes.append(GitChange('modified', new_path.replace('/', os.sep)))
+    changes.sort(key=lambda change: change.path)
+    return changes
+
+
+class GitBlobReader:
+    """常驻的 git cat-file --batch 进程：按blob id读取内容"""
+
+    def __init__(self, repo: str):
+        self.repo = os.fspath(repo)
+        self._process: Optional[subprocess.Popen] = None
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            try:
+                self._process = subprocess.Popen(['git', '-C', self.repo, 'cat-file', '--batch'],
+                                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            except FileNotFoundError as e:
+                raise GitSourceError(f"未找到git命令: {e}")
+        return self._process
+
+    def _read_reply(self, process: subprocess.Popen, oid: str) -> bytes:
+        header = process.stdout.readline()
+        if not header:
+            raise GitSourceError("git cat-file 进程意外退出")
+        parts = header.split()
+        if len(parts) != 3:
+            raise GitSourceError(f"无法读取对象 {oid}: {header.decode('utf-8', errors='replace').strip()}")
+        size = int(parts[2])
+        data = process.stdout.read(size)
+        process.stdout.read(1)  # 内容后的换行
+        return data
+
+    def read(self, oid: str) -> bytes:
+        """
+        读取单个blob
+
+        Args:
+            oid: blob id
+
+        Returns:
+            blob内容
+        """
+        process = self._start()
+        process.stdin.write(oid.encode('ascii') + b'\n')
+        process.stdin.flush()
+        return self._read_reply(process, oid)
+
+    def read_many(self, oids: Iterable[str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        按顺序流式读取多个blob：请求由后台线程连续写入，读取与git输出重叠，不逐个等待往返
+
+        Args:
+            oids: blob id序列
+
+        Yields:
+            (blob id, 内容)
+        """
+        oids = list(oids)
+        process = self._start()
+
+        def feed():
+            try:
+                for oid in oids:
+                    process.stdin.write(oid.encode('ascii') + b'\n')
+                process.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                pass
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        try:
+            for oid in oids:
+                yield oid, self._read_reply(process, oid)
+        finally:
+            writer.join()
+
+    def close(self) -> None:
+        """结束cat-file进程（下次读取时自动重新启动）"""
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.stdout.close()
+            process.wait()
+
+
+class GitSourceLines:
+    """按字节偏移读取版本中源文件的行（与 source_reader.SourceLineCache 接口一致）"""
+
+    def __init__(self, reader: GitBlobReader, capacity: int = 16):
+        """
+        Args:
+            reader: blob读取器
+            capacity: 缓存的blob数上限
+        """
+        self.reader = reader
+        self.capacity = capacity
+        self.blob_ids: Dict[str, str] = {}  # 脚本 -> blob id
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def read_line(self, script_name: str, offset: int, encoding: str = 'utf-8') -> str:
+        """
+        读取从字节偏移开始的一行（去掉首尾空白）
+
+        Args:
+            script_name: 相对工程目录的脚本名
+            offset: 行首字节偏移
+            encoding: 文件编码
+
+        Returns:
+            行内容；脚本不在版本中或偏移越界时返回''
+        """
+        oid = self.blob_ids.get(script_name)
+        if oid is None or offset < 0:
+            return ''
+        data = self._blobs.get(oid)
+        if data is None:
+            try:
+                data = self.reader.read(oid)
+            except GitSourceError as e:
+                logger.warning(f"读取 {script_name} 失败: {e}")
+                return ''
+            self._blobs[oid] = data
+            if len(self._blobs) > self.capacity:
+                self._blobs.popitem(last=False)
+        else:
+            self._blobs.move_to_end(oid)
+        end = len(data)
+        for newline in (b'\n', b'\r'):
+            pos = data.find(newline, offset, end)
+            if pos != -1:
+                end = pos
+        return data[offset:end].decode(encoding, errors='ignore').strip()
+
+    def close(self) -> None:
+        """清空缓存并结束cat-file进程"""
+        self._blobs.clear()
+        self.reader.close()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+两个版本之间的调用图差异
+从旧版本的分析结果（快照或一次完整解析）出发，只对变化的文件增量更新得到新版本的调用图，
+报告新增/删除的脚本与调用边、主定义的变化以及入口脚本可达集合的变化
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from parse_store import ParseStore
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def diff_graphs(old: str, new: str, project_path: Optional[str] = None, entry_scripts: Sequence[str] = (),
+                snapshot_path: Optional[str] = None, new_snapshot_path: Optional[str] = None,
+                **parser_options) -> Dict:
+    """
+    比较两个版本的调用图
+
+    Args:
+        old: 旧版本：git版本（指定project_path时）或版本文件夹
+        new: 新版本：git版本（指定project_path时）或版本文件夹
+        project_path: git仓库内的工程目录；None表示old/new为两个版本文件夹
+        entry_scripts: 需要比较可达脚本集合的入口脚本
+        snapshot_path: 旧版本的分析快照（存在且有效时直接恢复，否则完整解析旧版本后保存到该路径）
+        new_snapshot_path: 保存增量更新得到的新版本分析快照（None表示不保存）
+        **parser_options: 传递给 ImprovedMATLABScriptParser 的选项
+
+    Returns:
+        RecursiveCallAnalyzer.update_source() 的差异报告，另含 'old'、'new'
+    """
+    if project_path is not None:
+        analyzer = RecursiveCallAnalyzer(project_path, git_revision=old, **parser_options)
+    else:
+        analyzer = RecursiveCallAnalyzer(old, **parser_options)
+
+    with profile_phase('diff: load old version'):
+        if snapshot_path is None or not analyzer.load_snapshot(snapshot_path):
+            analyzer._ensure_parsed_and_built()
+            if snapshot_path is not None:
+                analyzer.save_snapshot(snapshot_path)
+
+    with profile_phase('diff: incremental update'):
+        if project_path is not None:
+            result = analyzer.update_source(git_revision=new, entry_scripts=entry_scripts)
+        else:
+            result = analyzer.update_source(project_path=new, entry_scripts=entry_scripts)
+
+    if new_snapshot_path is not None:
+        analyzer.save_snapshot(new_snapshot_path)
+    result['old'] = old
+    result['new'] = new
+    return result
+
+
+def print_graph_diff(result: Dict) -> None:
+    """打印调用图差异"""
+    print(f"\n=== 调用图差异: {result['old']} -> {result['new']} ===")
+    for key, title in (('added_scripts', '新增脚本'), ('removed_scripts', '删除脚本'), ('modified_scripts', '修改脚本')):
+        print(f"{title}: {len(result[key])} 个")
+        for script in result[key]:
+            print(f"  {script}")
+    for key, title, mark in (('added_edges', '新增调用边', '+'), ('removed_edges', '删除调用边', '-')):
+        print(f"{title}: {len(result[key])} 条")
+        for caller, callee in result[key]:
+            print(f"  {mark} {caller} -> {callee}")
+    print(f"主定义变化: {len(result['primary_changes'])} 个")
+    for change in result['primary_changes']:
+        print(f"  {change['function']}: {change['old'] or '(无)'} -> {change['new'] or '(无)'}")
+    for entry, reach in result['reachability'].items():
+        print(f"入口 {entry} 的可达脚本: 新增 {len(reach['gained'])} 个, 不再可达 {len(reach['lost'])} 个")
+        for script in reach['gained']:
+            print(f"  + {script}")
+        for script in reach['lost']:
+            print(f"  - {script}")
+    stats = result['stats']
+    print(f"增量开销: 重新解析 {stats['reparsed_scripts']} 个脚本, 重新建边 {stats['rebuilt_callers']} 个脚本, "
+          f"涉及函数名 {stats['touched_names']} 个")
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "graph_diff.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--repo': None, '--entry': None, '--snapshot': None, '--save-snapshot': None,
+               '--parse-store': None, '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 2:
+        print("用法: python graph_diff.py <旧版本> <新版本> [--repo 工程目录] [--entry 入口脚本,...] "
+              "[--snapshot 旧版本快照] [--save-snapshot 新版本快照] [--parse-store 文件] [--json 输出文件] "
+              "[--profile[=输出文件]]")
+        print("  指定 --repo 时旧/新版本为git版本（tag/分支/提交），否则为两个版本文件夹")
+        print("示例:")
+        print("  python graph_diff.py releases/v1 releases/v2 --entry main.m")
+        print("  python graph_diff.py v1.0 HEAD --repo test_project --snapshot v1.0.snapshot")
+        sys.exit(1)
+
+    old, new = positional
+    if options['--repo'] is None:
+        for folder in (old, new):
+            if not Path(folder).exists():
+                print(f"错误: 路径 {folder} 不存在")
+                sys.exit(1)
+
+    parse_store = ParseStore(options['--parse-store']) if options['--parse-store'] else None
+    result = diff_graphs(old, new, project_path=options['--repo'],
+                         entry_scripts=options['--entry'].split(',') if options['--entry'] else (),
+                         snapshot_path=options['--snapshot'], new_snapshot_path=options['--save-snapshot'],
+                         parse_store=parse_store)
+    if parse_store is not None:
+        parse_store.save()
+    print_graph_diff(result)
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"差异报告已保存: {options['--json']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
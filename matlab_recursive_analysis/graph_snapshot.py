@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+调用图只读快照
+将脚本级调用图导出为小端序扁平数组（CSR邻接、反向邻接、SCC编号、边来源）加字符串表，
+其他进程通过mmap打开后可直接在原地遍历，多个工作进程共享同一份物理内存
+"""
+
+import mmap
+import struct
+import sys
+import logging
+from array import array
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Optional, Iterable
+
+from edge_provenance import EdgeProvenance
+from script_parser import RESOLUTION_RULES
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时使用memoryview
+    np = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'MCGSNAP\0'
+SNAPSHOT_VERSION = 1
+
+# 文件头: magic(8) + version(u32) + 节数量(u32) + 节点数(u32) + 边数(u32)
+_HEADER = struct.Struct('<8sIIII')
+# 节目录项: 名称(8) + 类型码(1) + 填充(7) + 偏移(u64) + 元素个数(u64)
+_SECTION = struct.Struct('<8sc7xQQ')
+_ALIGN = 8
+
+
+def build_csr(call_graph: Dict[str, Set[str]], nodes: Iterable[str]) -> Tuple[List[str], array, array]:
+    """
+    将邻接字典转换为CSR形式
+
+    Args:
+        call_graph: 脚本 -> 被调用脚本集合
+        nodes: 需要包含的全部节点（调用图中出现的节点会自动补充）
+
+    Returns:
+        (排序后的节点列表, 偏移数组, 目标数组)
+    """
+    node_set = set(nodes)
+    for src, targets in call_graph.items():
+        node_set.add(src)
+        node_set.update(targets)
+    node_list = sorted(node_set)
+    node_ids = {name: i for i, name in enumerate(node_list)}
+
+    offsets = array('i', [0])
+    targets_arr = array('i')
+    for name in node_list:
+        succ = sorted(node_ids[t] for t in call_graph.get(name, ()))
+        targets_arr.extend(succ)
+        offsets.append(len(targets_arr))
+    return node_list, offsets, targets_arr
+
+
+def reverse_csr(node_count: int, offsets: array, targets: array) -> Tuple[array, array]:
+    """根据正向CSR构建反向CSR（计数排序，线性时间）"""
+    counts = [0] * (node_count + 1)
+    for t in targets:
+        counts[t + 1] += 1
+    for i in range(node_count):
+        counts[i + 1] += counts[i]
+    rev_offsets = array('i', counts)
+    rev_targets = array('i', bytes(4 * len(targets)))
+    cursor = counts[:-1]
+    for src in range(node_count):
+        for k in range(offsets[src], offsets[src + 1]):
+            dst = targets[k]
+            rev_targets[cursor[dst]] = src
+            cursor[dst] += 1
+    return rev_offsets, rev_targets
+
+
+def compute_scc_ids(node_count: int, offsets, targets) -> array:
+    """
+    使用迭代版Tarjan算法计算强连通分量编号
+
+    Args:
+        node_count: 节点数
+        offsets: CSR偏移数组
+        targets: CSR目标数组
+
+    Returns:
+        每个节点所属SCC的编号（按发现顺序编号，逆拓扑序）
+    """
+    index = [-1] * node_count
+    lowlink = [0] * node_count
+    on_stack = [False] * node_count
+    scc_ids = array('i', [-1] * node_count)
+    stack: List[int] = []
+    counter = 0
+    scc_count = 0
+
+    for root in range(node_count):
+        if index[root] != -1:
+            continue
+        work = [(root, offsets[root])]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, pos = work[-1]
+            end = offsets[node + 1]
+            if pos < end:
+                work[-1] = (node, pos + 1)
+                succ = targets[pos]
+                if index[succ] == -1:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, offsets[succ]))
+                elif on_stack[succ] and index[succ] < lowlink[node]:
+                    lowlink[node] = index[succ]
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    scc_ids[member] = scc_count
+                    if member == node:
+                        break
+                scc_count += 1
+    return scc_ids
+
+
+def _encode_string_table(strings: List[str]) -> Tuple[array, bytes]:
+    """将字符串列表编码为 (偏移数组, UTF-8数据块)"""
+    offsets = array('i', [0])
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_graph_snapshot(path: str, call_graph: Dict[str, Set[str]], script_names: Iterable[str],
+                         function_scripts: Optional[Dict[str, List[str]]] = None,
+                         provenance: Optional[EdgeProvenance] = None) -> Dict[str, int]:
+    """
+    导出调用图快照
+
+    Args:
+        path: 输出文件路径
+        call_graph: 脚本级调用图
+        script_names: 工程中全部脚本（包括没有边的孤立脚本）
+        function_scripts: 函数名 -> 脚本列表（第一个为主定义），用于函数名字符串表
+        provenance: 调用边来源；提供时写出与FWDTGT逐项对齐的来源数组
+
+    Returns:
+        快照统计信息
+    """
+    node_list, offsets, targets = build_csr(call_graph, script_names)
+    node_count = len(node_list)
+    rev_offsets, rev_targets = reverse_csr(node_count, offsets, targets)
+    scc_ids = compute_scc_ids(node_count, offsets, targets)
+    script_str_offsets, script_blob = _encode_string_table(node_list)
+
+    node_ids = {name: i for i, name in enumerate(node_list)}
+    func_names = sorted(function_scripts) if function_scripts else []
+    func_str_offsets, func_blob = _encode_string_table(func_names)
+    func_primary = array('i', [
+        node_ids.get(function_scripts[name][0], -1) if function_scripts[name] else -1
+        for name in func_names
+    ])
+
+    sections: List[Tuple[bytes, str, object]] = [
+        (b'SCROFF', 'i', script_str_offsets),
+        (b'SCRSTR', 'B', script_blob),
+        (b'FWDOFF', 'i', offsets),
+        (b'FWDTGT', 'i', targets),
+        (b'REVOFF', 'i', rev_offsets),
+        (b'REVTGT', 'i', rev_targets),
+        (b'SCCID', 'i', scc_ids),
+        (b'FNCOFF', 'i', func_str_offsets),
+        (b'FNCSTR', 'B', func_blob),
+        (b'FNCPRI', 'i', func_primary),
+    ]
+    if provenance is not None:
+        sections.extend(_provenance_sections(provenance, node_list, offsets, targets, func_names))
+    _write_sections(path, sections, node_count, len(targets))
+
+    scc_count = (max(scc_ids) + 1) if node_count else 0
+    logger.info(f"调用图快照已写入 {path}: {node_count} 个脚本, {len(targets)} 条边, {scc_count} 个强连通分量")
+    return {
+        "node_count": node_count,
+        "edge_count": len(targets),
+        "scc_count": scc_count,
+        "function_count": len(func_names)
+    }
+
+
+def _provenance_sections(provenance: EdgeProvenance, node_list: List[str], offsets: array, targets: array,
+                         func_names: List[str]) -> List[Tuple[bytes, str, object]]:
+    """按CSR边顺序展开边来源：函数编号（FNC字符串表下标）、行、列、规则编号，缺失时为-1/0"""
+    func_ids = {name: i for i, name in enumerate(func_names)}
+    prv_function = array('i')
+    prv_line = array('i')
+    prv_column = array('i')
+    prv_rule = array('i')
+    for src, caller in enumerate(node_list):
+        for k in range(offsets[src], offsets[src + 1]):
+            row = provenance.edge_rows.get((caller, node_list[targets[k]]))
+            if row is None:
+                prv_function.append(-1)
+                prv_line.append(0)
+                prv_column.append(0)
+                prv_rule.append(-1)
+                continue
+            prv_function.append(func_ids.get(provenance.function_names[provenance.functions[row]], -1))
+            prv_line.append(provenance.lines[row])
+            prv_column.append(provenance.columns[row])
+            prv_rule.append(provenance.rules[row])
+    return [
+        (b'PRVFNC', 'i', prv_function),
+        (b'PRVLIN', 'i', prv_line),
+        (b'PRVCOL', 'i', prv_column),
+        (b'PRVRUL', 'i', prv_rule),
+    ]
+
+
+def _write_sections(path: str, sections: List[Tuple[bytes, str, object]], node_count: int, edge_count: int) -> None:
+    """按节目录格式写出所有数组（统一为小端序，8字节对齐）"""
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    directory = []
+    payloads = []
+    cursor = (header_size + _ALIGN - 1) // _ALIGN * _ALIGN
+    for name, typecode, data in sections:
+        if typecode == 'B':
+            raw = bytes(data)
+            count = len(raw)
+        else:
+            arr = array(typecode, data)
+            if sys.byteorder == 'big':
+                arr.byteswap()
+            raw = arr.tobytes()
+            count = len(arr)
+        directory.append(_SECTION.pack(name, typecode.encode('ascii'), cursor, count))
+        payloads.append((cursor, raw))
+        cursor = (cursor + len(raw) + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(sections), node_count, edge_count))
+        for entry in directory:
+            f.write(entry)
+        for offset, raw in payloads:
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(raw)
+
+
+class GraphSnapshot:
+    """只读调用图快照（mmap零拷贝访问）"""
+
+    def __init__(self, path: str):
+        """
+        打开快照文件
+
+        Args:
+            path: 快照文件路径
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views: List[memoryview] = []  # 交出的memoryview，关闭时统一释放
+
+        magic, version, section_count, self.node_count, self.edge_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是调用图快照文件")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"快照版本不兼容: {version} (期望 {SNAPSHOT_VERSION})")
+
+        self._sections: Dict[str, Tuple[str, int, int]] = {}
+        for i in range(section_count):
+            name, typecode, offset, count = _SECTION.unpack_from(self._mmap, _HEADER.size + i * _SECTION.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = (typecode.decode('ascii'), offset, count)
+
+        self.script_offsets = self.array('SCROFF')
+        self.script_blob = self.array('SCRSTR')
+        self.fwd_offsets = self.array('FWDOFF')
+        self.fwd_targets = self.array('FWDTGT')
+        self.rev_offsets = self.array('REVOFF')
+        self.rev_targets = self.array('REVTGT')
+        self.scc_ids = self.array('SCCID')
+        self.function_offsets = self.array('FNCOFF')
+        self.function_blob = self.array('FNCSTR')
+        self.function_primary = self.array('FNCPRI')
+        # 边来源为可选节（与FWDTGT逐项对齐）
+        has_provenance = self.has_section('PRVFNC')
+        self.provenance_functions = self.array('PRVFNC') if has_provenance else None
+        self.provenance_lines = self.array('PRVLIN') if has_provenance else None
+        self.provenance_columns = self.array('PRVCOL') if has_provenance else None
+        self.provenance_rules = self.array('PRVRUL') if has_provenance else None
+
+    def __enter__(self) -> 'GraphSnapshot':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        释放所有视图并关闭映射
+        交出的memoryview在此释放（之后访问抛出ValueError）；调用方仍持有的numpy数组无法撤销，
+        此时不强行关闭映射，由最后一个数组被回收时释放
+        """
+        for name in list(vars(self)):
+            if np is not None and isinstance(getattr(self, name), np.ndarray):
+                setattr(self, name, None)
+        for view in getattr(self, '_views', ()):
+            view.release()
+        self._views = []
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.release()
+            self._buffer = None
+        if getattr(self, '_mmap', None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                logger.debug(f"快照 {self.path} 仍有numpy数组引用，映射在数组回收后释放")
+            self._mmap = None
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+    def has_section(self, name: str) -> bool:
+        """快照中是否包含指定节"""
+        return name in self._sections
+
+    def array(self, name: str):
+        """
+        获取节数据的只读视图
+
+        Args:
+            name: 节名称
+
+        Returns:
+            安装了NumPy时为numpy数组，否则为memoryview（大端主机上退化为拷贝）
+        """
+        typecode, offset, count = self._sections[name]
+        if typecode == 'B':
+            view = self._buffer[offset:offset + count]
+        elif np is not None:
+            return np.frombuffer(self._mmap, dtype='<i4', count=count, offset=offset)
+        elif sys.byteorder == 'big':
+            arr = array('i', self._buffer[offset:offset + 4 * count].tobytes())
+            arr.byteswap()
+            return memoryview(arr)
+        else:
+            view = self._buffer[offset:offset + 4 * count].cast('i')
+        self._views.append(view)
+        return view
+
+    # ---------- 字符串表 ----------
+
+    def script_name(self, node_id: int) -> str:
+        """节点编号 -> 脚本名"""
+        start, end = self.script_offsets[node_id], self.script_offsets[node_id + 1]
+        return bytes(self.script_blob[start:end]).decode('utf-8')
+
+    def script_id(self, script_name: str) -> int:
+        """脚本名 -> 节点编号（字符串表有序，原地二分查找），不存在时返回-1"""
+        return _bisect_string_table(self.script_offsets, self.script_blob, self.node_count, script_name)
+
+    def function_name(self, func_id: int) -> str:
+        """函数编号 -> 函数名"""
+        start, end = self.function_offsets[func_id], self.function_offsets[func_id + 1]
+        return bytes(self.function_blob[start:end]).decode('utf-8')
+
+    def function_primary_script(self, func_name: str) -> Optional[str]:
+        """函数名 -> 主定义脚本"""
+        count = len(self.function_offsets) - 1
+        idx = _bisect_string_table(self.function_offsets, self.function_blob, count, func_name)
+        if idx < 0 or self.function_primary[idx] < 0:
+            return None
+        return self.script_name(int(self.function_primary[idx]))
+
+    # ---------- 图查询 ----------
+
+    def successors(self, node_id: int):
+        """节点的直接被调用者编号"""
+        return self.fwd_targets[self.fwd_offsets[node_id]:self.fwd_offsets[node_id + 1]]
+
+    def predecessors(self, node_id: int):
+        """节点的直接调用者编号"""
+        return self.rev_targets[self.rev_offsets[node_id]:self.rev_offsets[node_id + 1]]
+
+    def edge_provenance(self, caller: str, callee: str) -> Optional[Dict]:
+        """
+        查询调用边的来源（需要快照包含PRV*节）
+
+        Args:
+            caller: 调用脚本
+            callee: 被调用脚本
+
+        Returns:
+            {'caller', 'callee', 'function', 'line', 'column', 'rule'}，边或来源不存在时返回None
+        """
+        if self.provenance_functions is None:
+            return None
+        src, dst = self.script_id(caller), self.script_id(callee)
+        if src < 0 or dst < 0:
+            return None
+        start, end = int(self.fwd_offsets[src]), int(self.fwd_offsets[src + 1])
+        # 每个节点的出边按目标编号有序
+        k = bisect_left(self.fwd_targets, dst, start, end)
+        if k == end or int(self.fwd_targets[k]) != dst:
+            return None
+        func_id, rule_id = int(self.provenance_functions[k]), int(self.provenance_rules[k])
+        if rule_id < 0:
+            return None
+        return {
+            'caller': caller,
+            'callee': callee,
+            'function': self.function_name(func_id) if func_id >= 0 else None,
+            'line': int(self.provenance_lines[k]),
+            'column': int(self.provenance_columns[k]),
+            'rule': RESOLUTION_RULES[rule_id]
+        }
+
+    def scc_id(self, node_id: int) -> int:
+        """节点所属强连通分量编号"""
+        return int(self.scc_ids[node_id])
+
+    def reachable_from(self, script_name: str, reverse: bool = False) -> List[str]:
+        """
+        从指定脚本出发的可达脚本（BFS，直接读取映射数组）
+
+        Args:
+            script_name: 起始脚本
+            reverse: True时沿反向边遍历（即查找所有上游调用者）
+
+        Returns:
+            可达脚本列表（不含起点）
+        """
+        start = self.script_id(script_name)
+        if start < 0:
+            return []
+        offsets, targets = (self.rev_offsets, self.rev_targets) if reverse else (self.fwd_offsets, self.fwd_targets)
+        seen = bytearray(self.node_count)
+        seen[start] = 1
+        queue = deque([start])
+        result = []
+        while queue:
+            node = queue.popleft()
+            for k in range(offsets[node], offsets[node + 1]):
+                succ = int(targets[k])
+                if not seen[succ]:
+                    seen[succ] = 1
+                    result.append(self.script_name(succ))
+                    queue.append(succ)
+        return result
+
+    def shortest_path(self, from_script: str, to_script: str) -> Optional[List[str]]:
+        """两个脚本之间的最短调用路径，不存在时返回None"""
+        start, goal = self.script_id(from_script), self.script_id(to_script)
+        if start < 0 or goal < 0:
+            return None
+        parent = array('i', [-1] * self.node_count)
+        parent[start] = start
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                return [self.script_name(n) for n in reversed(path)]
+            for k in range(self.fwd_offsets[node], self.fwd_offsets[node + 1]):
+                succ = int(self.fwd_targets[k])
+                if parent[succ] == -1:
+                    parent[succ] = node
+                    queue.append(succ)
+        return None
+
+    def to_call_graph(self) -> Dict[str, Set[str]]:
+        """还原为邻接字典（会产生完整的Python对象拷贝，仅用于兼容旧接口）"""
+        names = [self.script_name(i) for i in range(self.node_count)]
+        return {
+            names[i]: {names[int(t)] for t in self.successors(i)}
+            for i in range(self.node_count)
+            if self.fwd_offsets[i + 1] > self.fwd_offsets[i]
+        }
+
+
+def _bisect_string_table(offsets, blob, count: int, key: str) -> int:
+    """在有序字符串表上原地二分查找，返回下标或-1"""
+    # Python字符串按码点排序，与UTF-8字节序一致，可直接比较字节
+    encoded = key.encode('utf-8')
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if bytes(blob[offsets[mid]:offsets[mid + 1]]) < encoded:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < count and bytes(blob[offsets[lo]:offsets[lo + 1]]) == encoded:
+        return lo
+    return -1
+
+
+def main():
+    """主函数，用于测试"""
+    if len(sys.argv) < 3:
+        print("用法: python graph_snapshot.py <MATLAB工程路径> <输出快照文件>")
+        sys.exit(1)
+
+    from recursive_call_analyzer import RecursiveCallAnalyzer
+
+    analyzer = RecursiveCallAnalyzer(sys.argv[1])
+    stats = analyzer.export_graph_snapshot(sys.argv[2])
+    print(f"快照已写入: {sys.argv[2]}")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    with GraphSnapshot(sys.argv[2]) as snapshot:
+        print("\n强连通分量:")
+        groups: Dict[int, List[str]] = {}
+        for i in range(snapshot.node_count):
+            groups.setdefault(snapshot.scc_id(i), []).append(snapshot.script_name(i))
+        for scc, members in sorted(groups.items()):
+            if len(members) > 1:
+                print(f"  SCC {scc}: {', '.join(members)}")
+
+
+if __name__ == "__main__":
+    main()
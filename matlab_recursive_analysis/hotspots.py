@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+调用图热点排名
+把CSR调用图当作稀疏邻接矩阵，用NumPy向量化计算（NumPy可选，缺失时退化为纯Python循环）：
+- PageRank：排名沿调用边从调用者流向被调用者，被大量脚本共享的底层脚本（如 utils.m）排名靠前；
+  叶子脚本的排名均匀分给全部节点，调用环不影响收敛
+- 入度/出度：直接调用者/被调用者个数
+- 路径计数：从根（无调用者）出发到达节点的调用路径数 × 从节点出发到叶子的路径数，即经过该节点的根到叶子路径数；
+  调用环内的路径有无穷多条，先按强连通分量收缩为无环图再计数（同一调用环中的节点计数相同）
+稀疏矩阵乘法用 bincount 按边累加，无环图上的路径计数按拓扑层逐层批量传播，循环次数为层数而不是节点数
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+from recursive_call_analyzer import GRANULARITIES, RecursiveCallAnalyzer
+from graph_snapshot import build_csr, compute_scc_ids
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时使用纯Python循环
+    np = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 可用于排序的指标
+RANKING_METRICS = ('pagerank', 'in_degree', 'out_degree', 'path_count')
+
+
+def _dag_path_counts_numpy(node_count: int, sources, targets):
+    """无环图上从入度为0的节点出发到达每个节点的路径数（按拓扑层批量传播）"""
+    order = np.argsort(sources, kind='stable')
+    sources = sources[order]
+    targets = targets[order]
+    offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=offsets[1:])
+    in_degree = np.bincount(targets, minlength=node_count)
+    counts = np.zeros(node_count)
+    frontier = np.flatnonzero(in_degree == 0)
+    counts[frontier] = 1.0
+    while frontier.size:
+        # 当前层全部节点的出边下标：每个节点的 [offsets[v], offsets[v+1]) 拼接
+        starts = offsets[frontier]
+        lengths = offsets[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            break
+        edge_ids = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        layer_targets = targets[edge_ids]
+        counts += np.bincount(layer_targets, weights=counts[sources[edge_ids]], minlength=node_count)
+        in_degree -= np.bincount(layer_targets, minlength=node_count)
+        frontier = np.unique(layer_targets[in_degree[layer_targets] == 0])
+    return counts
+
+
+def _centrality_numpy(node_count: int, offsets, targets, scc_ids, damping: float, tolerance: float,
+                      max_iterations: int) -> Dict:
+    """向量化计算全部中心度指标"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    out_degree = np.diff(offsets)
+    in_degree = np.bincount(targets, minlength=node_count)
+    sources = np.repeat(np.arange(node_count), out_degree)
+
+    # PageRank幂迭代：稀疏矩阵乘向量 = 按边把 rank/出度 累加到被调用节点
+    dangling = out_degree == 0
+    inverse_out = np.zeros(node_count)
+    inverse_out[~dangling] = 1.0 / out_degree[~dangling]
+    rank = np.full(node_count, 1.0 / node_count)
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        flow = np.bincount(targets, weights=(rank * inverse_out)[sources], minlength=node_count)
+        new_rank = (1.0 - damping) / node_count + damping * (flow + rank[dangling].sum() / node_count)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tolerance:
+            break
+
+    # 按强连通分量收缩后的无环图（去重的分量间边）上计数
+    components = np.asarray(scc_ids, dtype=np.int64)
+    component_count = int(components.max()) + 1
+    component_src = components[sources]
+    component_dst = components[targets]
+    between = component_src != component_dst
+    keys = np.unique(component_src[between] * component_count + component_dst[between])
+    dag_src = keys // component_count
+    dag_dst = keys % component_count
+    paths_to = _dag_path_counts_numpy(component_count, dag_src, dag_dst)[components]
+    paths_from = _dag_path_counts_numpy(component_count, dag_dst, dag_src)[components]
+    return {
+        'pagerank': rank.tolist(),
+        'in_degree': in_degree.tolist(),
+        'out_degree': out_degree.tolist(),
+        'paths_to': paths_to.tolist(),
+        'paths_from': paths_from.tolist(),
+        'path_count': (paths_to * paths_from).tolist(),
+        'scc_size': np.bincount(components)[components].tolist(),
+        'iterations': iterations
+    }
+
+
+def _centrality_python(node_count: int, offsets, targets, scc_ids, damping: float, tolerance: float,
+                       max_iterations: int) -> Dict:
+    """纯Python计算（与 _centrality_numpy 结果相同）"""
+    out_degree = [offsets[i + 1] - offsets[i] for i in range(node_count)]
+    in_degree = [0] * node_count
+    for target in targets:
+        in_degree[target] += 1
+
+    rank = [1.0 / node_count] * node_count
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        dangling_sum = sum(rank[i] for i in range(node_count) if out_degree[i] == 0)
+        flow = [0.0] * node_count
+        for i in range(node_count):
+            if out_degree[i]:
+                share = rank[i] / out_degree[i]
+                for k in range(offsets[i], offsets[i + 1]):
+                    flow[targets[k]] += share
+        new_rank = [(1.0 - damping) / node_count + damping * (flow[i] + dangling_sum / node_count)
+                    for i in range(node_count)]
+        delta = sum(abs(new - old) for new, old in zip(new_rank, rank))
+        rank = new_rank
+        if delta < tolerance:
+            break
+
+    # 收缩图的边；Tarjan编号为逆拓扑序，编号从大到小即为拓扑序
+    component_count = max(scc_ids) + 1
+    successors: List[set] = [set() for _ in range(component_count)]
+    for i in range(node_count):
+        for k in range(offsets[i], offsets[i + 1]):
+            if scc_ids[i] != scc_ids[targets[k]]:
+                successors[scc_ids[i]].add(scc_ids[targets[k]])
+    has_predecessor = [False] * component_count
+    for succ in successors:
+        for component in succ:
+            has_predecessor[component] = True
+    component_to = [0.0 if has_predecessor[c] else 1.0 for c in range(component_count)]
+    for component in range(component_count - 1, -1, -1):
+        for succ in successors[component]:
+            component_to[succ] += component_to[component]
+    component_from = [0.0] * component_count
+    for component in range(component_count):
+        component_from[component] = float(sum(component_from[succ] for succ in successors[component])) \
+            if successors[component] else 1.0
+    sizes = [0] * component_count
+    for component in scc_ids:
+        sizes[component] += 1
+
+    paths_to = [component_to[scc_ids[i]] for i in range(node_count)]
+    paths_from = [component_from[scc_ids[i]] for i in range(node_count)]
+    return {
+        'pagerank': rank,
+        'in_degree': in_degree,
+        'out_degree': out_degree,
+        'paths_to': paths_to,
+        'paths_from': paths_from,
+        'path_count': [to * frm for to, frm in zip(paths_to, paths_from)],
+        'scc_size': [sizes[scc_ids[i]] for i in range(node_count)],
+        'iterations': iterations
+    }
+
+
+def rank_hotspots(analyzer: RecursiveCallAnalyzer, top_n: int = 20, by: str = 'pagerank',
+                  granularity: str = 'script', damping: float = 0.85, tolerance: float = 1e-10,
+                  max_iterations: int = 100, use_numpy: Optional[bool] = None) -> Dict:
+    """
+    计算调用图的中心度并返回排名靠前的节点
+
+    Args:
+        analyzer: 分析器（未解析时先解析并建图）
+        top_n: 返回的节点数（0表示全部）
+        by: 排序指标（RANKING_METRICS之一）
+        granularity: 图粒度 'script' 或 'function'（函数粒度下节点为 '脚本>函数'）
+        damping: PageRank阻尼系数
+        tolerance: PageRank收敛阈值（相邻两次迭代的L1差）
+        max_iterations: PageRank最大迭代次数
+        use_numpy: 是否使用NumPy（None表示可用时使用）
+
+    Returns:
+        {'ranking': [{'node', 'pagerank', 'in_degree', 'out_degree', 'paths_to', 'paths_from',
+                      'path_count', 'in_cycle'}], 'summary'}
+    """
+    if by not in RANKING_METRICS:
+        raise ValueError(f"未知的排序指标: {by}（可选 {', '.join(RANKING_METRICS)}）")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"未知的图粒度: {granularity}（可选 {', '.join(GRANULARITIES)}）")
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ValueError("未安装NumPy")
+
+    analyzer._ensure_parsed_and_built()
+    with profile_phase('hotspots: csr'):
+        if granularity == 'function':
+            graph = analyzer.get_function_graph()
+            node_list, offsets, targets = graph.node_list, graph.offsets, graph.targets
+        else:
+            node_list, offsets, targets = build_csr(analyzer.call_graph, analyzer.script_functions)
+    node_count = len(node_list)
+    if node_count == 0:
+        return {'ranking': [], 'summary': {'nodes': 0, 'edges': 0, 'by': by, 'granularity': granularity}}
+
+    with profile_phase('hotspots: scc'):
+        scc_ids = compute_scc_ids(node_count, offsets, targets)
+    with profile_phase('hotspots: centrality'):
+        compute = _centrality_numpy if use_numpy else _centrality_python
+        metrics = compute(node_count, offsets, targets, scc_ids, damping, tolerance, max_iterations)
+
+    # 按指标降序，PageRank与名称依次作为并列时的次序
+    order = sorted(range(node_count), key=lambda i: (-metrics[by][i], -metrics['pagerank'][i], node_list[i]))
+    if top_n:
+        order = order[:top_n]
+    ranking = [{
+        'node': node_list[i],
+        'pagerank': round(metrics['pagerank'][i], 8),
+        'in_degree': int(metrics['in_degree'][i]),
+        'out_degree': int(metrics['out_degree'][i]),
+        'paths_to': metrics['paths_to'][i],
+        'paths_from': metrics['paths_from'][i],
+        'path_count': metrics['path_count'][i],
+        'in_cycle': metrics['scc_size'][i] > 1
+    } for i in order]
+
+    summary = {
+        'nodes': node_count,
+        'edges': len(targets),
+        'cyclic_nodes': sum(1 for size in metrics['scc_size'] if size > 1),
+        'pagerank_iterations': metrics['iterations'],
+        'by': by,
+        'granularity': granularity,
+        'backend': 'numpy' if use_numpy else 'python'
+    }
+    logger.info(f"热点排名完成: {node_count} 个节点, {len(targets)} 条边, PageRank迭代 {metrics['iterations']} 次")
+    return {'ranking': ranking, 'summary': summary}
+
+
+def print_hotspots(result: Dict) -> None:
+    """打印热点排名"""
+    summary = result['summary']
+    print(f"\n=== 调用图热点（按 {summary['by']} 排序, {summary['granularity']} 粒度, "
+          f"{summary['nodes']} 个节点, {summary['edges']} 条边）===")
+    print(f"  {'PageRank':>10}{'入度':>6}{'出度':>6}{'路径数':>12}  {'节点'}")
+    for item in result['ranking']:
+        cycle = '  (调用环)' if item['in_cycle'] else ''
+        print(f"  {item['pagerank']:>10.5f}{item['in_degree']:>6}{item['out_degree']:>6}"
+              f"{item['path_count']:>12.4g}  {item['node']}{cycle}")
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "hotspots.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--top': '20', '--by': 'pagerank', '--granularity': 'script', '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 1 or options['--by'] not in RANKING_METRICS \
+            or options['--granularity'] not in GRANULARITIES:
+        print("用法: python hotspots.py <MATLAB工程路径> [--top N] [--by pagerank|in_degree|out_degree|path_count] "
+              "[--granularity script|function] [--json 输出文件] [--profile[=输出文件]]")
+        print("示例:")
+        print("  python hotspots.py test_project")
+        print("  python hotspots.py test_project --by path_count --top 10")
+        print("  python hotspots.py test_project --granularity function --json hotspots.json")
+        sys.exit(1)
+
+    project_path = positional[0]
+    if not os.path.exists(project_path):
+        print(f"错误: 路径 {project_path} 不存在")
+        sys.exit(1)
+
+    analyzer = RecursiveCallAnalyzer(project_path)
+    result = rank_hotspots(analyzer, top_n=int(options['--top']), by=options['--by'],
+                           granularity=options['--granularity'])
+    print_hotspots(result)
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"热点排名已保存: {options['--json']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ MCP Recursive Analyzer Server - 标准MCP协议的MATLAB脚本递归调用链分
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import sys
@@ -20,6 +21,11 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 if CURRENT_DIR not in sys.path:
     sys.path.append(CURRENT_DIR)
 from recursive_call_analyzer import RecursiveCallAnalyzer
+from change_impact import analyze_change_range
+from affected_tests import DEFAULT_TEST_PATTERNS, list_test_units, select_affected_tests
+from dead_code import find_dead_code
+from module_coupling import GROUP_MODES, aggregate_call_graph
+from hotspots import RANKING_METRICS, rank_hotspots
 
 # ========== 标准化MCP响应的工具函数 ==========
 def build_mcp_response(result: Any = None, id_value: Any = None, method_value: Any = None, error: dict = None) -> dict:
@@ -58,6 +64,7 @@ class MCPRecursiveAnalyzerServer:
         self.logger = logging.getLogger(__name__)
         self.initialized = False
         self.analyzers = {}  # 缓存不同项目的分析器
+        self.snapshot_synced = set()  # 快照与内存状态一致的项目
         
         # 工具注册 - 适配递归分析功能
         self.tools = {
@@ -87,6 +94,266 @@ class MCPRecursiveAnalyzerServer:
                     "required": [],
                     "additionalProperties": False
                 })
+            },
+            "matlab_parse_cost_report": {
+                "name": "matlab_parse_cost_report",
+                "description": "MATLAB文件解析开销报告。返回读取+解析耗时最长的N个文件，包含读取耗时、解析耗时、字节大小、行数、定义数、调用数及解析模式（full/definitions_only），用于定位拖慢扫描的超大或自动生成的源文件。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "top_n": {
+                            "type": "integer",
+                            "description": "返回的文件数量（可选，默认 10）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": [],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_explain_call_edge": {
+                "name": "matlab_explain_call_edge",
+                "description": "说明脚本间调用边的来源。返回产生该边的函数名、调用点行列号以及解析规则（primary/path_order/script_file/qualified/import/private/class_folder），直接查询建图时记录的来源表，不重新读取源文件。未指定被调用脚本时返回调用脚本的全部出边。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "caller_script": {
+                            "type": "string",
+                            "description": "调用脚本（相对项目根目录的路径，如 'main.m'）"
+                        },
+                        "callee_script": {
+                            "type": "string",
+                            "description": "被调用脚本（可选，未提供时返回调用脚本的全部出边）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": ["caller_script"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_find_references": {
+                "name": "matlab_find_references",
+                "description": "查找函数的全部调用点（find references / 跳转到调用者）。返回每个调用点的调用脚本、所在函数、行号、列号，以及按MATLAB规则解析到的定义脚本与解析规则；没有定义的函数同样可以查询（resolved_script为null）。结果直接来自解析阶段建立的调用点索引或持久化快照，不重新读取源文件。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "function_name": {
+                            "type": "string",
+                            "description": "被调用的函数名（包函数使用限定名，如 'pkg.foo'）"
+                        },
+                        "defined_in": {
+                            "type": "string",
+                            "description": "只返回解析到该脚本中定义的调用（可选，用于区分同名函数）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": ["function_name"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_change_impact": {
+                "name": "matlab_change_impact",
+                "description": "按git版本范围做变更影响分析。输入 base..head（或 base...head），自动得到新增、修改、删除与重命名的.m文件，从base版本的调用图增量更新到head；删除的脚本按base版本的调用关系检查调用者，列出head中仍在调用但已无法解析的调用（断开的调用）以及改为解析到其他脚本的调用，并返回受影响的脚本与入口。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径，须位于git仓库内（可选，如未提供将使用预设值）"
+                        },
+                        "revision_range": {
+                            "type": "string",
+                            "description": "版本范围，如 'v1.0..HEAD'、'origin/main...HEAD'；只给一个版本时与HEAD比较"
+                        },
+                        "entry_scripts": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "入口脚本列表（可选，默认为head版本中未被调用的根脚本）"
+                        },
+                        "include_paths": {
+                            "type": "boolean",
+                            "description": "是否枚举入口到各变更脚本及变更脚本到叶子的全部路径（可选，默认 false，大工程中可能很慢）"
+                        },
+                        "test_patterns": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "提供时同时选择受影响的测试，测试脚本通配符如 ['test_*.m', '*Test.m']（可选）"
+                        },
+                        "granularity": {
+                            "type": "string",
+                            "enum": ["script", "function"],
+                            "description": "影响范围与路径的图粒度（可选，默认 script）：function 时变更脚本展开为其中的全部函数，断开的调用只取调用点所在的函数，结果节点为 '脚本>函数'"
+                        }
+                    },
+                    "required": ["revision_range"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_select_tests": {
+                "name": "matlab_select_tests",
+                "description": "受影响测试选择。按通配符识别测试脚本（默认 test_*.m、*Test.m；@类目录按类定义文件名判断，方法文件随类归为同一测试），从变更脚本出发沿反向调用索引遍历受影响的子图，返回能到达任一变更脚本的最小测试集合及每个测试到达的变更脚本。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "changed_scripts": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "变更的脚本（相对项目根目录的路径）"
+                        },
+                        "test_patterns": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "测试脚本通配符（可选；不含'/'时匹配文件名，含'/'时匹配相对路径，如 'tests/*'）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": ["changed_scripts"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_dead_code": {
+                "name": "matlab_dead_code",
+                "description": "死代码与不可达脚本检测。从配置的入口集合（如 main.m、GUI启动脚本）出发沿调用边与函数句柄引用做一次多源遍历，返回任何入口都无法到达的脚本、文件内从未调用（也未作为@函数句柄引用）的本地/嵌套函数、没有其他脚本调用或以函数句柄（如 @onClick 回调）引用的文件主函数，以及被同名更高优先级定义遮蔽、永远不会被解析选中的定义。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "entry_scripts": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "入口脚本或通配符（不含'/'时匹配文件名，如 'launch_*.m'；含'/'时匹配相对路径，如 'gui/*.m'）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": ["entry_scripts"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_dominators": {
+                "name": "matlab_dominators",
+                "description": "必经脚本分析（支配树/后支配树）。在入口可达的调用图上预计算支配树与后支配树，返回从入口到每个目标的每条路径都必须经过的脚本、目标之后到叶子的每条路径都必须经过的脚本，以及只能经过目标才能到达的脚本；不指定目标时返回每个可达脚本的直接支配者。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "entry_script": {
+                            "type": "string",
+                            "description": "入口脚本（相对项目根目录的路径，如 'main.m'）"
+                        },
+                        "target_scripts": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "需要查询的目标脚本（可选，默认返回整棵支配树）；函数粒度下可为 '脚本>函数' 节点"
+                        },
+                        "granularity": {
+                            "type": "string",
+                            "enum": ["script", "function"],
+                            "description": "图粒度（可选，默认 script）：function 时节点为 '脚本>函数'，入口脚本取其入口函数"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "required": ["entry_script"],
+                    "additionalProperties": False
+                })
+            },
+            "matlab_module_coupling": {
+                "name": "matlab_module_coupling",
+                "description": "目录/包级耦合度量。将脚本按顶层目录（可指定层数）或 +包/@类 命名空间聚合为分组，返回分组间调用边的边权、每个分组的扇入/扇出、传入/传出耦合（Ca/Ce）与不稳定度 I = Ce/(Ca+Ce)，以及分组之间的循环依赖（每组循环按边权从小到大列出其中的依赖，便于找到最容易拆除的一条）。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "group_by": {
+                            "type": "string",
+                            "enum": list(GROUP_MODES),
+                            "description": "分组方式（可选，默认 directory）：directory 按目录前缀；package 按 +包/@类 命名空间，其余脚本按目录前缀"
+                        },
+                        "depth": {
+                            "type": "integer",
+                            "description": "目录前缀的层数（可选，默认 1；0 表示按完整目录分组）"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "additionalProperties": False
+                })
+            },
+            "matlab_hotspots": {
+                "name": "matlab_hotspots",
+                "description": "调用图热点排名。在稀疏调用图上计算 PageRank（排名沿调用边流向被调用脚本，被广泛共享的底层脚本靠前）、入度/出度与路径计数中心度（经过该节点的根到叶子调用路径数，调用环先按强连通分量收缩），返回按指定指标排序的前 N 个脚本，用于确定优先优化与评审的共享脚本。",
+                "inputSchema": self._normalize_schema({
+                    "type": "object",
+                    "properties": {
+                        "project_path": {
+                            "type": "string",
+                            "description": "MATLAB项目根目录路径（可选，如未提供将使用预设值）"
+                        },
+                        "top_n": {
+                            "type": "integer",
+                            "description": "返回的节点数（可选，默认 20；0 表示全部）"
+                        },
+                        "by": {
+                            "type": "string",
+                            "enum": list(RANKING_METRICS),
+                            "description": "排序指标（可选，默认 pagerank）"
+                        },
+                        "granularity": {
+                            "type": "string",
+                            "enum": ["script", "function"],
+                            "description": "图粒度（可选，默认 script）：function 时节点为 '脚本>函数'"
+                        },
+                        "force_rescan": {
+                            "type": "boolean",
+                            "description": "是否强制重新扫描工程（可选，默认 false）"
+                        }
+                    },
+                    "additionalProperties": False
+                })
             }
         }
 
@@ -124,12 +391,48 @@ class MCPRecursiveAnalyzerServer:
         
         return normalized
 
+    def _get_snapshot_path(self, project_path: str) -> Optional[str]:
+        """获取项目对应的分析快照路径（需设置环境变量 ANALYZER_SNAPSHOT_DIR）"""
+        snapshot_dir = os.environ.get('ANALYZER_SNAPSHOT_DIR')
+        if not snapshot_dir:
+            return None
+        key = hashlib.sha1(str(Path(project_path).resolve()).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(snapshot_dir, f"{Path(project_path).name}_{key}.snapshot")
+
     def _get_analyzer(self, project_path: str) -> RecursiveCallAnalyzer:
-        """获取或创建项目分析器"""
+        """获取或创建项目分析器（优先从快照热启动；已缓存的分析器在工程变化后增量更新）"""
         if project_path not in self.analyzers:
-            self.analyzers[project_path] = RecursiveCallAnalyzer(project_path)
+            analyzer = RecursiveCallAnalyzer(project_path)
+            snapshot_path = self._get_snapshot_path(project_path)
+            if snapshot_path and analyzer.load_snapshot(snapshot_path):
+                self.snapshot_synced.add(project_path)
+            self.analyzers[project_path] = analyzer
+        else:
+            self._refresh_analyzer(project_path, self.analyzers[project_path])
         return self.analyzers[project_path]
 
+    def _refresh_analyzer(self, project_path: str, analyzer: RecursiveCallAnalyzer) -> None:
+        """每次查询前按指纹（只做stat）检查工程是否变化，变化时只重新解析变化的文件"""
+        if not analyzer.script_functions:
+            return
+        parser = analyzer.parser
+        if parser.fingerprint_matches(parser.compute_fingerprint()):
+            return
+        change = analyzer.update_source()
+        self.snapshot_synced.discard(project_path)
+        self.logger.info(f"工程 {project_path} 有变化，已增量更新: {change['stats']}")
+
+    def _save_snapshot_if_needed(self, project_path: str, analyzer: RecursiveCallAnalyzer) -> None:
+        """首次完整扫描后保存快照，供下次启动直接加载"""
+        snapshot_path = self._get_snapshot_path(project_path)
+        if not snapshot_path or project_path in self.snapshot_synced:
+            return
+        try:
+            analyzer.save_snapshot(snapshot_path)
+            self.snapshot_synced.add(project_path)
+        except Exception as e:
+            self.logger.warning(f"保存分析快照失败: {e}")
+
     async def handle_initialize(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """处理初始化请求"""
         self.logger.info("处理初始化请求")
@@ -189,6 +492,7 @@ class MCPRecursiveAnalyzerServer:
             analyzer = self._get_analyzer(project_path)
             if force_rescan:
                 analyzer.reset()
+                self.snapshot_synced.discard(project_path)
 
             def build_result(entry_to_analysis_path, downstream_paths, eff_entry, eff_target):
                 return {
@@ -220,6 +524,7 @@ class MCPRecursiveAnalyzerServer:
                 # 目标->叶子路径
                 downstream_paths = analyzer._find_paths_to_leaves(analysis_script)
                 result = build_result(entry_to_analysis_path, downstream_paths, entry_script, analysis_script)
+                self._save_snapshot_if_needed(project_path, analyzer)
                 return json.dumps(result, ensure_ascii=False, indent=2)
 
             # 情况 2：仅入口
@@ -227,6 +532,7 @@ class MCPRecursiveAnalyzerServer:
                 analyzer.analyze_recursive_calls(entry_script)
                 downstream_paths = analyzer._find_paths_to_leaves(entry_script)
                 result = build_result([], downstream_paths, entry_script, None)
+                self._save_snapshot_if_needed(project_path, analyzer)
                 return json.dumps(result, ensure_ascii=False, indent=2)
 
             # 情况 3：仅目标 -> 视为入口
@@ -235,6 +541,7 @@ class MCPRecursiveAnalyzerServer:
                 downstream_paths = analyzer._find_paths_to_leaves(analysis_script)
                 # 入口==目标时，入口->目标的“路径”可视为 [analysis_script]
                 result = build_result([analysis_script], downstream_paths, analysis_script, analysis_script)
+                self._save_snapshot_if_needed(project_path, analyzer)
                 return json.dumps(result, ensure_ascii=False, indent=2)
 
             # 兜底（不应到达）
@@ -248,6 +555,382 @@ class MCPRecursiveAnalyzerServer:
             }
             return json.dumps(error_result, ensure_ascii=False, indent=2)
 
+    def _prepare_analyzer(self, kwargs: Dict[str, Any]) -> Tuple[str, RecursiveCallAnalyzer]:
+        """按工具参数获取已解析并建图的分析器（处理默认项目路径、force_rescan与快照保存）"""
+        project_path = kwargs.get('project_path') or os.environ.get('DEFAULT_PROJECT_PATH') or os.getcwd()
+        force_rescan = bool(kwargs.get('force_rescan', False))
+
+        if not project_path or not Path(project_path).exists():
+            raise ValueError(f"项目路径不存在或无效: {project_path}")
+
+        analyzer = self._get_analyzer(project_path)
+        if force_rescan:
+            analyzer.reset()
+            self.snapshot_synced.discard(project_path)
+        analyzer._ensure_parsed_and_built()
+        self._save_snapshot_if_needed(project_path, analyzer)
+        return project_path, analyzer
+
+    async def execute_matlab_parse_cost_report(self, **kwargs) -> str:
+        """执行文件解析开销报告工具"""
+        try:
+            top_n = int(kwargs.get('top_n') or 10)
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            stats = analyzer.parser.file_parse_stats
+            result = {
+                "slowest_files": {
+                    "data": analyzer.parser.get_slowest_files(top_n),
+                    "description": "Files with the highest read+parse time. Times are in seconds, sizes in bytes."
+                },
+                "summary": {
+                    "project_path": project_path,
+                    "file_count": len(stats),
+                    "total_read_seconds": sum(st['read_seconds'] for st in stats.values()),
+                    "total_parse_seconds": sum(st['parse_seconds'] for st in stats.values()),
+                    "definitions_only_files": sum(1 for st in stats.values() if st['mode'] == 'definitions_only')
+                },
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"生成解析开销报告失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_explain_call_edge(self, **kwargs) -> str:
+        """执行调用边来源查询工具"""
+        try:
+            caller_script = kwargs.get('caller_script')
+            callee_script = kwargs.get('callee_script') or None
+            if not caller_script:
+                raise ValueError("必须提供 caller_script")
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            if caller_script not in analyzer.script_functions:
+                raise ValueError(f"调用脚本不存在: {caller_script}")
+            edges = analyzer.explain_call_edge(caller_script, callee_script)
+            result = {
+                "edges": {
+                    "data": edges,
+                    "description": "Provenance of each script-to-script edge: the called function name, the first call site (1-based line/column in caller_script) and the resolution rule that selected the callee."
+                },
+                "edge_exists": bool(edges),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"查询调用边来源失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_find_references(self, **kwargs) -> str:
+        """执行函数调用点查询工具"""
+        try:
+            function_name = kwargs.get('function_name')
+            defined_in = kwargs.get('defined_in') or None
+            if not function_name:
+                raise ValueError("必须提供 function_name")
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            references = analyzer.find_references(function_name, defined_in)
+            result = {
+                "references": {
+                    "data": references,
+                    "description": "Every call site of the function: caller script, enclosing function (null for top-level script code), 1-based line/column, and the script the call resolves to (null when unresolved) with the resolution rule."
+                },
+                "summary": {
+                    "reference_count": len(references),
+                    "caller_script_count": len({ref['caller_script'] for ref in references}),
+                    "unresolved_count": sum(1 for ref in references if ref['resolved_script'] is None),
+                    "definitions": analyzer.function_scripts.get(function_name, [])
+                },
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"查询函数调用点失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_change_impact(self, **kwargs) -> str:
+        """执行git版本范围变更影响分析工具"""
+        try:
+            project_path = kwargs.get('project_path') or os.environ.get('DEFAULT_PROJECT_PATH') or os.getcwd()
+            revision_range = kwargs.get('revision_range')
+            if not revision_range:
+                raise ValueError("必须提供 revision_range")
+            if not project_path or not Path(project_path).exists():
+                raise ValueError(f"项目路径不存在或无效: {project_path}")
+
+            # base版本的分析结果单独保存一份快照（与工作区快照互不覆盖），base不变时直接复用
+            snapshot_path = self._get_snapshot_path(project_path)
+            impact = analyze_change_range(project_path, revision_range,
+                                          entry_roots=kwargs.get('entry_scripts') or None,
+                                          snapshot_path=snapshot_path + '.git-base' if snapshot_path else None,
+                                          include_paths=bool(kwargs.get('include_paths', False)),
+                                          test_patterns=kwargs.get('test_patterns') or None,
+                                          granularity=kwargs.get('granularity') or 'script')
+            result = {
+                "changes": {
+                    "data": impact['changes'],
+                    "description": "Source files changed between base and head (paths relative to project_path); renames are detected by git."
+                },
+                "broken_callers": {
+                    "data": impact['broken_callers'],
+                    "description": "Calls that resolved to a deleted or renamed script in base and no longer resolve to any definition in head: caller script, called function, first call site (1-based line/column) and the deleted script."
+                },
+                "rebound_callers": {
+                    "data": impact['rebound_callers'],
+                    "description": "Calls into a deleted or renamed script that now resolve to another script in head."
+                },
+                "impact": {
+                    "data": impact['impact'],
+                    "description": "Changed scripts (plus callers with broken calls), every script that can reach one of them in the head call graph, and the affected entry roots. At function granularity all of these are 'script>function' nodes."
+                },
+                "graph_diff": {
+                    "data": impact['graph_diff'],
+                    "description": "Call-graph differences between base and head: added/removed edges, primary-definition changes and reachability changes of the entry scripts."
+                },
+                "summary": {
+                    "project_path": project_path,
+                    "base": impact['base'],
+                    "head": impact['head'],
+                    "granularity": impact['impact']['granularity'],
+                    "broken_caller_count": len(impact['broken_callers']),
+                    "affected_script_count": len(impact['impact']['affected_scripts'])
+                },
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            if 'affected_tests' in impact:
+                result["affected_tests"] = {
+                    "data": impact['affected_tests'],
+                    "description": "Test units (class folders collapse to their class file) that can reach a changed script in head, each with one changed script it reaches."
+                }
+            if 'impact_paths' in impact:
+                result["impact_paths"] = {
+                    "data": impact['impact_paths'],
+                    "description": "For each changed script (or function node at function granularity): all paths from entry roots to it and from it to leaves."
+                }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"变更影响分析失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_select_tests(self, **kwargs) -> str:
+        """执行受影响测试选择工具"""
+        try:
+            changed_scripts = kwargs.get('changed_scripts') or []
+            if not changed_scripts:
+                raise ValueError("必须提供 changed_scripts")
+            test_patterns = tuple(kwargs.get('test_patterns') or DEFAULT_TEST_PATTERNS)
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            selection = select_affected_tests(analyzer, changed_scripts, test_patterns)
+            result = {
+                "tests": {
+                    "data": selection['tests'],
+                    "description": "Test units that can reach at least one changed script through the call graph (paths relative to project_path)."
+                },
+                "reasons": {
+                    "data": selection['reasons'],
+                    "description": "For each selected test, one changed script it reaches."
+                },
+                "summary": {
+                    "project_path": project_path,
+                    "selected_test_count": len(selection['tests']),
+                    "total_test_count": len(list_test_units(analyzer, test_patterns)),
+                    "changed_scripts": selection['changed_scripts'],
+                    "unknown_scripts": sorted(set(changed_scripts) - set(selection['changed_scripts'])),
+                    "visited_scripts": selection['visited_scripts']
+                },
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"受影响测试选择失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_dead_code(self, **kwargs) -> str:
+        """执行死代码检测工具"""
+        try:
+            entry_scripts = kwargs.get('entry_scripts') or []
+            if not entry_scripts:
+                raise ValueError("必须提供 entry_scripts")
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            report = find_dead_code(analyzer, entry_scripts)
+            result = {
+                "unreachable_scripts": {
+                    "data": report['unreachable_scripts'],
+                    "description": "Scripts that no entry script can reach through call edges or function-handle references (e.g. @onClick callbacks), with kind (global/package/class/private), size and line count."
+                },
+                "unreferenced_functions": {
+                    "data": report['unreferenced_functions'],
+                    "description": "Local/nested functions never called or used as a function handle in their own file, and primary functions of files no other script calls or references by handle."
+                },
+                "shadowed_definitions": {
+                    "data": report['shadowed_definitions'],
+                    "description": "Definitions never selected by resolution because a higher-priority definition of the same name exists (shadowed_by)."
+                },
+                "summary": dict(report['summary'], project_path=project_path,
+                                entry_scripts=report['entry_scripts'],
+                                unmatched_entries=report['unmatched_entries']),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"死代码检测失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_dominators(self, **kwargs) -> str:
+        """执行必经脚本分析工具"""
+        try:
+            entry_script = kwargs.get('entry_script')
+            if not entry_script:
+                raise ValueError("必须提供 entry_script")
+            target_scripts = kwargs.get('target_scripts') or []
+            granularity = kwargs.get('granularity') or 'script'
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            tree = analyzer.get_dominator_tree(entry_script, granularity=granularity)
+            if tree is None:
+                raise ValueError(f"入口脚本不在工程中: {entry_script}")
+            post_tree = analyzer.get_dominator_tree(entry_script, post=True, granularity=granularity)
+            if granularity == 'function':
+                target_scripts = [analyzer.get_function_graph().resolve_entry(target) or target
+                                  for target in target_scripts]
+            result = {
+                "summary": {
+                    "project_path": project_path,
+                    "entry_script": tree.entry,
+                    "granularity": granularity,
+                    "reachable_scripts": len(tree),
+                    "unreachable_targets": [target for target in target_scripts if target not in tree]
+                },
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            if target_scripts:
+                result["targets"] = {
+                    "data": {target: {
+                        "dominators": tree.dominators(target),
+                        "post_dominators": post_tree.dominators(target),
+                        "dominated_scripts": tree.dominated_scripts(target)
+                    } for target in target_scripts if target in tree},
+                    "description": "For each target: dominators = scripts on every call path from the entry to the target (entry first); post_dominators = scripts on every path from the target to a leaf (nearest first); dominated_scripts = scripts reachable from the entry only through the target."
+                }
+            else:
+                result["immediate_dominators"] = {
+                    "data": tree.to_dict(),
+                    "description": "Dominator tree as script -> immediate dominator (null for the entry)."
+                }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"必经脚本分析失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_module_coupling(self, **kwargs) -> str:
+        """执行目录/包级耦合度量工具"""
+        try:
+            group_by = kwargs.get('group_by') or 'directory'
+            depth = int(kwargs.get('depth', 1))
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            coupling = aggregate_call_graph(analyzer, group_by, depth)
+            result = {
+                "groups": {
+                    "data": coupling['groups'],
+                    "description": "Per group: scripts, internal_edges, outgoing/incoming cross-group edges, fan_out/fan_in (distinct groups), efferent/afferent coupling (Ce/Ca, distinct scripts) and instability Ce/(Ca+Ce) (null when the group has no cross-group edges)."
+                },
+                "edges": {
+                    "data": coupling['edges'],
+                    "description": "Cross-group dependencies; weight is the number of script-level call edges from source group to target group, heaviest first."
+                },
+                "cycles": {
+                    "data": coupling['cycles'],
+                    "description": "Groups that depend on each other cyclically (strongly connected components of the group graph), with the edges inside each cycle, lightest first."
+                },
+                "summary": dict(coupling['summary'], project_path=project_path),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"耦合度量失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
+    async def execute_matlab_hotspots(self, **kwargs) -> str:
+        """执行调用图热点排名工具"""
+        try:
+            top_n = int(kwargs.get('top_n', 20))
+            by = kwargs.get('by') or 'pagerank'
+            granularity = kwargs.get('granularity') or 'script'
+            project_path, analyzer = self._prepare_analyzer(kwargs)
+
+            hotspots = rank_hotspots(analyzer, top_n=top_n, by=by, granularity=granularity)
+            result = {
+                "ranking": {
+                    "data": hotspots['ranking'],
+                    "description": "Top nodes by the chosen metric: pagerank (rank flowing from callers to callees, sums to 1 over all nodes), in_degree/out_degree (direct callers/callees), paths_to (call paths from root scripts), paths_from (call paths to leaf scripts), path_count = paths_to * paths_from (root-to-leaf paths through the node; cycles are collapsed into one node first), in_cycle (node is part of a call cycle)."
+                },
+                "summary": dict(hotspots['summary'], project_path=project_path),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(result, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"热点排名失败: {e}")
+            error_result = {
+                "error": str(e),
+                "analysis_time": datetime.now().isoformat(),
+                "input_parameters": kwargs
+            }
+            return json.dumps(error_result, ensure_ascii=False, indent=2)
+
     async def handle_tools_call(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """处理工具调用请求"""
         request_id = request.get('id')
@@ -258,6 +941,24 @@ class MCPRecursiveAnalyzerServer:
         try:
             if tool_name == 'matlab_recursive_analyze':
                 result_text = await self.execute_matlab_recursive_analyze(**arguments)
+            elif tool_name == 'matlab_parse_cost_report':
+                result_text = await self.execute_matlab_parse_cost_report(**arguments)
+            elif tool_name == 'matlab_explain_call_edge':
+                result_text = await self.execute_matlab_explain_call_edge(**arguments)
+            elif tool_name == 'matlab_find_references':
+                result_text = await self.execute_matlab_find_references(**arguments)
+            elif tool_name == 'matlab_change_impact':
+                result_text = await self.execute_matlab_change_impact(**arguments)
+            elif tool_name == 'matlab_select_tests':
+                result_text = await self.execute_matlab_select_tests(**arguments)
+            elif tool_name == 'matlab_dead_code':
+                result_text = await self.execute_matlab_dead_code(**arguments)
+            elif tool_name == 'matlab_dominators':
+                result_text = await self.execute_matlab_dominators(**arguments)
+            elif tool_name == 'matlab_module_coupling':
+                result_text = await self.execute_matlab_module_coupling(**arguments)
+            elif tool_name == 'matlab_hotspots':
+                result_text = await self.execute_matlab_hotspots(**arguments)
             else:
                 result_text = f"错误: 未知工具 '{tool_name}'"
             
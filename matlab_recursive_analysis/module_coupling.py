@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+目录/包级聚合调用图与耦合度量
+将脚本按顶层目录（可指定层数）或 +包/@类 命名空间合并为分组，在脚本级调用边的整数边表上
+用向量化数组运算（NumPy可选，缺失时退化为纯Python计数）一次得到：
+- 分组间的边权（跨组的脚本级调用边条数）与组内调用边数
+- 扇入/扇出（调用本组/被本组调用的其他分组数）
+- 传入/传出耦合 Ca/Ce（组外调用本组的脚本数/调用组外的本组脚本数）与不稳定度 I = Ce / (Ca + Ce)
+- 分组之间的循环依赖（分组图的强连通分量）
+"""
+
+import os
+import json
+import logging
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional
+
+from recursive_call_analyzer import RecursiveCallAnalyzer
+from script_parser import _folder_namespace
+from graph_snapshot import compute_scc_ids
+from profiling import profile_phase, pop_profile_option, run_profiled
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时使用纯Python计数
+    np = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 分组方式：directory 按目录前缀；package 按 +包/@类 命名空间（命名空间之外的脚本按目录前缀）
+GROUP_MODES = ('directory', 'package')
+
+
+def script_group(script: str, group_by: str = 'directory', depth: int = 1) -> str:
+    """
+    脚本所属的分组（private目录归入其父目录）
+
+    Args:
+        script: 相对工程目录的脚本名
+        group_by: 'directory' 或 'package'
+        depth: 目录前缀的层数（0表示完整目录）
+
+    Returns:
+        分组名；工程根目录下的脚本为 '.'
+    """
+    dirs = script.split(os.sep)[:-1]
+    if dirs and dirs[-1] == 'private':
+        dirs = dirs[:-1]
+    if group_by == 'package':
+        namespace = _folder_namespace(dirs)
+        if namespace:
+            return namespace
+    elif group_by != 'directory':
+        raise ValueError(f"未知的分组方式: {group_by}（可选 {', '.join(GROUP_MODES)}）")
+    prefix = dirs[:depth] if depth > 0 else dirs
+    return os.sep.join(prefix) or '.'
+
+
+def _aggregate_numpy(script_groups: array, src: array, dst: array, group_count: int) -> Dict[str, List[int]]:
+    """向量化聚合（各数组为NumPy整数数组运算）"""
+    groups = np.frombuffer(script_groups, dtype=np.int32).astype(np.int64)
+    src = np.frombuffer(src, dtype=np.int32).astype(np.int64)
+    dst = np.frombuffer(dst, dtype=np.int32).astype(np.int64)
+    group_src = groups[src]
+    group_dst = groups[dst]
+    cross = group_src != group_dst
+    cross_src = src[cross]
+    cross_group_src = group_src[cross]
+    cross_group_dst = group_dst[cross]
+
+    pair_keys, weights = np.unique(cross_group_src * group_count + cross_group_dst, return_counts=True)
+    pair_src = pair_keys // group_count
+    pair_dst = pair_keys % group_count
+    # 调用组外的本组脚本（去重后按所属分组计数）；调用本组的组外脚本（按 (脚本, 目标分组) 去重）
+    efferent_scripts = np.unique(cross_src)
+    afferent_keys = np.unique(cross_src * group_count + cross_group_dst)
+    return {
+        'scripts': np.bincount(groups, minlength=group_count).tolist(),
+        'internal_edges': np.bincount(group_src[~cross], minlength=group_count).tolist(),
+        'pair_src': pair_src.tolist(),
+        'pair_dst': pair_dst.tolist(),
+        'weights': weights.tolist(),
+        'efferent': np.bincount(groups[efferent_scripts], minlength=group_count).tolist(),
+        'afferent': np.bincount(afferent_keys % group_count, minlength=group_count).tolist()
+    }
+
+
+def _aggregate_python(script_groups: array, src: array, dst: array, group_count: int) -> Dict[str, List[int]]:
+    """纯Python聚合（与 _aggregate_numpy 结果相同）"""
+    scripts = [0] * group_count
+    for group in script_groups:
+        scripts[group] += 1
+    internal_edges = [0] * group_count
+    pair_weights: Counter = Counter()
+    efferent_scripts = set()
+    afferent_pairs = set()
+    for caller, callee in zip(src, dst):
+        group_src = script_groups[caller]
+        group_dst = script_groups[callee]
+        if group_src == group_dst:
+            internal_edges[group_src] += 1
+            continue
+        pair_weights[(group_src, group_dst)] += 1
+        efferent_scripts.add(caller)
+        afferent_pairs.add((caller, group_dst))
+    efferent = [0] * group_count
+    for caller in efferent_scripts:
+        efferent[script_groups[caller]] += 1
+    afferent = [0] * group_count
+    for _, group_dst in afferent_pairs:
+        afferent[group_dst] += 1
+    pairs = sorted(pair_weights)
+    return {
+        'scripts': scripts,
+        'internal_edges': internal_edges,
+        'pair_src': [pair[0] for pair in pairs],
+        'pair_dst': [pair[1] for pair in pairs],
+        'weights': [pair_weights[pair] for pair in pairs],
+        'efferent': efferent,
+        'afferent': afferent
+    }
+
+
+def aggregate_call_graph(analyzer: RecursiveCallAnalyzer, group_by: str = 'directory', depth: int = 1,
+                         use_numpy: Optional[bool] = None) -> Dict:
+    """
+    将脚本级调用图聚合为分组图并计算耦合度量
+
+    Args:
+        analyzer: 分析器（未解析时先解析并建图）
+        group_by: 'directory' 或 'package'（见 script_group）
+        depth: 目录前缀的层数（0表示完整目录）
+        use_numpy: 是否使用NumPy（None表示可用时使用）
+
+    Returns:
+        {'groups': 每个分组的度量, 'edges': 分组间的边（按边权降序）,
+         'cycles': 循环依赖的分组及其内部的边, 'summary'}
+    """
+    analyzer._ensure_parsed_and_built()
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ValueError("未安装NumPy")
+
+    with profile_phase('coupling: edge list'):
+        scripts = sorted(analyzer.script_functions)
+        script_ids = {script: i for i, script in enumerate(scripts)}
+        group_of = [script_group(script, group_by, depth) for script in scripts]
+        group_names = sorted(set(group_of))
+        group_ids = {group: i for i, group in enumerate(group_names)}
+        script_groups = array('i', [group_ids[group] for group in group_of])
+        src = array('i')
+        dst = array('i')
+        for caller, callees in analyzer.call_graph.items():
+            caller_id = script_ids.get(caller)
+            if caller_id is None:
+                continue
+            for callee in callees:
+                callee_id = script_ids.get(callee)
+                if callee_id is not None:
+                    src.append(caller_id)
+                    dst.append(callee_id)
+
+    group_count = len(group_names)
+    with profile_phase('coupling: aggregate'):
+        aggregate = (_aggregate_numpy if use_numpy else _aggregate_python)(script_groups, src, dst, group_count)
+
+    pair_src, pair_dst, weights = aggregate['pair_src'], aggregate['pair_dst'], aggregate['weights']
+    with profile_phase('coupling: cycles'):
+        # 分组边已按 (源, 目标) 排序，直接得到CSR
+        offsets = [0] * (group_count + 1)
+        for group in pair_src:
+            offsets[group + 1] += 1
+        for i in range(group_count):
+            offsets[i + 1] += offsets[i]
+        scc_ids = compute_scc_ids(group_count, offsets, pair_dst)
+        members: Dict[int, List[int]] = {}
+        for group, scc in enumerate(scc_ids):
+            members.setdefault(scc, []).append(group)
+        cyclic = {scc: groups for scc, groups in members.items() if len(groups) > 1}
+        edges_in_cycle: Dict[int, List[Dict]] = {scc: [] for scc in cyclic}
+        for s, t, w in zip(pair_src, pair_dst, weights):
+            if scc_ids[s] == scc_ids[t] and scc_ids[s] in edges_in_cycle:
+                edges_in_cycle[scc_ids[s]].append({'source': group_names[s], 'target': group_names[t], 'weight': w})
+        cycles = []
+        for scc, groups in sorted(cyclic.items(), key=lambda item: group_names[item[1][0]]):
+            cycle_edges = edges_in_cycle[scc]
+            # 边权小的依赖最容易拆除，排在前面
+            cycle_edges.sort(key=lambda edge: (edge['weight'], edge['source'], edge['target']))
+            cycles.append({'groups': [group_names[group] for group in groups], 'edges': cycle_edges})
+
+    fan_out = [0] * group_count
+    fan_in = [0] * group_count
+    outgoing = [0] * group_count
+    incoming = [0] * group_count
+    for s, t, w in zip(pair_src, pair_dst, weights):
+        fan_out[s] += 1
+        fan_in[t] += 1
+        outgoing[s] += w
+        incoming[t] += w
+    groups_report = []
+    for i, name in enumerate(group_names):
+        afferent, efferent = aggregate['afferent'][i], aggregate['efferent'][i]
+        groups_report.append({
+            'group': name,
+            'scripts': aggregate['scripts'][i],
+            'internal_edges': aggregate['internal_edges'][i],
+            'outgoing_edges': outgoing[i],
+            'incoming_edges': incoming[i],
+            'fan_out': fan_out[i],
+            'fan_in': fan_in[i],
+            'efferent': efferent,
+            'afferent': afferent,
+            'instability': round(efferent / (afferent + efferent), 4) if afferent + efferent else None
+        })
+    edges = [{'source': group_names[s], 'target': group_names[t], 'weight': w}
+             for s, t, w in zip(pair_src, pair_dst, weights)]
+    edges.sort(key=lambda edge: (-edge['weight'], edge['source'], edge['target']))
+
+    summary = {
+        'group_by': group_by,
+        'depth': depth,
+        'backend': 'numpy' if use_numpy else 'python',
+        'scripts': len(scripts),
+        'groups': group_count,
+        'script_edges': len(src),
+        'cross_group_script_edges': sum(weights),
+        'group_edges': len(edges),
+        'cyclic_groups': sum(len(cycle['groups']) for cycle in cycles)
+    }
+    logger.info(f"{len(scripts)} 个脚本聚合为 {group_count} 个分组，分组间边 {len(edges)} 条，"
+                f"循环依赖 {len(cycles)} 组")
+    return {'groups': groups_report, 'edges': edges, 'cycles': cycles, 'summary': summary}
+
+
+def print_coupling_report(result: Dict, top_n: int = 20) -> None:
+    """打印分组耦合度量"""
+    summary = result['summary']
+    print(f"\n=== 分组耦合度量（{summary['group_by']}, 层数 {summary['depth']}）===")
+    print(f"脚本 {summary['scripts']} 个, 分组 {summary['groups']} 个, 跨组调用边 "
+          f"{summary['cross_group_script_edges']} / {summary['script_edges']} 条")
+
+    print(f"\n  {'脚本':>6}{'组内边':>8}{'扇入':>6}{'扇出':>6}{'Ca':>6}{'Ce':>6}{'I':>6}  分组")
+    for group in result['groups']:
+        instability = '-' if group['instability'] is None else f"{group['instability']:.2f}"
+        print(f"  {group['scripts']:>6}{group['internal_edges']:>8}{group['fan_in']:>6}{group['fan_out']:>6}"
+              f"{group['afferent']:>6}{group['efferent']:>6}{instability:>6}  {group['group']}")
+
+    print(f"\n分组间的边（前 {min(top_n, len(result['edges']))} / {len(result['edges'])} 条）:")
+    for edge in result['edges'][:top_n]:
+        print(f"  {edge['source']} -> {edge['target']}  ({edge['weight']})")
+
+    print(f"\n循环依赖: {len(result['cycles'])} 组")
+    for cycle in result['cycles']:
+        print(f"  {', '.join(cycle['groups'])}")
+        for edge in cycle['edges']:
+            print(f"    {edge['source']} -> {edge['target']}  ({edge['weight']})")
+
+
+def main():
+    """主函数"""
+    import sys
+
+    argv, profile_output = pop_profile_option(sys.argv, "module_coupling.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+
+    args = sys.argv[1:]
+    options = {'--group-by': 'directory', '--depth': '1', '--top': '20', '--json': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if len(positional) != 1 or options['--group-by'] not in GROUP_MODES:
+        print("用法: python module_coupling.py <MATLAB工程路径> [--group-by directory|package] [--depth 层数] "
+              "[--top 边数] [--json 输出文件] [--profile[=输出文件]]")
+        print("  --depth 0 表示按完整目录分组；package 方式下 +包/@类 按命名空间分组")
+        print("示例:")
+        print("  python module_coupling.py test_project")
+        print("  python module_coupling.py test_project --group-by package --depth 2 --json coupling.json")
+        sys.exit(1)
+
+    project_path = positional[0]
+    if not os.path.exists(project_path):
+        print(f"错误: 路径 {project_path} 不存在")
+        sys.exit(1)
+
+    analyzer = RecursiveCallAnalyzer(project_path)
+    result = aggregate_call_graph(analyzer, options['--group-by'], int(options['--depth']))
+    print_coupling_report(result, int(options['--top']))
+    if options['--json']:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"耦合度量已保存: {options['--json']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
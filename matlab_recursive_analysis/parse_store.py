@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+按内容去重的解析结果库
+解析结果只取决于文件内容与解析选项，以git blob id（磁盘文件按相同算法计算）为键保存，
+不同工程路径、版本文件夹或git版本中字节相同的文件只解析一次
+"""
+
+import os
+import sys
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "matlab-parse-store"
+STORE_VERSION = 2
+
+# 单个函数定义（与脚本位置无关的部分）：
+# (函数名, 行号, 字节偏移, 作用域, 父函数, 结束行, 签名文本)
+DefinitionTemplate = Tuple[str, int, int, Optional[str], Optional[str], Optional[int], Optional[str]]
+
+
+class ParsedContent(NamedTuple):
+    """单个文件内容的解析结果（不含脚本名，可被内容相同的多个脚本共享）"""
+    definitions: Tuple[DefinitionTemplate, ...]  # 显式函数定义（按名称排序）
+    call_sites: object  # script_parser.CallSites，只读共享
+    imports: Tuple[str, ...]
+    line_count: int
+    has_content: bool  # 是否有非空白内容（无函数定义时按脚本文件登记）
+    encoding: str
+    parse_seconds: float  # 首次解析的耗时（命中时沿用，保证按耗时阈值的判断稳定）
+
+
+def git_blob_id(data) -> str:
+    """
+    按git的算法计算内容的blob id（磁盘文件与git对象库中的相同内容得到相同的键）
+
+    Args:
+        data: 文件内容（bytes或mmap）
+
+    Returns:
+        40位十六进制sha1
+    """
+    digest = hashlib.sha1(b'blob %d\0' % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ParseStore:
+    """
+    解析结果库：(blob id, 解析选项) -> ParsedContent
+    可由多个解析器实例共享；指定路径时可在多次运行之间持久化
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 持久化文件路径（存在时自动加载；None表示仅在内存中）
+        """
+        self.path = Path(path) if path else None
+        self.entries: Dict[Tuple, ParsedContent] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Tuple) -> Optional[ParsedContent]:
+        """查找解析结果，同时统计命中率"""
+        parsed = self.entries.get(key)
+        if parsed is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return parsed
+
+    def __contains__(self, key: Tuple) -> bool:
+        return key in self.entries
+
+    def put(self, key: Tuple, parsed: ParsedContent) -> None:
+        self.entries[key] = parsed
+
+    def load(self) -> bool:
+        """
+        从持久化文件加载（格式或版本不符时忽略）
+
+        Returns:
+            加载成功返回True
+        """
+        try:
+            payload = pickle.loads(self.path.read_bytes())
+        except Exception as e:
+            logger.warning(f"读取解析结果库 {self.path} 失败: {e}")
+            return False
+        if payload.get("format") != STORE_FORMAT or payload.get("version") != STORE_VERSION:
+            logger.info(f"解析结果库 {self.path} 版本不兼容，忽略")
+            return False
+        for parsed in payload["entries"].values():
+            # 名称与扫描得到的名称共享同一个字符串对象
+            parsed.call_sites.names = tuple(map(sys.intern, parsed.call_sites.names))
+        self.entries.update(payload["entries"])
+        logger.info(f"已加载解析结果库: {len(payload['entries'])} 条")
+        return True
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        保存到持久化文件（先写临时文件再替换）
+
+        Args:
+            path: 保存路径（默认为构造时的路径）
+        """
+        target = Path(path) if path else self.path
+        if target is None:
+            raise ValueError("未指定解析结果库的保存路径")
+        payload = {"format": STORE_FORMAT, "version": STORE_VERSION, "entries": self.entries}
+        tmp_path = target.with_suffix(target.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, target)
+        logger.info(f"解析结果库已保存: {target} ({len(self.entries)} 条)")
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
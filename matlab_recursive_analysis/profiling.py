@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+性能剖析工具
+为命令行入口提供 --profile 选项：使用cProfile与tracemalloc包裹整个运行，
+输出pstats文件，并打印各阶段（扫描各遍、建图、遍历、报告生成）的耗时与内存峰值表
+"""
+
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROFILE_OPTION = '--profile'
+
+
+class PhaseProfiler:
+    """分阶段计时与内存峰值记录器（支持阶段嵌套）"""
+
+    def __init__(self):
+        self.records: Dict[Tuple[str, ...], Dict] = {}  # 阶段路径 -> 统计
+        self._stack: List[Dict] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """记录一个阶段；嵌套阶段的内存峰值会同时计入外层阶段"""
+        tracing = tracemalloc.is_tracing()
+        if tracing and self._stack:
+            # reset_peak会清掉外层阶段到目前为止的峰值，先保存下来
+            parent = self._stack[-1]
+            parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+        if tracing:
+            tracemalloc.reset_peak()
+        frame = {'name': name, 'peak': 0}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1]) if tracing else 0
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            key = tuple(f['name'] for f in self._stack) + (name,)
+            record = self.records.setdefault(key, {'seconds': 0.0, 'peak_bytes': 0, 'count': 0})
+            record['seconds'] += elapsed
+            record['peak_bytes'] = max(record['peak_bytes'], peak)
+            record['count'] += 1
+
+    def print_table(self) -> None:
+        """打印阶段耗时与内存峰值表"""
+        print("\n=== 性能剖析：各阶段耗时与内存峰值 ===")
+        print(f"  {'阶段':<44}{'次数':>6}{'耗时(s)':>12}{'内存峰值(MB)':>16}")
+        for key, record in self.records_in_order():
+            label = '  ' * (len(key) - 1) + key[-1]
+            print(f"  {label:<44}{record['count']:>6}{record['seconds']:>12.4f}"
+                  f"{record['peak_bytes'] / 1024 / 1024:>16.2f}")
+
+    def records_in_order(self) -> List[Tuple[Tuple[str, ...], Dict]]:
+        """按阶段树的先序顺序返回记录（子阶段紧跟在父阶段之后）"""
+        first_seen = {key: i for i, key in enumerate(self.records)}
+
+        def sort_key(key: Tuple[str, ...]) -> Tuple[int, ...]:
+            # 子阶段先于父阶段结束，因此按各级前缀的首次出现顺序排序
+            return tuple(first_seen.get(key[:i + 1], 0) for i in range(len(key)))
+
+        return sorted(self.records.items(), key=lambda item: sort_key(item[0]))
+
+
+_active_profiler: Optional[PhaseProfiler] = None
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """
+    标记一个可剖析阶段；未启用 --profile 时不做任何事
+
+    Args:
+        name: 阶段名称
+    """
+    if _active_profiler is None:
+        yield
+        return
+    with _active_profiler.phase(name):
+        yield
+
+
+def pop_profile_option(argv: List[str], default_output: str) -> Tuple[List[str], Optional[str]]:
+    """
+    从命令行参数中取出 --profile[=输出文件] 选项
+
+    Args:
+        argv: 原始命令行参数
+        default_output: 未指定输出文件时使用的pstats文件名
+
+    Returns:
+        (去掉该选项后的参数, pstats输出路径；未启用时为None)
+    """
+    remaining = []
+    output = None
+    for arg in argv:
+        if arg == PROFILE_OPTION:
+            output = default_output
+        elif arg.startswith(PROFILE_OPTION + '='):
+            output = arg.split('=', 1)[1] or default_output
+        else:
+            remaining.append(arg)
+    return remaining, output
+
+
+def run_profiled(func: Callable, pstats_output: str, *args, **kwargs):
+    """
+    在cProfile与tracemalloc下运行函数，写出pstats文件并打印阶段表
+
+    Args:
+        func: 被剖析的入口函数
+        pstats_output: pstats输出文件路径
+
+    Returns:
+        func的返回值
+    """
+    global _active_profiler
+    profiler = PhaseProfiler()
+    _active_profiler = profiler
+    tracemalloc.start()
+    c_profile = cProfile.Profile()
+    try:
+        with profiler.phase('total'):
+            c_profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                c_profile.disable()
+    finally:
+        tracemalloc.stop()
+        _active_profiler = None
+        c_profile.dump_stats(pstats_output)
+        profiler.print_table()
+        print(f"\ncProfile结果已保存到: {pstats_output}（可用 python -m pstats {pstats_output} 查看）")
@@ -5,33 +5,51 @@
 """
 
 import json
+import pickle
 import logging
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Collection, Dict, List, Mapping, Set, Tuple, Optional, Sequence, Iterable
 from collections import defaultdict
 from script_parser import ImprovedMATLABScriptParser
+from edge_provenance import EdgeProvenance
+from graph_snapshot import write_graph_snapshot
+from dominators import DominatorTree, build_dominator_tree
+from function_graph import FunctionCallGraph, build_function_graph
+from profiling import profile_phase, pop_profile_option, run_profiled
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 分析快照格式标识与版本（解析表结构变化时需递增版本）
+SNAPSHOT_FORMAT = "matlab-recursive-analyzer-snapshot"
+SNAPSHOT_VERSION = 15
+
+# 遍历查询的图粒度：脚本级（节点为脚本）或函数级（节点为 '脚本>函数'，见 function_graph）
+GRANULARITIES = ('script', 'function')
+
 
 class RecursiveCallAnalyzer:
     """递归调用链分析器"""
     
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, **parser_options):
         """
         初始化递归调用分析器
         
         Args:
             project_path: MATLAB工程根目录路径
+            **parser_options: 传递给 ImprovedMATLABScriptParser 的选项（如 exclude_patterns、use_gitignore）
         """
         self.project_path = Path(project_path)
-        self.parser = ImprovedMATLABScriptParser(project_path)
+        self.parser = ImprovedMATLABScriptParser(project_path, **parser_options)
         self.script_functions: Dict[str, Set[str]] = {}
         self.function_scripts: Dict[str, List[str]] = {}
         self.script_calls: Dict[str, Set[str]] = {}
         self.call_graph: Dict[str, Set[str]] = defaultdict(set)
+        self.edge_provenance = EdgeProvenance()  # 每条调用边的来源（函数名、调用点、解析规则）
+        self._callers_index: Optional[Dict[str, List[str]]] = None  # 反向调用索引（按需建立）
+        self._dominator_trees: Dict[Tuple[str, bool, str], DominatorTree] = {}  # (入口, 是否后支配, 粒度) -> 支配树（按需建立）
+        self._function_graph: Optional[FunctionCallGraph] = None  # 函数级调用图（按需建立）
         self.recursion_stack: List[str] = []  # 递归调用栈
         self.call_chains: Dict[str, List[str]] = {}
         self.recursion_depth: Dict[str, int] = {}  # 记录每个脚本的递归深度
@@ -43,6 +61,10 @@ class RecursiveCallAnalyzer:
         self.function_scripts.clear()
         self.script_calls.clear()
         self.call_graph.clear()
+        self.edge_provenance = EdgeProvenance()
+        self._callers_index = None
+        self._dominator_trees.clear()
+        self._function_graph = None
         self.recursion_stack.clear()
         self.call_chains.clear()
         self.recursion_depth.clear()
@@ -60,17 +82,14 @@ class RecursiveCallAnalyzer:
         """
         logger.info(f"开始递归分析，入口脚本: {entry_script}")
         
-        # 解析工程
-        self._parse_project()
+        # 解析工程并构建调用关系图（已解析或已从快照恢复时直接复用）
+        self._ensure_parsed_and_built()
         
         # 验证入口脚本
         if entry_script not in self.script_functions:
             logger.error(f"入口脚本 {entry_script} 不存在")
             return {}
         
-        # 构建调用关系图
-        self._build_call_graph()
-        
         # 初始化递归分析
         self.recursion_stack = []
         self.call_chains = {}
@@ -78,54 +97,183 @@ class RecursiveCallAnalyzer:
         self.visited_count.clear()
         
         # 开始递归分析
-        self._recursive_analyze(entry_script, [], 0)
+        with profile_phase('traversal: recursive analysis'):
+            self._recursive_analyze(entry_script, [], 0)
         
         # 生成分析报告
-        return self._generate_recursion_report(entry_script)
+        with profile_phase('report: recursion report'):
+            return self._generate_recursion_report(entry_script)
     
     def _parse_project(self) -> None:
         """解析整个工程"""
         logger.info("开始解析MATLAB工程...")
-        self.script_functions = self.parser.scan_project()
+        with profile_phase('scan_project'):
+            self.script_functions = self.parser.scan_project()
         self.function_scripts = self.parser.get_function_scripts()
         self.script_calls = self.parser.get_script_calls()
         logger.info(f"解析完成，共 {len(self.script_functions)} 个脚本文件")
     
     def _build_call_graph(self) -> None:
         """构建调用关系图（考虑MATLAB函数优先级规则）"""
+        with profile_phase('build_call_graph'):
+            self._build_call_graph_edges()
+    
+    def _build_call_graph_edges(self) -> None:
+        """遍历全部函数调用，建立脚本间的调用边"""
         logger.info("构建调用关系图...")
         
-        for script_name, calls in self.script_calls.items():
-            for func_call in calls:
-                if func_call in self.function_scripts:
-                    # 检查是否应该建立外部调用关系
-                    should_create_external_call = True
-                    
-                    # 如果调用脚本有内部定义，检查优先级
-                    if script_name in self.function_scripts[func_call]:
-                        # 使用新的优先级检查方法
-                        func_info = self.parser.get_function_definition_for_script(func_call, script_name)
-                        if func_info.get('is_internal_definition', False):
-                            should_create_external_call = False
-                            logger.debug(f"脚本 {script_name} 有 {func_call} 的内部定义，跳过外部调用关系")
-                    
-                    # 只有在需要外部调用时才建立关系
-                    if should_create_external_call:
-                        # 处理多关联映射：function_scripts[func_call] 现在是 List[str]
-                        called_scripts = self.function_scripts[func_call]
-                        if isinstance(called_scripts, list):
-                            # 使用主定义（列表中的第一个）
-                            called_script = called_scripts[0] if called_scripts else None
-                        else:
-                            # 兼容旧版本（单一映射）
-                            called_script = called_scripts
-                        
-                        if called_script and called_script != script_name:
-                            self.call_graph[script_name].add(called_script)
-                            logger.debug(f"建立调用关系: {script_name} -> {called_script} (函数: {func_call})")
+        self.edge_provenance = EdgeProvenance()
+        self._callers_index = None
+        self._dominator_trees.clear()
+        self._function_graph = None
+        for script_name in self.script_calls:
+            self._build_edges_from(script_name)
         
         logger.info(f"调用关系图构建完成，共 {len(self.call_graph)} 个脚本有调用关系")
     
+    def _build_edges_from(self, script_name: str) -> None:
+        """解析单个脚本的全部函数调用，建立其出边"""
+        sites = self.parser.script_call_sites.get(script_name)
+        for func_call in self.script_calls.get(script_name, ()):
+            # 按MATLAB作用域与优先级规则解析：内部定义优先，其他文件只能看到主函数/脚本文件
+            called_script, rule = self.parser.resolve_function_call_with_rule(func_call, script_name)
+            if called_script and called_script != script_name:
+                self.call_graph[script_name].add(called_script)
+                line, column = (sites.first_site(func_call) if sites else None) or (0, 0)
+                self.edge_provenance.record(script_name, called_script, func_call, line, column, rule)
+                logger.debug(f"建立调用关系: {script_name} -> {called_script} (函数: {func_call}, 规则: {rule})")
+    
+    def update_source(self, project_path: Optional[str] = None, git_revision: Optional[str] = None,
+                      entry_scripts: Sequence[str] = ()) -> Dict:
+        """
+        增量切换到另一个版本文件夹或git版本，并报告调用图的变化
+        只重新解析内容变化的文件，只为调用了受影响函数名的脚本重新建边，
+        入口可达集合只在调用边有变化时重新计算
+        
+        Args:
+            project_path: 新的版本文件夹（工作区模式，None表示沿用当前目录）
+            git_revision: 新的git版本（git模式，None表示沿用当前版本）
+            entry_scripts: 需要比较可达脚本集合的入口脚本
+            
+        Returns:
+            {'added_scripts', 'removed_scripts', 'modified_scripts',
+             'added_edges'/'removed_edges': [调用脚本, 被调用脚本] 列表,
+             'primary_changes': [{'function', 'old', 'new'}]（主定义脚本变化，新增/删除的函数名一侧为None）,
+             'reachability': {入口: {'gained': [...], 'lost': [...]}}（只列出有变化的入口）,
+             'stats': 重新解析的脚本数、重新建边的脚本数、涉及的函数名数}
+        """
+        self._ensure_parsed_and_built()
+        reachable_before = {entry: self.get_reachable_scripts(entry) for entry in entry_scripts}
+        
+        change = self.parser.update_source(project_path, git_revision)
+        if project_path is not None:
+            self.project_path = Path(project_path)
+        self.call_chains.clear()
+        self.recursion_depth.clear()
+        self.visited_count.clear()
+        
+        added_edges: List[List[str]] = []
+        removed_edges: List[List[str]] = []
+        with profile_phase('update 6: rebuild affected edges'):
+            for script in change['removed']:
+                callees = self.call_graph.pop(script, set())
+                self.edge_provenance.forget(script, callees)
+                removed_edges.extend([script, callee] for callee in sorted(callees))
+            for caller in change['affected_callers']:
+                old_callees = self.call_graph.pop(caller, set())
+                self.edge_provenance.forget(caller, old_callees)
+                self._build_edges_from(caller)
+                new_callees = self.call_graph.get(caller, set())
+                removed_edges.extend([caller, callee] for callee in sorted(old_callees - new_callees))
+                added_edges.extend([caller, callee] for callee in sorted(new_callees - old_callees))
+            if self._callers_index is not None:
+                # 反向调用索引只按变化的边修补
+                for caller, callee in removed_edges:
+                    callers = self._callers_index.get(callee)
+                    if callers is not None and caller in callers:
+                        callers.remove(caller)
+                        if not callers:
+                            del self._callers_index[callee]
+                for caller, callee in added_edges:
+                    self._callers_index.setdefault(callee, []).append(caller)
+            if added_edges or removed_edges or change['reparsed'] or change['removed']:
+                self._dominator_trees.clear()
+                self._function_graph = None
+        
+        primary_changes = []
+        for func_name in sorted(change['touched_names']):
+            previous = change['previous_scripts'][func_name]
+            old_primary = previous[0] if previous else None
+            new_primary = (self.function_scripts.get(func_name) or [None])[0]
+            if old_primary != new_primary:
+                primary_changes.append({'function': func_name, 'old': old_primary, 'new': new_primary})
+        
+        reachability: Dict[str, Dict[str, List[str]]] = {}
+        if added_edges or removed_edges or change['added'] or change['removed']:
+            for entry, before in reachable_before.items():
+                after = self.get_reachable_scripts(entry)
+                if after != before:
+                    reachability[entry] = {'gained': sorted(after - before), 'lost': sorted(before - after)}
+        
+        logger.info(f"调用图增量更新完成: 新增边 {len(added_edges)} 条, 删除边 {len(removed_edges)} 条, "
+                    f"主定义变化 {len(primary_changes)} 个")
+        return {
+            'added_scripts': change['added'],
+            'removed_scripts': change['removed'],
+            'modified_scripts': change['modified'],
+            'added_edges': added_edges,
+            'removed_edges': removed_edges,
+            'primary_changes': primary_changes,
+            'reachability': reachability,
+            'stats': {
+                'reparsed_scripts': len(change['reparsed']),
+                'rebuilt_callers': len(change['affected_callers']),
+                'touched_names': len(change['touched_names'])
+            }
+        }
+    
+    def _graph(self, granularity: str) -> Tuple[Mapping[str, Iterable[str]], Collection[str]]:
+        """按粒度获取 (邻接关系, 全部节点)，遍历查询在两种粒度上共用同一套实现"""
+        if granularity == 'script':
+            return self.call_graph, self.script_functions
+        if granularity == 'function':
+            graph = self.get_function_graph()
+            return graph.adjacency, graph.node_ids
+        raise ValueError(f"未知的图粒度: {granularity}（可选 {', '.join(GRANULARITIES)}）")
+    
+    def get_function_graph(self) -> FunctionCallGraph:
+        """获取函数级调用图（首次使用时建立，调用图重建或增量更新后失效）"""
+        self._ensure_parsed_and_built()
+        if self._function_graph is None:
+            with profile_phase('build_function_graph'):
+                self._function_graph = build_function_graph(self.parser)
+        return self._function_graph
+    
+    def get_reachable_scripts(self, entry_script: str, granularity: str = 'script') -> Set[str]:
+        """
+        获取从入口脚本出发经调用边可达的全部脚本（含入口本身；入口不在工程中时为空集合）
+        
+        Args:
+            entry_script: 入口脚本（函数粒度下也可为 '脚本>函数' 节点，脚本取其入口函数）
+            granularity: 图粒度 'script' 或 'function'（函数粒度下返回函数节点）
+            
+        Returns:
+            可达脚本（或函数节点）集合
+        """
+        graph, nodes = self._graph(granularity)
+        if granularity == 'function':
+            entry_script = self._function_graph.resolve_entry(entry_script)
+        if entry_script not in nodes:
+            return set()
+        reachable = {entry_script}
+        stack = [entry_script]
+        while stack:
+            for callee in graph.get(stack.pop(), ()):
+                if callee not in reachable:
+                    reachable.add(callee)
+                    stack.append(callee)
+        return reachable
+    
     def _recursive_analyze(self, current_script: str, current_path: List[str], depth: int) -> None:
         """
         递归分析的核心方法
@@ -341,7 +489,8 @@ class RecursiveCallAnalyzer:
             return all_paths
         
         # 查找所有可能的路径
-        all_paths = find_all_paths(from_script, to_script)
+        with profile_phase('traversal: all paths'):
+            all_paths = find_all_paths(from_script, to_script)
         
         # 按路径长度排序
         all_paths.sort(key=len)
@@ -390,7 +539,8 @@ class RecursiveCallAnalyzer:
             return all_paths
         
         # 查找所有可能的路径
-        all_paths = find_all_paths(from_script, to_script)
+        with profile_phase('traversal: shortest path'):
+            all_paths = find_all_paths(from_script, to_script)
         
         # 返回最短的路径（如果存在）
         if all_paths:
@@ -441,7 +591,8 @@ class RecursiveCallAnalyzer:
             return all_paths
         
         # 查找所有路径
-        all_paths = find_all_paths(analysis_script)
+        with profile_phase('traversal: paths to leaves'):
+            all_paths = find_all_paths(analysis_script)
         
         return all_paths
     
@@ -552,30 +703,304 @@ class RecursiveCallAnalyzer:
         if not self.call_graph:
             self._build_call_graph()
     
-    def get_root_scripts(self) -> List[str]:
-        """获取工程中的根脚本（未被其他脚本调用的脚本）"""
+    def export_graph_snapshot(self, snapshot_path: str) -> Dict[str, int]:
+        """
+        导出只读调用图快照（CSR扁平数组 + 字符串表），供其他进程通过mmap共享
+
+        Args:
+            snapshot_path: 快照文件路径
+
+        Returns:
+            快照统计信息
+        """
+        self._ensure_parsed_and_built()
+        return write_graph_snapshot(snapshot_path, self.call_graph, self.script_functions.keys(), self.function_scripts,
+                                    self.edge_provenance)
+    
+    def save_snapshot(self, snapshot_path: str) -> None:
+        """
+        保存解析结果与调用图快照，用于下次快速热启动
+
+        Args:
+            snapshot_path: 快照文件路径
+        """
+        self._ensure_parsed_and_built()
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "project_path": str(self.project_path.resolve()),
+            "options": self.parser.snapshot_options(),
+            "fingerprint": self.parser.compute_fingerprint(),
+            "parser_state": self.parser.export_state(),
+            "call_graph": dict(self.call_graph),
+            "edge_provenance": self.edge_provenance
+        }
+        path = Path(snapshot_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+        logger.info(f"分析快照已保存: {snapshot_path}")
+    
+    def load_snapshot(self, snapshot_path: str, verify: bool = True) -> bool:
+        """
+        从快照恢复解析表、MATLAB搜索路径、主定义顺序与调用图，不遍历工程目录
+        
+        Args:
+            snapshot_path: 快照文件路径
+            verify: 是否校验工程指纹（仅stat已记录的脚本和目录）
+            
+        Returns:
+            恢复成功返回True；快照不存在、不兼容或指纹不一致时返回False
+        """
+        path = Path(snapshot_path)
+        if not path.exists():
+            return False
+        try:
+            snapshot = pickle.loads(path.read_bytes())
+        except Exception as e:
+            logger.warning(f"读取分析快照 {snapshot_path} 失败: {e}")
+            return False
+        
+        if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.info(f"分析快照 {snapshot_path} 版本不兼容，忽略")
+            return False
+        if snapshot.get("project_path") != str(self.project_path.resolve()):
+            logger.info(f"分析快照 {snapshot_path} 不属于工程 {self.project_path}，忽略")
+            return False
+        if snapshot.get("options") != self.parser.snapshot_options():
+            logger.info(f"分析快照 {snapshot_path} 的解析选项（作用域、包含/排除规则、编码等）与当前不同，忽略")
+            return False
+        if verify and not self.parser.fingerprint_matches(snapshot["fingerprint"]):
+            # 快照过期时仍沿用其中探测到的文件编码，重新扫描时未变化的文件省去试解码
+            state = snapshot["parser_state"]
+            self.parser.adopt_encoding_hints(state["file_encodings"], state["file_stats"])
+            return False
+        
+        self.reset()
+        self.parser.restore_state(snapshot["parser_state"])
+        self.script_functions = self.parser.get_script_functions()
+        self.function_scripts = self.parser.get_function_scripts()
+        self.script_calls = self.parser.get_script_calls()
+        self.call_graph = defaultdict(set, snapshot["call_graph"])
+        self.edge_provenance = snapshot["edge_provenance"]
+        logger.info(f"已从快照恢复: {len(self.script_functions)} 个脚本, {len(self.call_graph)} 个脚本有调用关系")
+        return True
+    
+    def explain_call_edge(self, caller: str, callee: Optional[str] = None) -> List[Dict]:
+        """
+        说明调用边的来源（直接查表，不读取源文件）
+        
+        Args:
+            caller: 调用脚本
+            callee: 被调用脚本；为None时返回调用脚本的全部出边
+            
+        Returns:
+            来源列表，每项包含 caller/callee/function/line/column/rule；边不存在时为空列表
+        """
+        self._ensure_parsed_and_built()
+        if callee is not None:
+            info = self.edge_provenance.explain(caller, callee)
+            return [info] if info else []
+        return self.edge_provenance.edges_from(caller, self.call_graph.get(caller, ()))
+    
+    def find_references(self, func_name: str, defined_in: Optional[str] = None) -> List[Dict]:
+        """
+        查找函数的全部调用点（调用脚本、所在函数、行列号），包括无法解析到定义的调用
+        
+        Args:
+            func_name: 被调用的函数名
+            defined_in: 只返回解析到该脚本中定义的调用（None表示不过滤）
+            
+        Returns:
+            调用点列表，字段见 ImprovedMATLABScriptParser.find_references
+        """
+        if not self.script_functions:
+            self._parse_project()
+        return self.parser.find_references(func_name, defined_in)
+    
+    def get_incoming_calls(self, script: str) -> List[Dict]:
+        """
+        查找解析到该脚本中定义的全部外部调用（经调用点索引定位候选调用者，不遍历整个调用图）
+        
+        Args:
+            script: 被调用脚本
+            
+        Returns:
+            每个 (调用脚本, 函数名) 一项：caller/function/line/column/rule，line/column为首个调用点，
+            按调用脚本与函数名排序
+        """
         self._ensure_parsed_and_built()
+        incoming = []
+        for func_name in self.script_functions.get(script, ()):
+            names = {func_name, func_name.rpartition('.')[2]}
+            for name in sorted(names):
+                for caller in self.parser.call_references.get(name, ()):
+                    if caller == script:
+                        continue
+                    called_script, rule = self.parser.resolve_function_call_with_rule(name, caller)
+                    if called_script != script:
+                        continue
+                    sites = self.parser.script_call_sites.get(caller)
+                    line, column = (sites.first_site(name) if sites else None) or (0, 0)
+                    incoming.append({'caller': caller, 'function': name, 'line': line, 'column': column, 'rule': rule})
+        incoming.sort(key=lambda call: (call['caller'], call['function']))
+        return incoming
+    
+    def get_callers_index(self, granularity: str = 'script') -> Dict[str, List[str]]:
+        """
+        获取反向调用索引：被调用脚本 -> 直接调用它的脚本
+        首次使用时由调用图一次建立（线性时间），之后的上游查询只访问受影响的子图；增量更新时按变化的边修补
+        
+        Args:
+            granularity: 图粒度 'script' 或 'function'（函数粒度下由函数级调用图的反向CSR建立）
+        """
+        if granularity != 'script':
+            self._graph(granularity)
+            return self._function_graph.get_callers_index()
+        self._ensure_parsed_and_built()
+        if self._callers_index is None:
+            callers_of: Dict[str, List[str]] = {}
+            for caller, callees in self.call_graph.items():
+                for callee in callees:
+                    callers_of.setdefault(callee, []).append(caller)
+            self._callers_index = callers_of
+        return self._callers_index
+    
+    def get_dominator_tree(self, entry_script: str, post: bool = False,
+                           granularity: str = 'script') -> Optional[DominatorTree]:
+        """
+        获取入口可达子图上的支配树或后支配树（按入口缓存，调用边变化时失效）
+        
+        Args:
+            entry_script: 入口脚本（函数粒度下也可为 '脚本>函数' 节点，脚本取其入口函数）
+            post: True获取后支配树（以叶子为出口）
+            granularity: 图粒度 'script' 或 'function'
+            
+        Returns:
+            DominatorTree；入口不在工程中时返回None
+        """
+        self._ensure_parsed_and_built()
+        graph, _ = self._graph(granularity)
+        if granularity == 'function':
+            entry_script = self._function_graph.resolve_entry(entry_script)
+        key = (entry_script, post, granularity)
+        tree = self._dominator_trees.get(key)
+        if tree is None:
+            reachable = self.get_reachable_scripts(entry_script, granularity)
+            if not reachable:
+                return None
+            with profile_phase('dominator tree'):
+                tree = build_dominator_tree(graph, entry_script, reachable, post)
+            self._dominator_trees[key] = tree
+        return tree
+    
+    def get_upstream_scripts(self, target_scripts: List[str], granularity: str = 'script') -> Set[str]:
+        """
+        获取能经调用边到达任一目标脚本的全部脚本（多源反向BFS，一次遍历处理全部目标）
+        
+        Args:
+            target_scripts: 目标脚本（函数粒度下也可为 '脚本>函数' 节点，脚本展开为其中的全部函数）
+            granularity: 图粒度 'script' 或 'function'（函数粒度下返回函数节点）
+            
+        Returns:
+            上游脚本（或函数节点）集合（含目标本身；不在工程中的目标忽略）
+        """
+        callers_of = self.get_callers_index(granularity)
+        if granularity == 'function':
+            upstream = set(self._function_graph.resolve_targets(target_scripts))
+        else:
+            upstream = {script for script in target_scripts if script in self.script_functions}
+        stack = list(upstream)
+        while stack:
+            for caller in callers_of.get(stack.pop(), ()):
+                if caller not in upstream:
+                    upstream.add(caller)
+                    stack.append(caller)
+        return upstream
+    
+    def get_root_scripts(self, granularity: str = 'script') -> List[str]:
+        """获取工程中的根脚本（未被其他脚本调用的脚本；函数粒度下为未被其他函数调用的函数节点）"""
+        self._ensure_parsed_and_built()
+        graph, nodes = self._graph(granularity)
         called_scripts: Set[str] = set()
-        for calls in self.call_graph.values():
+        for calls in graph.values():
             called_scripts.update(calls)
         roots: List[str] = []
-        for script in self.script_functions.keys():
+        for script in nodes:
             if script not in called_scripts:
                 roots.append(script)
         return roots
     
-    def find_all_paths_from_roots_to_target(self, target_script: str, roots: Optional[List[str]] = None) -> List[List[str]]:
-        """从所有根脚本出发，找到到达目标脚本的所有路径"""
+    def _enumerate_simple_paths(self, graph: Mapping[str, Iterable[str]], start: str,
+                                targets: Optional[Set[str]] = None) -> List[List[str]]:
+        """
+        枚举从起点出发的简单路径（显式栈，路径中不重复经过同一节点）
+
+        Args:
+            graph: 邻接关系（任一粒度）
+            start: 起点
+            targets: 指定时返回到达任一目标即结束的路径；None时返回到达叶子（无出边）的路径（不含只有起点的路径）
+
+        Returns:
+            路径列表（按长度排序）
+        """
+        paths: List[List[str]] = []
+        path = [start]
+        on_path = {start}
+        if targets is not None and start in targets:
+            return [[start]]
+        stack = [iter(sorted(graph.get(start, ())))]
+        while stack:
+            callee = next(stack[-1], None)
+            if callee is None:
+                stack.pop()
+                on_path.discard(path.pop())
+                continue
+            if callee in on_path:
+                continue
+            if targets is not None and callee in targets:
+                paths.append(path + [callee])
+                continue
+            callees = graph.get(callee, ())
+            if targets is None and not callees:
+                paths.append(path + [callee])
+                continue
+            path.append(callee)
+            on_path.add(callee)
+            stack.append(iter(sorted(callees)))
+        paths.sort(key=len)
+        return paths
+    
+    def find_all_paths_from_roots_to_target(self, target_script: str, roots: Optional[List[str]] = None,
+                                            granularity: str = 'script') -> List[List[str]]:
+        """
+        从所有根脚本出发，找到到达目标脚本的所有路径
+        
+        Args:
+            target_script: 目标脚本（函数粒度下也可为 '脚本>函数' 节点，脚本展开为其中的全部函数）
+            roots: 起点（None表示该粒度下的全部根节点；函数粒度下脚本取其入口函数）
+            granularity: 图粒度 'script' 或 'function'（函数粒度下路径由 '脚本>函数' 节点组成）
+        """
         self._ensure_parsed_and_built()
         if roots is None:
-            roots = self.get_root_scripts()
+            roots = self.get_root_scripts(granularity)
         all_paths: List[List[str]] = []
-        for root in roots:
-            if root == target_script:
-                all_paths.append([root])
-                continue
-            paths = self._find_all_paths_to_script(root, target_script)
-            all_paths.extend(paths)
+        if granularity == 'function':
+            graph, _ = self._graph(granularity)
+            targets = set(self._function_graph.resolve_targets([target_script]))
+            for root in roots:
+                root = self._function_graph.resolve_entry(root)
+                if root is not None and targets:
+                    all_paths.extend(self._enumerate_simple_paths(graph, root, targets))
+        else:
+            for root in roots:
+                if root == target_script:
+                    all_paths.append([root])
+                    continue
+                paths = self._find_all_paths_to_script(root, target_script)
+                all_paths.extend(paths)
         # 去重（按列表内容）
         unique_paths = []
         seen = set()
@@ -586,28 +1011,38 @@ class RecursiveCallAnalyzer:
                 unique_paths.append(p)
         return unique_paths
     
-    def analyze_impact_for_changes(self, changed_scripts: List[str], entry_roots: Optional[List[str]] = None) -> Dict[str, Dict]:
+    def analyze_impact_for_changes(self, changed_scripts: List[str], entry_roots: Optional[List[str]] = None,
+                                   granularity: str = 'script') -> Dict[str, Dict]:
         """基于变更脚本进行影响分析
         返回每个变更脚本的：
         - 从根脚本到变更脚本的所有路径（上游影响）
         - 从变更脚本到各叶子的所有路径（下游影响）
+        函数粒度下路径由 '脚本>函数' 节点组成：上游路径到达变更脚本中的任一函数即结束，
+        下游路径从变更脚本中的每个函数出发（变更项为 '脚本>函数' 节点时只取该函数）
         """
         self._ensure_parsed_and_built()
-        roots = entry_roots if entry_roots is not None else self.get_root_scripts()
+        graph, _ = self._graph(granularity)
+        roots = entry_roots if entry_roots is not None else self.get_root_scripts(granularity)
+        unit = "function nodes ('script>function')" if granularity == 'function' else "scripts"
         impact_result: Dict[str, Dict] = {}
         for script in changed_scripts:
             # 规范化为相对路径风格（如果传入的是相对路径，这里不做变更）
             target = script
-            upstream_paths = self.find_all_paths_from_roots_to_target(target, roots)
-            downstream_paths = self._find_paths_to_leaves(target)
+            upstream_paths = self.find_all_paths_from_roots_to_target(target, roots, granularity)
+            if granularity == 'function':
+                downstream_paths = []
+                for node in self._function_graph.resolve_targets([target]):
+                    downstream_paths.extend(self._enumerate_simple_paths(graph, node))
+            else:
+                downstream_paths = self._find_paths_to_leaves(target)
             impact_result[target] = {
                 "entry_to_changed": {
                     "data": upstream_paths,
-                    "description": "All paths from project entry roots to the changed script. Each path is a list of scripts (relative to project_path)."
+                    "description": f"All paths from project entry roots to the changed script. Each path is a list of {unit} (relative to project_path)."
                 },
                 "changed_to_leaves": {
                     "data": downstream_paths,
-                    "description": "All paths from the changed script to reachable leaf scripts. Each path is a list of scripts (relative to project_path)."
+                    "description": f"All paths from the changed script to reachable leaf {unit}. Each path is a list of {unit} (relative to project_path)."
                 },
                 "stats": {
                     "upstream_path_count": len(upstream_paths),
@@ -616,13 +1051,17 @@ class RecursiveCallAnalyzer:
             }
         return impact_result
 
-
 def main():
     """主函数，用于测试"""
     import sys
     
+    argv, profile_output = pop_profile_option(sys.argv, "recursive_call_analyzer.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+    
     if len(sys.argv) < 3:
-        print("用法: python recursive_call_analyzer.py <MATLAB工程路径> <入口脚本> [分析脚本]")
+        print("用法: python recursive_call_analyzer.py <MATLAB工程路径> <入口脚本> [分析脚本] [--profile[=输出文件]]")
         print("示例:")
         print("  python recursive_call_analyzer.py test_project complex_main.m")
         print("  python recursive_call_analyzer.py test_project complex_main.m manager.m")
@@ -678,7 +1117,8 @@ def main():
         return entry_to_analysis_path, analysis_to_leaves_paths
     else:
         # 执行普通递归分析
-        analyzer.print_recursion_analysis(entry_script)
+        with profile_phase('report: print analysis'):
+            analyzer.print_recursion_analysis(entry_script)
         
         # 返回递归分析结果
         report = analyzer.analyze_recursive_calls(entry_script)
@@ -7,38 +7,350 @@
 
 import os
 import re
+import sys
+import time
+import mmap
 import logging
+from array import array
+from bisect import bisect_left, insort
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Optional, Sequence, Union
 import traceback
 
+from file_discovery import DEFAULT_EXCLUDE_PATTERNS, DEFAULT_INCLUDE_PATTERNS, DiscoveredFile, discover_matlab_files
+from git_source import GitBlobReader, GitSourceError, GitSourceLines, list_matlab_blobs, resolve_tree
+from parse_store import ParsedContent, ParseStore, git_blob_id
+from profiling import profile_phase, pop_profile_option, run_profiled
+from source_reader import (DEFAULT_MAPPED_READ_SIZE, DEFAULT_SOURCE_ENCODINGS, MappedLines, SourceLineCache,
+                           decode_source, line_start_offsets, sniff_encoding)
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 以end结束的块关键字
+_BLOCK_KEYWORDS = {'if', 'for', 'parfor', 'while', 'switch', 'try', 'spmd', 'function', 'classdef'}
+# 仅在classdef内部才是块关键字（在普通代码中可能是同名函数调用）
+_CLASS_BLOCK_KEYWORDS = {'methods', 'properties', 'events', 'enumeration'}
+_STRING_PATTERN = re.compile(r'"[^"]*"|(?<![\w)\]}.\'])\'[^\']*\'')
+_BRACKET_PATTERN = re.compile(r'\([^()]*\)|\[[^\[\]]*\]|\{[^{}]*\}')
+_STATEMENT_WORD_PATTERN = re.compile(r'(?<![\w.])([A-Za-z]\w*)')
+
+# import语句（命令形式，可一次导入多项）
+_IMPORT_PATTERN = re.compile(r'^[ \t]*import[ \t]+((?:[A-Za-z]\w*(?:\.\w+)*(?:\.\*)?[ \t]*)+);?[ \t]*(?:%.*)?$',
+                             re.MULTILINE)
+# 非空白字节（用于判断内存映射的文件是否有内容）
+_NON_BLANK_PATTERN = re.compile(rb'\S')
+# 函数声明行
+_FUNCTION_DECLARATION_PATTERN = re.compile(r'^\s*function\b')
+# 包/类限定调用，如 pkg.sub.foo(...)、MyClass.staticMethod(...)
+_QUALIFIED_CALL_PATTERN = re.compile(r'(?<![\w.])([A-Za-z]\w*(?:\.[A-Za-z]\w*)+)\s*\(')
+
+# 外部可见的定义作用域：文件的主函数、脚本文件（含按文件名映射的入口）
+VISIBLE_SCOPES = ('primary', 'script')
+
+# 调用解析规则（编号即在边来源数组中的取值）：
+# internal 调用脚本内部的本地/嵌套函数；primary 唯一可见的主函数；path_order 多个同名定义按MATLAB路径顺序选择；
+# script_file 脚本文件；qualified 包/类限定调用；import 经import导入；private private目录；class_folder 所在类目录的方法
+RESOLUTION_RULES = ('internal', 'primary', 'path_order', 'script_file', 'qualified', 'import', 'private', 'class_folder')
+
+
+# 提取器的输入：整份内容字符串，或可重复迭代的行序列（行列表 / MappedLines）
+SourceLines = Union[str, Iterable[str]]
+
+
+def _as_lines(content: SourceLines) -> Iterable[str]:
+    """字符串按行拆分，行序列原样返回"""
+    return content.split('\n') if isinstance(content, str) else content
+
+
+def _code_lines(lines: Iterable[str]) -> Iterator[str]:
+    """逐行去掉行注释"""
+    for line in lines:
+        if '%' in line:
+            line = line[:line.index('%')]
+        yield line
+
+
+def _block_tokens(line: str) -> List[str]:
+    """
+    提取一行代码中影响块结构的关键字（去掉注释、字符串与括号内容，避免 x(end) 等误判）
+    
+    Args:
+        line: 源代码行
+        
+    Returns:
+        按出现顺序的关键字列表（块关键字与end）
+    """
+    if '%' in line:
+        line = line[:line.index('%')]
+    if not line.strip():
+        return []
+    line = _STRING_PATTERN.sub('', line)
+    while True:
+        reduced = _BRACKET_PATTERN.sub('', line)
+        if reduced == line:
+            break
+        line = reduced
+    # 未闭合的括号（多行表达式）之后的内容不参与块结构判断
+    for bracket in '([{':
+        if bracket in line:
+            line = line[:line.index(bracket)]
+    return [w for w in _STATEMENT_WORD_PATTERN.findall(line)
+            if w == 'end' or w in _BLOCK_KEYWORDS or w in _CLASS_BLOCK_KEYWORDS or w == 'arguments']
+
+
+def _folder_namespace(dirs: List[str]) -> str:
+    """
+    由目录层级计算命名空间：末尾连续的 +包 目录与 @类 目录组成限定名前缀
+
+    Args:
+        dirs: 相对目录的各级名称
+
+    Returns:
+        命名空间（如 'pkg.sub'、'pkg.MyClass'），普通目录返回''
+    """
+    names: List[str] = []
+    i = len(dirs)
+    if i and dirs[i - 1].startswith('@'):
+        names.append(dirs[i - 1][1:])
+        i -= 1
+    while i and dirs[i - 1].startswith('+'):
+        names.append(dirs[i - 1][1:])
+        i -= 1
+    return '.'.join(reversed(names))
+
+
+def _script_location(script: str) -> Tuple[str, str, str]:
+    """
+    按MATLAB目录约定确定脚本的可见名称与所属位置
+
+    - +pkg/foo.m            -> 'pkg.foo'（包函数，只能以限定名调用）
+    - @MyClass/MyClass.m    -> 'MyClass'（构造函数），@MyClass/method.m -> 'MyClass.method'
+    - private/helper.m      -> 'helper'（只对private的父目录可见）
+
+    Args:
+        script: 相对工程根目录的脚本路径
+
+    Returns:
+        (限定名, 类型 global/package/class/private, 可见private目录的属主目录)
+    """
+    parts = script.split(os.sep)
+    dirs = parts[:-1]
+    stem = os.path.splitext(parts[-1])[0]
+    if dirs and dirs[-1] == 'private':
+        return stem, 'private', os.sep.join(dirs[:-1])
+    owner_dir = os.sep.join(dirs)
+    if dirs and dirs[-1].startswith('@'):
+        class_namespace = _folder_namespace(dirs)
+        if stem == dirs[-1][1:]:
+            return class_namespace, 'class', owner_dir
+        return f"{class_namespace}.{stem}", 'class', owner_dir
+    namespace = _folder_namespace(dirs)
+    if namespace:
+        return f"{namespace}.{stem}", 'package', owner_dir
+    return stem, 'global', owner_dir
+
+
+class FunctionDefinition:
+    """
+    单个函数定义记录
+    使用__slots__紧凑存储，脚本名/函数名经sys.intern驻留；签名文本默认不保留，需要时按字节偏移读取
+    """
+    __slots__ = ('script_file', 'line_number', 'line_offset', 'definition_type', 'scope',
+                 'parent_function', 'end_line', 'signature')
+
+    def __init__(self, script_file: str, line_number: int, definition_type: str,
+                 scope: Optional[str] = None, signature: Optional[str] = None):
+        self.script_file = sys.intern(script_file)
+        self.line_number = line_number
+        self.line_offset = -1  # 定义行在文件中的字节偏移（未知时为-1）
+        self.definition_type = definition_type  # 'explicit_function' 或 'script_file'
+        self.scope = scope  # primary / local / nested / method / script
+        self.parent_function: Optional[str] = None
+        self.end_line: Optional[int] = None
+        self.signature = signature
+
+    @property
+    def is_script_file(self) -> bool:
+        return self.definition_type == 'script_file'
+
+    def to_dict(self, func_name: str, signature: Optional[str] = None) -> Dict:
+        """
+        转换为定义详情字典（与原先存储的字典结构一致）
+
+        Args:
+            func_name: 函数名
+            signature: 定义行文本（未保留签名时由调用方读取后传入）
+
+        Returns:
+            定义详情字典
+        """
+        if self.is_script_file:
+            line_content = f"# Script file: {func_name}"
+            signature = func_name
+        else:
+            signature = signature if signature is not None else (self.signature or '')
+            line_content = signature
+        result = {
+            'script_file': self.script_file,
+            'line_number': self.line_number,
+            'line_content': line_content,
+            'definition_type': self.definition_type,
+            'function_signature': signature,
+            'is_script_file': self.is_script_file,
+            'scope': self.scope or ('script' if self.is_script_file else 'primary')
+        }
+        if not self.is_script_file:
+            result['parent_function'] = self.parent_function
+            if self.end_line is not None:
+                result['end_line'] = self.end_line
+        return result
+
+
+class CallSites:
+    """
+    单个脚本的调用点表
+    被调用名按字典序排列，各名称的调用点 (行, 列) 连续存放在平行整数数组中
+    """
+    __slots__ = ('names', 'offsets', 'lines', 'columns')
+
+    def __init__(self, sites: Dict[str, List[Tuple[int, int]]]):
+        self.names: Tuple[str, ...] = tuple(sorted(sites))
+        self.offsets = array('i', [0])
+        self.lines = array('i')
+        self.columns = array('i')
+        for name in self.names:
+            for line, column in sorted(sites[name]):
+                self.lines.append(line)
+                self.columns.append(column)
+            self.offsets.append(len(self.lines))
+
+    def _index(self, name: str) -> int:
+        i = bisect_left(self.names, name)
+        return i if i < len(self.names) and self.names[i] == name else -1
+
+    def sites(self, name: str) -> List[Tuple[int, int]]:
+        """指定名称的全部调用点（按位置排序）"""
+        i = self._index(name)
+        if i < 0:
+            return []
+        return [(self.lines[k], self.columns[k]) for k in range(self.offsets[i], self.offsets[i + 1])]
+
+    def first_site(self, name: str) -> Optional[Tuple[int, int]]:
+        """指定名称的第一个调用点，不存在时返回None"""
+        i = self._index(name)
+        if i < 0 or self.offsets[i] == self.offsets[i + 1]:
+            return None
+        k = self.offsets[i]
+        return self.lines[k], self.columns[k]
+
+    def without(self, names: Set[str]) -> 'CallSites':
+        """去掉指定名称后的新调用点表"""
+        return CallSites({name: self.sites(name) for name in self.names if name not in names})
+
 
 class ImprovedMATLABScriptParser:
     """改进的MATLAB脚本解析器 - 按MATLAB实际搜索路径规则"""
-    
-    def __init__(self, project_path: str):
+
+    # 快照中需要持久化的解析结果字段
+    STATE_FIELDS = (
+        'script_functions', 'function_scripts', 'script_calls', 'script_files',
+        'matlab_paths', 'script_creation_order', 'function_definitions',
+        'file_parse_stats', 'file_stats', 'dir_mtimes', 'visible_function_scripts',
+        'namespace_index', 'private_index', 'script_imports', 'script_call_sites', 'call_references',
+        'file_encodings', 'blob_ids', 'source_tree', 'pruned_call_prefixes',
+    )
+
+    def __init__(self, project_path: str, definitions_only_size: Optional[int] = None,
+                 definitions_only_time: Optional[float] = None,
+                 include_patterns: Sequence[str] = DEFAULT_INCLUDE_PATTERNS,
+                 exclude_patterns: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS,
+                 use_gitignore: bool = True,
+                 scope_aware: bool = True,
+                 keep_signatures: bool = False,
+                 mapped_read_size: Optional[int] = DEFAULT_MAPPED_READ_SIZE,
+                 source_encodings: Sequence[str] = DEFAULT_SOURCE_ENCODINGS,
+                 git_revision: Optional[str] = None,
+                 parse_store: Optional[ParseStore] = None):
         """
         初始化解析器
         
         Args:
             project_path: MATLAB工程根目录路径
+            definitions_only_size: 文件字节数超过该值时只提取函数定义，跳过调用提取（None表示不限制）
+            definitions_only_time: 上次完整解析耗时（秒）超过该值的文件，再次扫描时只提取函数定义（None表示不限制）
+            include_patterns: 源文件名包含通配符
+            exclude_patterns: 排除通配符（.gitignore语法），匹配的目录整体跳过
+            use_gitignore: 是否应用工程中的.gitignore规则
+            scope_aware: 是否按MATLAB作用域解析调用（本地/嵌套函数对其他文件不可见）
+            keep_signatures: 是否在定义记录中保留函数定义行文本（默认不保留，查询时按字节偏移读取）
+            mapped_read_size: 文件字节数超过该值时通过内存映射逐行扫描，不整体读入内存（None表示总是整体读取）
+            source_encodings: 非ASCII源文件依次尝试的编码，都无法严格解码时按latin-1读取
+            git_revision: 指定时从git对象库读取该版本（tag/分支/提交）的源文件，不访问工作区（project_path须位于仓库内）
+            parse_store: 按内容去重的解析结果库（可在多个解析器/版本之间共享，内容相同的文件只解析一次）
         """
         self.project_path = Path(project_path)
+        self.definitions_only_size = definitions_only_size
+        self.definitions_only_time = definitions_only_time
+        self.include_patterns = tuple(include_patterns)
+        self.exclude_patterns = tuple(exclude_patterns)
+        self.use_gitignore = use_gitignore
+        self.scope_aware = scope_aware
+        self.keep_signatures = keep_signatures
+        self.mapped_read_size = mapped_read_size
+        self.source_encodings = tuple(source_encodings)
+        self.git_revision = git_revision
+        self.parse_store = parse_store
+        # 按需读取定义行：工作区文件用mmap LRU，git版本经cat-file进程读取blob
+        self.blob_ids: Dict[str, str] = {}  # 脚本 -> blob id（仅git版本）
+        self.source_tree: Optional[str] = None  # 工程目录在该版本中的树对象id（仅git版本）
+        if git_revision is not None:
+            self._blob_reader = GitBlobReader(self.project_path)
+            self._source_lines = GitSourceLines(self._blob_reader)
+        else:
+            self._source_lines = SourceLineCache(self.project_path)
         self.script_functions: Dict[str, Set[str]] = {}  # 脚本文件 -> 函数名集合
         self.function_scripts: Dict[str, List[str]] = {}  # 函数名 -> 脚本文件列表（支持多关联）
         self.script_calls: Dict[str, Set[str]] = {}  # 脚本文件 -> 调用的函数集合
+        self.script_call_sites: Dict[str, CallSites] = {}  # 脚本文件 -> 调用点表
+        self.call_references: Dict[str, List[str]] = {}  # 被调用名 -> 调用它的脚本（按解析顺序）
+        self._function_spans: Dict[str, List[Tuple[int, int, str]]] = {}  # 脚本 -> 函数行范围（按需计算）
         self.script_files: Set[str] = set()  # 所有脚本文件集合
         
         # MATLAB路径分析
         self.matlab_paths: List[str] = []  # MATLAB搜索路径
         self.script_creation_order: Dict[str, int] = {}  # 脚本创建顺序（模拟MATLAB路径顺序）
+        self.path_positions: Dict[str, int] = {}  # 搜索路径目录 -> 在MATLAB路径中的位置
+        self.script_precedence: Dict[str, Tuple[int, int, str]] = {}  # 脚本 -> 路径优先级排序键
         
         # 函数定义详情
-        self.function_definitions: Dict[str, Dict[str, Dict]] = {}  # 函数名 -> {脚本文件 -> 定义详情}
+        self.function_definitions: Dict[str, Dict[str, FunctionDefinition]] = {}  # 函数名 -> {脚本文件 -> 定义记录}
+        # 函数名 -> 对外可见的脚本列表（主函数/脚本文件，按MATLAB优先级排序，第一个为解析目标）
+        self.visible_function_scripts: Dict[str, List[str]] = {}
+        # (命名空间, 名称) -> 脚本列表：包函数（'pkg', 'foo'）、类构造/方法（'MyClass', 'method'）
+        self.namespace_index: Dict[Tuple[str, str], List[str]] = {}
+        # (private属主目录, 名称) -> 脚本列表：private函数只对属主目录及private目录内可见
+        self.private_index: Dict[Tuple[str, str], List[str]] = {}
+        self.script_imports: Dict[str, List[str]] = {}  # 脚本 -> import语句导入的包/函数
+        self.script_locations: Dict[str, Tuple[str, str, str]] = {}  # 脚本 -> _script_location() 结果
+        # 限定调用前缀 -> 因前缀不是已知包/类而去掉了这类调用的脚本（增量更新时出现该包/类则重新解析）
+        self.pruned_call_prefixes: Dict[str, Set[str]] = {}
+        # (命名空间, 名称, 调用目录) -> 候选脚本列表，建图时每个键只解析一次
+        self._resolution_cache: Dict[Tuple[str, str, str], Optional[List[str]]] = {}
+
+        # 每个文件的解析开销（读取/解析耗时、大小、行数、定义/调用数）
+        self.file_parse_stats: Dict[str, Dict] = {}
+        self._previous_parse_stats: Dict[str, Dict] = {}
+        
+        # 文件发现阶段得到的stat信息，直接用于指纹计算
+        self.file_stats: Dict[str, Tuple[int, int]] = {}  # 脚本文件 -> (大小, mtime_ns)
+        self.dir_mtimes: Dict[str, int] = {}  # 相对目录 -> mtime_ns
+        
+        # 每个文件探测到的编码，随快照持久化；文件stat未变化时作为下次扫描的首选编码
+        self.file_encodings: Dict[str, str] = {}
+        self._previous_encodings: Dict[str, str] = {}
+        self._previous_file_stats: Dict[str, Tuple[int, int]] = {}
         
     def scan_project(self) -> Dict[str, Set[str]]:
         """
@@ -47,57 +359,327 @@ class ImprovedMATLABScriptParser:
         Returns:
             脚本文件到函数名的映射字典
         """
-        logger.info(f"开始扫描工程: {self.project_path}")
-        
-        # 查找所有.m文件
-        matlab_files = list(self.project_path.rglob("*.m"))
-        logger.info(f"发现 {len(matlab_files)} 个MATLAB脚本文件")
+        logger.info(f"开始扫描工程: {self.project_path}" +
+                    (f" (git版本 {self.git_revision})" if self.git_revision is not None else ""))
+        
+        # 单次遍历发现所有.m文件（按排除规则提前剪枝）
+        dir_mtimes: Dict[str, int] = {}
+        with profile_phase('scan: discover .m files'):
+            if self.git_revision is not None:
+                discovered = self._discover_git_blobs()
+            else:
+                discovered = list(discover_matlab_files(
+                    self.project_path, self.include_patterns, self.exclude_patterns,
+                    self.use_gitignore, dir_mtimes))
+        logger.info(f"发现 {len(discovered)} 个MATLAB脚本文件")
         
         # 清空之前的结果
         self.script_functions.clear()
         self.function_scripts.clear()
         self.script_calls.clear()
+        self.script_call_sites.clear()
+        self.call_references.clear()
+        self.pruned_call_prefixes.clear()
+        self._function_spans.clear()
         self.script_files.clear()
+        self.script_creation_order.clear()
         self.function_definitions.clear()
-        
-        # 第一遍：收集所有脚本文件，按文件系统顺序
-        file_list = []
-        for file_path in matlab_files:
-            try:
-                relative_path = file_path.relative_to(self.project_path)
-                script_name = str(relative_path)
-                file_list.append(script_name)
-            except Exception as e:
-                logger.error(f"处理文件路径 {file_path} 时出错: {e}")
-        
-        # 按文件系统顺序排序，模拟MATLAB路径添加顺序
-        file_list.sort()
-        for i, file_path in enumerate(file_list):
-            self.script_files.add(file_path)
-            self.script_creation_order[file_path] = i
+        self.script_imports.clear()
+        self.script_locations.clear()
+        self._reset_source_lines()
+        # 保留上次扫描的解析开销，用于按耗时阈值切换为仅定义模式
+        self._previous_parse_stats = self.file_parse_stats
+        self.file_parse_stats = {}
+        # 保留上次扫描探测到的编码及对应的文件stat；尚未使用的提示（如从过期快照采用的）优先
+        self.adopt_encoding_hints(self.file_encodings, self.file_stats, keep_pending=True)
+        self.file_encodings = {}
+        self.dir_mtimes = dir_mtimes
+        
+        # 第一遍：收集所有脚本文件，按文件系统顺序排序，模拟MATLAB路径添加顺序
+        with profile_phase('scan 1: collect scripts'):
+            discovered.sort(key=lambda f: f.relative_path)
+            # 脚本名在各个表中反复出现，驻留后所有表共享同一个字符串对象
+            discovered = [found._replace(relative_path=sys.intern(found.relative_path)) for found in discovered]
+            self.file_stats = {}
+            for i, found in enumerate(discovered):
+                self.script_files.add(found.relative_path)
+                self.script_creation_order[found.relative_path] = i
+                self.file_stats[found.relative_path] = (found.size, found.mtime_ns)
         
         # 第二遍：解析每个文件
-        for file_path in matlab_files:
-            try:
-                self._parse_script_file(file_path)
-            except Exception as e:
-                logger.error(f"解析文件 {file_path} 时出错: {e}")
-                logger.error(f"错误详情: {traceback.format_exc()}")
-                # 即使出错，也要尝试添加基本信息
-                self._add_fallback_info(file_path)
+        with profile_phase('scan 2: parse files'):
+            self._parse_discovered(discovered)
         
         # 第三遍：强制映射所有脚本文件名
-        self._force_map_all_script_names()
+        with profile_phase('scan 3: map script names'):
+            self._force_map_all_script_names()
         
         # 第四遍：建立MATLAB搜索路径（按正确规则）
-        self._build_matlab_paths_correctly()
+        with profile_phase('scan 4: build matlab paths'):
+            self._build_matlab_paths_correctly()
         
         # 第五遍：建立基于MATLAB语法的关联关系
-        self._establish_matlab_syntax_relationships()
+        with profile_phase('scan 5: primary definitions'):
+            self._establish_matlab_syntax_relationships()
         
         logger.info(f"解析完成，共处理 {len(self.script_functions)} 个脚本文件")
         return self.script_functions
     
+    def update_source(self, project_path: Optional[str] = None,
+                      git_revision: Optional[str] = None) -> Dict[str, object]:
+        """
+        增量切换到另一个版本文件夹或git版本（或重新检查当前源）：
+        只重新解析新增/内容变化的文件，只对定义有变化的函数名重新确定主定义并更新解析索引
+        
+        Args:
+            project_path: 新的版本文件夹（工作区模式，None表示沿用当前目录）
+            git_revision: 新的git版本（git模式，None表示沿用当前版本）
+            
+        Returns:
+            {'added': 新增脚本, 'removed': 删除的脚本, 'modified': 内容变化的脚本,
+             'reparsed': 重新解析的脚本（含因出现新的包/类而恢复限定调用的脚本）,
+             'touched_names': 定义有变化的函数名集合,
+             'previous_scripts': 函数名 -> 更新前定义它的脚本（第一个为原主定义）,
+             'affected_callers': 调用解析结果可能变化、需要重新建边的脚本}
+        """
+        if (git_revision is not None and self.git_revision is None) or \
+                (project_path is not None and self.git_revision is not None):
+            raise ValueError("增量更新不能在工作区目录与git版本之间切换")
+        logger.info(f"增量更新: {project_path or self.project_path}" +
+                    (f" (git版本 {git_revision})" if git_revision is not None else ""))
+        old_root = self.project_path
+        old_blob_ids = self.blob_ids
+        if project_path is not None:
+            self.project_path = Path(project_path)
+        if git_revision is not None:
+            self.git_revision = git_revision
+        self._source_lines.close()
+        if self.git_revision is None:
+            self._source_lines = SourceLineCache(self.project_path)
+        
+        dir_mtimes: Dict[str, int] = {}
+        with profile_phase('update 1: discover .m files'):
+            if self.git_revision is not None:
+                discovered = self._discover_git_blobs()
+            else:
+                discovered = list(discover_matlab_files(
+                    self.project_path, self.include_patterns, self.exclude_patterns,
+                    self.use_gitignore, dir_mtimes))
+            discovered.sort(key=lambda f: f.relative_path)
+            discovered = [found._replace(relative_path=sys.intern(found.relative_path)) for found in discovered]
+            found_by_script = {found.relative_path: found for found in discovered}
+        
+        with profile_phase('update 2: compare files'):
+            added = sorted(found_by_script.keys() - self.script_files)
+            removed = sorted(self.script_files - found_by_script.keys())
+            modified = [script for script in sorted(self.script_files & found_by_script.keys())
+                        if self._content_changed(script, found_by_script[script], old_root, old_blob_ids)]
+            # 出现新的包/类时，此前因前缀未知而去掉了对应限定调用的脚本需要重新解析
+            old_namespaces = {namespace for namespace, _ in self.namespace_index}
+            revived: Set[str] = set()
+            for script in added:
+                qualified_name, kind, _ = self._get_script_location(script)
+                namespace = qualified_name.rpartition('.')[0]
+                if kind in ('package', 'class') and namespace not in old_namespaces:
+                    revived.update(self.pruned_call_prefixes.pop(namespace, ()))
+            reparse = sorted(set(added) | set(modified) |
+                             {script for script in revived if script in found_by_script})
+            reparse_set = set(reparse)
+        
+        with profile_phase('update 3: forget changed scripts'):
+            hints = {script: self.file_encodings[script] for script in reparse
+                     if script in self.file_encodings and script not in modified}
+            self._previous_parse_stats = {script: self.file_parse_stats[script] for script in reparse
+                                          if script in self.file_parse_stats}
+            previous_scripts: Dict[str, List[str]] = {}
+            previous_signatures: Dict[str, Tuple] = {}
+            for script in removed + [script for script in reparse if script in self.script_files]:
+                for func_name in self.script_functions.get(script, ()):
+                    if func_name not in previous_scripts:
+                        previous_scripts[func_name] = list(self.function_scripts.get(func_name, ()))
+                        previous_signatures[func_name] = self._resolution_signature(
+                            func_name, previous_scripts[func_name])
+                self._forget_script(script)
+            
+            self.script_files.difference_update(removed)
+            self.script_files.update(added)
+            self.script_creation_order = {found.relative_path: i for i, found in enumerate(discovered)}
+            self.file_stats = {found.relative_path: (found.size, found.mtime_ns) for found in discovered}
+            self.dir_mtimes = dir_mtimes
+            # 内容未变、只因新的包/类重新解析的脚本沿用原来的编码
+            self.adopt_encoding_hints(hints, self.file_stats)
+        
+        with profile_phase('update 4: parse changed files'):
+            self._parse_discovered([found_by_script[script] for script in reparse])
+            self._force_map_all_script_names(reparse)
+        
+        with profile_phase('update 5: matlab paths and primary definitions'):
+            self._build_matlab_paths_correctly()
+            for script in reparse:
+                for func_name in self.script_functions.get(script, ()):
+                    if func_name not in previous_scripts:
+                        # 只有新解析的脚本加入了该函数名的列表，原主定义仍在最前
+                        previous_scripts[func_name] = [other for other in self.function_scripts[func_name]
+                                                       if other not in reparse_set]
+                        previous_signatures[func_name] = self._resolution_signature(
+                            func_name, previous_scripts[func_name])
+            for func_name, scripts in previous_scripts.items():
+                self._unindex_definitions(func_name, scripts)
+                if self.function_scripts.get(func_name):
+                    self._order_primary_definition(func_name)
+                    self._index_visible_definitions(func_name)
+                else:
+                    self.function_scripts.pop(func_name, None)
+                    self.function_definitions.pop(func_name, None)
+            
+            # 包/类消失后，其他脚本中以它为前缀的限定调用不再是函数调用
+            prune = set(reparse)
+            removed_namespaces = old_namespaces - {namespace for namespace, _ in self.namespace_index}
+            if removed_namespaces:
+                for call, callers in self.call_references.items():
+                    if '.' in call and call.rpartition('.')[0] in removed_namespaces:
+                        prune.update(callers)
+            # 解析结果可能变化的函数名（本地函数等对其他文件不可见的定义变化不影响其他脚本），
+            # 调用它们（含限定名的末段，如import或类目录内的非限定调用）的脚本需要重新建边
+            callers = set(reparse)
+            for func_name in previous_scripts:
+                if self._resolution_signature(func_name, self.function_scripts.get(func_name, [])) == \
+                        previous_signatures[func_name]:
+                    continue
+                callers.update(self.call_references.get(func_name, ()))
+                short_name = func_name.rpartition('.')[2]
+                if short_name != func_name:
+                    callers.update(self.call_references.get(short_name, ()))
+            callers.update(prune)
+            self._prune_unknown_qualified_calls(sorted(prune))
+            self._resolution_cache = {}
+        
+        logger.info(f"增量更新完成: 新增 {len(added)} 个, 删除 {len(removed)} 个, 修改 {len(modified)} 个, "
+                    f"重新解析 {len(reparse)} 个脚本, 涉及函数名 {len(previous_scripts)} 个")
+        return {
+            'added': added,
+            'removed': removed,
+            'modified': modified,
+            'reparsed': reparse,
+            'touched_names': set(previous_scripts),
+            'previous_scripts': previous_scripts,
+            'affected_callers': sorted(callers)
+        }
+    
+    def _resolution_signature(self, func_name: str, scripts: List[str]) -> Tuple:
+        """
+        调用解析所依据的全部信息：函数名在各索引表中的条目、首选定义的作用域，
+        以及不区分作用域时的主定义（前后一致时调用该函数名的脚本解析结果不变）
+
+        Args:
+            func_name: 函数名
+            scripts: 定义该函数名的脚本（第一个为主定义）
+        """
+        entries = [self.visible_function_scripts.get(func_name)]
+        if '.' in func_name:
+            namespace, _, name = func_name.rpartition('.')
+            entries.append(self.namespace_index.get((namespace, name)))
+        private_dirs = {self._get_script_location(script)[2] for script in scripts
+                        if self._get_script_location(script)[1] == 'private'}
+        entries.extend(self.private_index.get((owner_dir, func_name)) for owner_dir in sorted(private_dirs))
+        signature = [(tuple(entry), self._get_definition_scope(func_name, entry[0])) if entry else ()
+                     for entry in entries]
+        if scripts:
+            signature.append((scripts[0], len(scripts) > 1, self._get_definition_scope(func_name, scripts[0])))
+        return tuple(signature)
+    
+    def _content_changed(self, script_name: str, found: DiscoveredFile, old_root: Path,
+                         old_blob_ids: Dict[str, str]) -> bool:
+        """
+        判断两个版本中同名脚本的内容是否不同
+        git版本比较blob id；同一目录比较stat；不同版本文件夹大小相同时比较文件内容
+        """
+        if self.git_revision is not None:
+            return old_blob_ids.get(script_name) != self.blob_ids.get(script_name)
+        old_stat = self.file_stats.get(script_name)
+        if old_root == self.project_path or old_stat is None or old_stat[0] != found.size:
+            return old_stat != (found.size, found.mtime_ns)
+        try:
+            return (old_root / script_name).read_bytes() != Path(found.absolute_path).read_bytes()
+        except OSError:
+            return True
+    
+    def _forget_script(self, script_name: str) -> None:
+        """从各解析表中去掉脚本的全部记录（删除或重新解析前调用）"""
+        for func_name in self.script_functions.pop(script_name, ()):
+            scripts = self.function_scripts.get(func_name)
+            if scripts is not None and script_name in scripts:
+                scripts.remove(script_name)
+            definitions = self.function_definitions.get(func_name)
+            if definitions is not None:
+                definitions.pop(script_name, None)
+        for call in self.script_calls.pop(script_name, ()):
+            callers = self.call_references.get(call)
+            if callers is not None and script_name in callers:
+                callers.remove(script_name)
+                if not callers:
+                    del self.call_references[call]
+        for table in (self.script_call_sites, self.script_imports, self.file_parse_stats,
+                      self.file_encodings, self._function_spans):
+            table.pop(script_name, None)
+    
+    def _parse_discovered(self, discovered: List[DiscoveredFile]) -> None:
+        """
+        解析发现的文件（git版本中解析结果库没有的blob经同一个cat-file进程流式读取）
+        
+        Args:
+            discovered: 按脚本名排序的待解析文件
+        """
+        blob_ids: Dict[str, Optional[str]] = {}
+        definitions_only: Dict[str, Optional[bool]] = {}
+        to_read: Set[str] = set()
+        if self.git_revision is not None:
+            for found in discovered:
+                blob_id = self.blob_ids[found.relative_path]
+                blob_ids[found.relative_path] = blob_id
+                definitions_only[found.relative_path] = self._use_definitions_only(found.relative_path, found.size)
+                if self.parse_store is None or \
+                        self._parse_store_key(blob_id, definitions_only[found.relative_path]) not in self.parse_store:
+                    to_read.add(found.relative_path)
+            # 解析结果库中没有的blob经同一个cat-file进程按顺序流式读取
+            contents = self._blob_reader.read_many(
+                blob_ids[found.relative_path] for found in discovered if found.relative_path in to_read)
+        for found in discovered:
+            file_path = Path(found.absolute_path)
+            data = next(contents)[1] if found.relative_path in to_read else None
+            try:
+                self._parse_script_file(file_path, found.relative_path, found.size, data,
+                                        blob_ids.get(found.relative_path),
+                                        definitions_only.get(found.relative_path))
+            except Exception as e:
+                logger.error(f"解析文件 {file_path} 时出错: {e}")
+                logger.error(f"错误详情: {traceback.format_exc()}")
+                # 即使出错，也要尝试添加基本信息
+                self._add_fallback_info(file_path)
+        # 编码提示只用于这一次解析，之后以本次探测结果为准
+        self._previous_encodings = {}
+        self._previous_file_stats = {}
+    
+    def _discover_git_blobs(self) -> List[DiscoveredFile]:
+        """
+        列出git版本中的源文件（替代磁盘遍历）；blob id导出的版本标记代替mtime，供编码缓存判断内容是否变化
+        
+        Returns:
+            DiscoveredFile列表，absolute_path为工作区中对应的路径（不要求存在）
+        """
+        self.source_tree = resolve_tree(self.project_path, self.git_revision)
+        blobs = list_matlab_blobs(self.project_path, self.git_revision, self.include_patterns, self.exclude_patterns)
+        self.blob_ids = {sys.intern(blob.relative_path): blob.oid for blob in blobs}
+        self._source_lines.blob_ids = self.blob_ids
+        return [DiscoveredFile(blob.relative_path, str(self.project_path / blob.relative_path),
+                               blob.size, blob.version_stamp) for blob in blobs]
+    
+    def _reset_source_lines(self) -> None:
+        """关闭按需读取定义行的文件/进程（解析结果被替换时调用）"""
+        self._source_lines.close()
+        if self.git_revision is not None:
+            self._source_lines.blob_ids = self.blob_ids
+    
     def _build_matlab_paths_correctly(self) -> None:
         """按照MATLAB正确规则建立搜索路径"""
         logger.info("按照MATLAB正确规则建立搜索路径...")
@@ -108,43 +690,303 @@ class ImprovedMATLABScriptParser:
         # 3. 不是按目录层级排序！
         
         paths = []
+        positions: Dict[str, int] = {}
         
         # 1. 添加当前工作目录（最高优先级）
         paths.append(str(self.project_path))
+        positions[paths[0]] = 0
         
         # 2. 按文件系统顺序添加所有脚本文件所在目录
         # 这模拟了MATLAB中addpath()的顺序
         for script_file in sorted(self.script_files, key=lambda x: self.script_creation_order[x]):
             script_path = Path(script_file)
             script_dir = str(self.project_path / script_path.parent)
-            if script_dir not in paths:
+            if script_dir not in positions:
+                positions[script_dir] = len(paths)
                 paths.append(script_dir)
         
         self.matlab_paths = paths
+        self.path_positions = positions
+        self.script_precedence = {}
+        for script_file in self.script_files:
+            self._index_script_precedence(script_file)
         
         logger.info(f"建立 {len(self.matlab_paths)} 个搜索路径，按MATLAB正确规则排序")
         for i, path in enumerate(paths):
             logger.debug(f"  路径 {i}: {path}")
     
+    def _index_script_precedence(self, script: str) -> Tuple[int, int, str]:
+        """
+        计算并缓存脚本的MATLAB路径优先级排序键（每个脚本只计算一次）
+        
+        Returns:
+            (是否不在当前目录, 所在目录在MATLAB路径中的位置, 脚本名)
+        """
+        script_path = Path(script)
+        is_in_current_dir = len(script_path.parts) == 1
+        path_position = self.path_positions.get(str(self.project_path / script_path.parent), 999999)
+        key = (0 if is_in_current_dir else 1, path_position, script)
+        self.script_precedence[script] = key
+        return key
+    
+    def _get_script_precedence(self, script: str) -> Tuple[int, int, str]:
+        """获取脚本的路径优先级排序键（O(1)查表，未索引的脚本按需补算）"""
+        key = self.script_precedence.get(script)
+        if key is None:
+            key = self._index_script_precedence(script)
+        return key
+    
+    def _rebuild_path_index(self) -> None:
+        """根据matlab_paths重建目录位置索引与脚本优先级缓存（快照恢复后使用）"""
+        self.path_positions = {path: i for i, path in enumerate(self.matlab_paths)}
+        self.script_precedence = {}
+        for script_file in self.script_files:
+            self._index_script_precedence(script_file)
+    
     def _establish_matlab_syntax_relationships(self) -> None:
         """基于MATLAB语法规则建立关联关系"""
         logger.info("基于MATLAB语法规则建立关联关系...")
         
         # 为每个函数确定主要定义，基于正确的MATLAB语法规则
-        for func_name, scripts in self.function_scripts.items():
-            if len(scripts) > 1:
-                # 多个定义，需要确定主要定义
-                primary_script = self._determine_primary_by_matlab_rules(func_name, scripts)
-                
-                # 重新排序，主要定义放在前面
-                if primary_script in scripts:
-                    scripts.remove(primary_script)
-                    scripts.insert(0, primary_script)
-                    logger.info(f"函数 {func_name} 有 {len(scripts)} 个定义，主定义: {primary_script}")
-                else:
-                    logger.warning(f"函数 {func_name} 的主定义 {primary_script} 不在脚本列表中")
+        for func_name in self.function_scripts:
+            self._order_primary_definition(func_name)
         
+        self._build_resolution_index()
         logger.info("MATLAB语法规则关联关系建立完成")
+
+    def _order_primary_definition(self, func_name: str) -> None:
+        """函数有多个定义时按MATLAB规则确定主要定义，并移到脚本列表最前（其余定义按扫描顺序）"""
+        scripts = self.function_scripts[func_name]
+        if len(scripts) > 1:
+            # 先按扫描顺序排列：增量更新时新解析的脚本追加在列表末尾，排序后与完整扫描的结果一致
+            scripts.sort(key=lambda script: self.script_creation_order.get(script, len(self.script_creation_order)))
+            # 多个定义，需要确定主要定义
+            primary_script = self._determine_primary_by_matlab_rules(func_name, scripts)
+            
+            # 重新排序，主要定义放在前面
+            if primary_script in scripts:
+                scripts.remove(primary_script)
+                scripts.insert(0, primary_script)
+                logger.info(f"函数 {func_name} 有 {len(scripts)} 个定义，主定义: {primary_script}")
+            else:
+                logger.warning(f"函数 {func_name} 的主定义 {primary_script} 不在脚本列表中")
+
+    def _get_script_location(self, script: str) -> Tuple[str, str, str]:
+        """获取脚本的 (限定名, 类型, 属主目录)，按脚本缓存"""
+        location = self.script_locations.get(script)
+        if location is None:
+            qualified_name, kind, owner_dir = _script_location(script)
+            location = (sys.intern(qualified_name), kind, owner_dir)
+            self.script_locations[script] = location
+        return location
+    
+    def _get_definition_scope(self, func_name: str, script: str) -> str:
+        """获取定义的作用域（没有定义详情的脚本按脚本文件处理）"""
+        func_info = self.function_definitions.get(func_name, {}).get(script)
+        if func_info is None:
+            return 'script'
+        return func_info.scope or ('script' if func_info.is_script_file else 'primary')
+    
+    def _build_resolution_index(self) -> None:
+        """
+        建立解析索引：只有文件的主函数或脚本文件能被其他文件调用，
+        并按所在目录分入全局表、命名空间表（+包/@类）与private表
+        """
+        self.visible_function_scripts = {}
+        self.namespace_index = {}
+        self.private_index = {}
+        self._resolution_cache = {}
+        hidden = 0
+        for func_name in self.function_scripts:
+            hidden += self._index_visible_definitions(func_name)
+
+        self.pruned_call_prefixes = {}
+        self._prune_unknown_qualified_calls()
+        logger.info(f"对外可见函数 {len(self.visible_function_scripts)} 个，包/类成员 {len(self.namespace_index)} 个，"
+                    f"private函数 {len(self.private_index)} 个，隐藏本地/嵌套定义 {hidden} 个")
+
+    def _index_visible_definitions(self, func_name: str) -> int:
+        """
+        将函数名对外可见的定义登记到全局表、命名空间表或private表
+        
+        Returns:
+            隐藏（本地/嵌套）定义的个数
+        """
+        scripts = self.function_scripts.get(func_name, [])
+        visible = [script for script in scripts
+                   if self._get_definition_scope(func_name, script) in VISIBLE_SCOPES]
+        if len(visible) > 1:
+            # 显式函数定义优先于脚本文件，其次按MATLAB路径顺序（分表后各表内保持该顺序）
+            visible.sort(key=lambda script: (
+                0 if self._get_definition_scope(func_name, script) == 'primary' else 1,
+                self._get_script_precedence(script)
+            ))
+        for script in visible:
+            _, kind, owner_dir = self._get_script_location(script)
+            if kind == 'private':
+                self.private_index.setdefault((owner_dir, func_name), []).append(script)
+            elif kind != 'global' and '.' in func_name:
+                namespace, _, name = func_name.rpartition('.')
+                self.namespace_index.setdefault((namespace, name), []).append(script)
+            else:
+                self.visible_function_scripts.setdefault(func_name, []).append(script)
+        return len(scripts) - len(visible)
+
+    def _unindex_definitions(self, func_name: str, scripts: Iterable[str]) -> None:
+        """
+        从解析索引中去掉函数名的全部条目
+
+        Args:
+            func_name: 函数名
+            scripts: 曾经定义该函数名的脚本（用于定位private表中的条目）
+        """
+        self.visible_function_scripts.pop(func_name, None)
+        if '.' in func_name:
+            namespace, _, name = func_name.rpartition('.')
+            self.namespace_index.pop((namespace, name), None)
+        for script in scripts:
+            _, kind, owner_dir = self._get_script_location(script)
+            if kind == 'private':
+                self.private_index.pop((owner_dir, func_name), None)
+
+    def _prune_unknown_qualified_calls(self, scripts: Optional[Iterable[str]] = None) -> None:
+        """
+        去掉前缀不是已知包/类的限定调用（如 obj.method(...)、s.field(...) 等字段访问），
+        并按前缀记录被去掉调用的脚本（之后出现同名包/类时据此重新解析这些脚本）
+
+        Args:
+            scripts: 只处理这些脚本（默认为全部脚本）
+        """
+        namespaces = {namespace for namespace, _ in self.namespace_index}
+        if scripts is None:
+            scripts = list(self.script_calls)
+        for script_name in scripts:
+            calls = self.script_calls.get(script_name)
+            if not calls:
+                continue
+            unknown = {call for call in calls if '.' in call and call.rpartition('.')[0] not in namespaces}
+            if unknown:
+                calls.difference_update(unknown)
+                if script_name in self.script_call_sites:
+                    self.script_call_sites[script_name] = self.script_call_sites[script_name].without(unknown)
+                for call in unknown:
+                    self.call_references.pop(call, None)
+                    self.pruned_call_prefixes.setdefault(call.rpartition('.')[0], set()).add(script_name)
+
+    def _lookup_candidates(self, namespace: str, name: str, calling_dir: str) -> Tuple[Optional[List[str]], str]:
+        """
+        按 (命名空间, 名称, 调用目录) 查找候选定义，结果缓存，建图时为O(1)
+
+        Args:
+            namespace: 限定调用的命名空间（非限定调用为''）
+            name: 函数名
+            calling_dir: 调用脚本的属主目录（决定private与类目录内的可见性）
+
+        Returns:
+            (按优先级排序的候选脚本列表或None, 来源 qualified/private/class_folder/path)
+        """
+        key = (namespace, name, calling_dir)
+        cached = self._resolution_cache.get(key)
+        if cached is not None:
+            return cached
+        if namespace:
+            result = (self.namespace_index.get((namespace, name)), 'qualified')
+        else:
+            # private函数 > 所在类目录的方法 > 路径上的函数
+            result = (self.private_index.get((calling_dir, name)), 'private')
+            if not result[0] and calling_dir:
+                class_namespace = _folder_namespace(calling_dir.split(os.sep)) \
+                    if os.path.basename(calling_dir).startswith('@') else ''
+                if class_namespace:
+                    result = (self.namespace_index.get((class_namespace, name)), 'class_folder')
+            if not result[0]:
+                result = (self.visible_function_scripts.get(name), 'path')
+        self._resolution_cache[key] = result
+        return result
+
+    def get_primary_script(self, func_name: str) -> Optional[str]:
+        """
+        函数名的主定义：取自调用解析所用的索引（按作用域解析时为对外可见定义中优先级最高者，
+        本地/嵌套定义不参与），没有对外可见定义时返回None
+        """
+        scripts = self.get_visible_scripts(func_name) if self.scope_aware else self.function_scripts.get(func_name)
+        return scripts[0] if scripts else None
+
+    def get_visible_scripts(self, func_name: str) -> List[str]:
+        """获取函数名（可为 pkg.foo / MyClass.method 限定名）对外可见的定义脚本"""
+        if '.' in func_name:
+            namespace, _, name = func_name.rpartition('.')
+            return self.namespace_index.get((namespace, name), [])
+        return self.visible_function_scripts.get(func_name, [])
+    
+    def _has_internal_definition(self, func_name: str, script: str) -> bool:
+        """脚本内部是否有该函数的显式定义（内部定义优先于任何外部定义）"""
+        func_info = self.function_definitions.get(func_name, {}).get(script)
+        return func_info is not None and func_info.definition_type == 'explicit_function'
+    
+    def resolve_function_call(self, func_name: str, calling_script: str) -> Optional[str]:
+        """
+        按MATLAB规则解析函数调用对应的外部脚本
+        
+        Args:
+            func_name: 被调用的函数名（可为 pkg.foo / MyClass.method 限定名）
+            calling_script: 调用脚本
+
+        Returns:
+            被调用的脚本；调用解析到脚本内部定义、自身或未找到定义时返回None
+        """
+        called_script, _ = self.resolve_function_call_with_rule(func_name, calling_script)
+        return called_script if called_script != calling_script else None
+    
+    def resolve_function_call_with_rule(self, func_name: str, calling_script: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        按MATLAB规则解析函数调用，并给出所用的解析规则
+        
+        Args:
+            func_name: 被调用的函数名（可为 pkg.foo / MyClass.method 限定名）
+            calling_script: 调用脚本
+            
+        Returns:
+            (定义所在脚本, 规则名)；规则名见 RESOLUTION_RULES，解析到内部定义时脚本为调用脚本自身，
+            未找到定义时为 (None, None)
+        """
+        if not self.scope_aware:
+            candidates = self.function_scripts.get(func_name)
+            if not candidates:
+                return None, None
+            if self._has_internal_definition(func_name, calling_script):
+                return calling_script, 'internal'
+            return candidates[0], self._path_rule(func_name, candidates)
+
+        _, _, calling_dir = self._get_script_location(calling_script)
+        if '.' in func_name:
+            # 限定调用只在对应的包/类中查找
+            namespace, _, name = func_name.rpartition('.')
+            candidates, source = self._lookup_candidates(namespace, name, calling_dir)
+        else:
+            # 1. import导入的包函数
+            candidates, source = None, 'import'
+            for imported in self.script_imports.get(calling_script, ()):
+                namespace, _, name = imported.rpartition('.')
+                if name == '*' or name == func_name:
+                    candidates = self._lookup_candidates(namespace, func_name, calling_dir)[0]
+                    if candidates:
+                        break
+            # 2. 调用脚本内部的函数定义（本地/嵌套函数）
+            if not candidates and self._has_internal_definition(func_name, calling_script):
+                return calling_script, 'internal'
+            # 3. private函数、类目录方法、路径上的主函数或脚本文件（其他文件的本地函数不可见）
+            if not candidates:
+                candidates, source = self._lookup_candidates('', func_name, calling_dir)
+        if not candidates:
+            return None, None
+        return candidates[0], self._path_rule(func_name, candidates) if source == 'path' else source
+    
+    def _path_rule(self, func_name: str, candidates: List[str]) -> str:
+        """按路径解析时的规则名：多个候选按路径顺序选择，否则按定义类型区分"""
+        if len(candidates) > 1:
+            return 'path_order'
+        return 'script_file' if self._get_definition_scope(func_name, candidates[0]) == 'script' else 'primary'
     
     def _determine_primary_by_matlab_rules(self, func_name: str, scripts: List[str]) -> str:
         """基于正确的MATLAB语法规则确定主要定义"""
@@ -161,9 +1003,9 @@ class ImprovedMATLABScriptParser:
         for script in scripts:
             if func_name in self.function_definitions and script in self.function_definitions[func_name]:
                 func_info = self.function_definitions[func_name][script]
-                if func_info['definition_type'] == 'explicit_function':
+                if func_info.definition_type == 'explicit_function':
                     explicit_functions.append(script)
-                elif func_info['definition_type'] == 'script_file':
+                elif func_info.definition_type == 'script_file':
                     script_files.append(script)
         
         # 第二步：优先选择显式函数定义
@@ -183,35 +1025,21 @@ class ImprovedMATLABScriptParser:
         # 1. 当前工作目录优先
         # 2. 按MATLAB路径添加顺序
         # 3. 不是按目录层级！
-        
-        def get_matlab_path_priority(script: str) -> Tuple[int, int, str]:
-            # 检查是否在当前工作目录
-            script_path = Path(script)
-            is_in_current_dir = len(script_path.parts) == 1
-            
-            # 获取在MATLAB路径中的位置
-            # 模拟MATLAB的addpath顺序
-            path_position = 999999  # 默认位置
-            for i, path in enumerate(self.matlab_paths):
-                if str(self.project_path / script_path.parent) == path:
-                    path_position = i
-                    break
-            
-            # 返回 (是否当前目录, 路径位置, 脚本名)
-            # 当前目录优先，然后按路径位置排序
-            return (0 if is_in_current_dir else 1, path_position, script)
-        
-        # 按MATLAB路径规则排序
-        sorted_scripts = sorted(scripts, key=get_matlab_path_priority)
-        return sorted_scripts[0]
+        # 排序键已在建立搜索路径时预先计算，这里只做查表
+        return min(scripts, key=self._get_script_precedence)
     
-    def _force_map_all_script_names(self) -> None:
-        """强制将每个脚本文件名作为函数名与脚本进行映射（支持多关联）"""
+    def _force_map_all_script_names(self, scripts: Optional[Iterable[str]] = None) -> None:
+        """
+        强制将每个脚本文件名作为函数名与脚本进行映射（支持多关联）
+        
+        Args:
+            scripts: 只映射这些脚本（默认为全部脚本）
+        """
         logger.info("开始强制映射所有脚本文件名...")
         
-        for script_name in self.script_files:
-            # 从脚本名中提取函数名（去掉.m扩展名）
-            func_name = Path(script_name).stem
+        for script_name in (self.script_files if scripts is None else scripts):
+            # 从脚本名中提取函数名（去掉.m扩展名，+包/@类目录下为限定名）
+            func_name = self._get_script_location(script_name)[0]
             
             # 如果这个函数名还没有映射，则创建新的列表
             if func_name not in self.function_scripts:
@@ -227,14 +1055,8 @@ class ImprovedMATLABScriptParser:
                 if func_name not in self.function_definitions:
                     self.function_definitions[func_name] = {}
                 if script_name not in self.function_definitions[func_name]:
-                    self.function_definitions[func_name][script_name] = {
-                        'script_file': script_name,
-                        'line_number': 1,
-                        'line_content': f"# Script file: {func_name}",
-                        'definition_type': 'script_file',
-                        'function_signature': func_name,
-                        'is_script_file': True
-                    }
+                    self.function_definitions[func_name][script_name] = FunctionDefinition(
+                        script_name, 1, 'script_file', 'script')
             else:
                 # 如果已经有映射，添加到列表中（支持多关联）
                 if script_name not in self.function_scripts[func_name]:
@@ -250,14 +1072,8 @@ class ImprovedMATLABScriptParser:
                     if func_name not in self.function_definitions:
                         self.function_definitions[func_name] = {}
                     if script_name not in self.function_definitions[func_name]:
-                        self.function_definitions[func_name][script_name] = {
-                            'script_file': script_name,
-                            'line_number': 1,
-                            'line_content': f"# Script file: {func_name}",
-                            'definition_type': 'script_file',
-                            'function_signature': func_name,
-                            'is_script_file': True
-                        }
+                        self.function_definitions[func_name][script_name] = FunctionDefinition(
+                            script_name, 1, 'script_file', 'script')
         
         logger.info(f"强制映射完成，共映射 {len(self.function_scripts)} 个函数名")
     
@@ -269,8 +1085,8 @@ class ImprovedMATLABScriptParser:
             
             # 如果还没有添加过，则添加基本信息
             if script_name not in self.script_functions:
-                # 将文件名作为函数名（去掉.m扩展名）
-                func_name = file_path.stem
+                # 将文件名作为函数名（去掉.m扩展名，+包/@类目录下为限定名）
+                func_name = self._get_script_location(script_name)[0]
                 self.script_functions[script_name] = {func_name}
                 
                 # 支持多关联
@@ -285,54 +1101,187 @@ class ImprovedMATLABScriptParser:
         except Exception as e:
             logger.error(f"添加fallback信息时出错: {e}")
     
-    def _parse_script_file(self, file_path: Path) -> None:
+    def _parse_script_file(self, file_path: Path, script_name: Optional[str] = None,
+                           size_bytes: Optional[int] = None, data: Optional[bytes] = None,
+                           blob_id: Optional[str] = None, definitions_only: Optional[bool] = None) -> None:
         """
         解析单个MATLAB脚本文件
         
         Args:
             file_path: 脚本文件路径
+            script_name: 相对工程根目录的脚本名（文件发现阶段已计算时直接传入）
+            size_bytes: 文件大小（文件发现阶段已stat时直接传入）
+            data: 文件内容（从git对象库读取时直接传入，不访问磁盘）
+            blob_id: 内容的git blob id（已知时直接查解析结果库，命中则不读取文件）
+            definitions_only: 是否只提取函数定义（已判断时直接传入）
         """
-        relative_path = file_path.relative_to(self.project_path)
-        script_name = str(relative_path)
+        if script_name is None:
+            script_name = str(file_path.relative_to(self.project_path))
         
-        try:
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except Exception as e:
-            logger.error(f"读取文件 {file_path} 失败: {e}")
-            # 尝试其他编码
+        if size_bytes is None and data is None:
+            try:
+                size_bytes = file_path.stat().st_size
+            except OSError:
+                pass
+        if definitions_only is None and size_bytes is not None:
+            definitions_only = self._use_definitions_only(script_name, size_bytes)
+        
+        parsed = None
+        store_key = None
+        if self.parse_store is not None and blob_id is not None and definitions_only is not None:
+            store_key = self._parse_store_key(blob_id, definitions_only)
+            parsed = self.parse_store.get(store_key)
+        cached = parsed is not None
+        
+        read_seconds = 0.0
+        if parsed is None:
+            read_start = time.perf_counter()
+            mapped = None
             try:
-                with open(file_path, 'r', encoding='latin-1', errors='ignore') as f:
-                    content = f.read()
-            except Exception as e2:
-                logger.error(f"使用latin-1编码读取文件 {file_path} 也失败: {e2}")
-                content = ""
+                # 以字节读取，定义行的字节偏移基于原始内容计算
+                if data is None:
+                    with open(file_path, 'rb') as f:
+                        if self.mapped_read_size is not None and size_bytes is not None \
+                                and size_bytes > self.mapped_read_size:
+                            # 超大文件：内存映射后逐行扫描，不整体读入内存
+                            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                            data = mapped
+                        else:
+                            data = f.read()
+            except Exception as e:
+                logger.error(f"读取文件 {file_path} 失败: {e}")
+                data = b""
+            try:
+                if size_bytes is None:
+                    size_bytes = len(data)
+                if definitions_only is None:
+                    definitions_only = self._use_definitions_only(script_name, size_bytes)
+                if self.parse_store is not None and store_key is None:
+                    # 按内容去重：其他路径/版本中字节相同的文件已解析过时直接复用
+                    store_key = self._parse_store_key(git_blob_id(data), definitions_only)
+                    parsed = self.parse_store.get(store_key)
+                    cached = parsed is not None
+                read_seconds = time.perf_counter() - read_start
+                if parsed is None:
+                    encoding_hint = None
+                    if self._previous_file_stats.get(script_name) == self.file_stats.get(script_name, ()):
+                        encoding_hint = self._previous_encodings.get(script_name)
+                    parsed = self._parse_content(data, mapped, definitions_only, encoding_hint)
+                    if store_key is not None:
+                        self.parse_store.put(store_key, parsed)
+            finally:
+                if mapped is not None:
+                    mapped.close()
+        
+        self._register_parsed_content(script_name, parsed, size_bytes, read_seconds, definitions_only, cached)
+    
+    def _parse_store_key(self, blob_id: str, definitions_only: bool) -> Tuple:
+        """解析结果库的键：内容与影响解析结果的选项"""
+        return blob_id, definitions_only, self.keep_signatures, self.source_encodings
+    
+    def _parse_content(self, data, mapped: Optional[mmap.mmap], definitions_only: bool,
+                       encoding_hint: Optional[str]) -> ParsedContent:
+        """
+        解析文件内容（与脚本名和位置无关，结果可被内容相同的脚本共享）
+        
+        Args:
+            data: 文件原始字节（超大文件为mmap）
+            mapped: 内存映射（非超大文件为None）
+            definitions_only: 是否只提取函数定义
+            encoding_hint: 上次探测到的编码
+            
+        Returns:
+            ParsedContent
+        """
+        parse_start = time.perf_counter()
+        if mapped is not None:
+            encoding = sniff_encoding(mapped, self.source_encodings, encoding_hint)
+            lines = MappedLines(mapped, encoding)
+            has_content = _NON_BLANK_PATTERN.search(mapped) is not None
+            has_import = mapped.find(b'import') != -1
+        else:
+            # 按探测到的编码严格解码，避免忽略非法字节后GBK尾字节混入代码
+            content, encoding = decode_source(data, self.source_encodings, encoding_hint)
+            if '\r' in content:
+                # 与文本模式的通用换行一致
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
+            # 只拆分一次，各提取器共用同一个行列表
+            lines = content.split('\n')
+            has_content = bool(content.strip())
+            has_import = 'import' in content
+            del content
         
         # 提取函数定义
-        functions = self._extract_functions_with_details(content, script_name)
+        functions = self._extract_functions_with_details(lines, '')
+        if functions:
+            offsets = line_start_offsets(data, (info.line_number for info in functions.values()))
+            for info in functions.values():
+                info.line_offset = offsets.get(info.line_number, -1)
+        
+        # 提取函数调用（超大/超慢文件跳过，仅保留定义）
+        call_sites = {} if definitions_only else self._extract_function_call_sites(lines)
+        imports = self._extract_imports(lines) if not definitions_only and has_import else []
+        line_count = (lines.line_count if mapped is not None else len(lines)) if data else 0
+        
+        definitions = tuple((name, info.line_number, info.line_offset, info.scope, info.parent_function,
+                             info.end_line, info.signature) for name, info in functions.items())
+        return ParsedContent(definitions, CallSites(call_sites), tuple(imports), line_count, has_content,
+                             encoding, time.perf_counter() - parse_start)
+    
+    def _register_parsed_content(self, script_name: str, parsed: ParsedContent, size_bytes: int,
+                                 read_seconds: float, definitions_only: bool, cached: bool) -> None:
+        """
+        将内容解析结果登记到脚本（补充脚本名、按位置确定限定名与脚本文件入口）
         
-        # 提取函数调用
-        calls = self._extract_function_calls(content)
+        Args:
+            script_name: 脚本名
+            parsed: 内容解析结果
+            size_bytes: 文件大小
+            read_seconds: 读取耗时
+            definitions_only: 是否只提取了函数定义
+            cached: 是否来自解析结果库
+        """
+        if parsed.encoding != 'ascii':
+            self.file_encodings[script_name] = sys.intern(parsed.encoding)
+        
+        functions: Dict[str, FunctionDefinition] = {}
+        for name, line_number, line_offset, scope, parent_function, end_line, signature in parsed.definitions:
+            info = FunctionDefinition(script_name, line_number, 'explicit_function', scope, signature)
+            info.line_offset = line_offset
+            info.parent_function = parent_function
+            info.end_line = end_line
+            functions[sys.intern(name)] = info
+        
+        # classdef文件中与文件同名的方法是构造函数，是文件对外可见的入口（Widget(3) 解析到 Widget.m），按主函数登记
+        constructor = functions.get(os.path.splitext(os.path.basename(script_name))[0])
+        if constructor is not None and constructor.scope == 'method':
+            constructor.scope = 'primary'
+
+        qualified_name, kind, _ = self._get_script_location(script_name)
+        if kind in ('package', 'class'):
+            # +包/@类目录中的主函数只能以限定名调用，按文件名登记为限定名，避免与其他目录的同名函数冲突
+            primary = next((name for name, info in functions.items() if info.scope == 'primary'), None)
+            if primary is not None and primary != qualified_name:
+                functions[qualified_name] = functions.pop(primary)
+        if parsed.imports:
+            self.script_imports[script_name] = list(parsed.imports)
         
         # 如果没有找到函数定义，但文件内容不为空，则将文件名作为函数名
         # 这是为了处理脚本文件（没有function定义的文件）
-        if not functions and content.strip():
-            # 从文件名中提取函数名（去掉.m扩展名）
-            func_name = file_path.stem
-            functions[func_name] = {
-                'script_file': script_name,
-                'line_number': 1,
-                'line_content': f"# Script file: {func_name}",
-                'definition_type': 'script_file',
-                'function_signature': func_name,
-                'is_script_file': True
-            }
+        if not functions and parsed.has_content:
+            # 从文件名中提取函数名（去掉.m扩展名，+包/@类目录下为限定名）
+            func_name = qualified_name
+            functions[func_name] = FunctionDefinition(script_name, 1, 'script_file', 'script')
             logger.debug(f"脚本文件 {script_name} 没有函数定义，使用文件名作为函数名: {func_name}")
         
-        # 存储结果
+        # 存储结果（调用点表只读，内容相同的脚本共享同一个对象）
         self.script_functions[script_name] = set(functions.keys())
+        calls = set(parsed.call_sites.names)
         self.script_calls[script_name] = calls
+        self.script_call_sites[script_name] = parsed.call_sites
+        for call in calls:
+            # 保持按脚本名（解析顺序）排序，增量更新后与完整扫描的结果一致
+            insort(self.call_references.setdefault(call, []), script_name)
         
         # 更新函数到脚本的映射（支持多关联）
         for func_name, func_info in functions.items():
@@ -347,21 +1296,80 @@ class ImprovedMATLABScriptParser:
                 self.function_definitions[func_name] = {}
             self.function_definitions[func_name][script_name] = func_info
         
-        logger.debug(f"解析 {script_name}: 定义函数 {len(functions)} 个, 调用函数 {len(calls)} 个")
+        # 完整解析的耗时单独记录：仅定义模式的解析很快，若与之比较，下次扫描会切回完整解析、再下次又切回仅定义模式；
+        # 仅定义模式沿用上次完整解析的耗时（文件大小变化时作废，下次重新完整解析测量）
+        if definitions_only:
+            previous = self._previous_parse_stats.get(script_name)
+            full_parse_seconds = previous.get('full_parse_seconds') \
+                if previous and previous['size_bytes'] == size_bytes else None
+        else:
+            full_parse_seconds = parsed.parse_seconds
+        self.file_parse_stats[script_name] = {
+            'script': script_name,
+            'size_bytes': size_bytes,
+            'line_count': parsed.line_count,
+            'read_seconds': read_seconds,
+            'parse_seconds': parsed.parse_seconds,
+            'full_parse_seconds': full_parse_seconds,
+            'definition_count': len(functions),
+            'call_count': len(calls),
+            'mode': 'definitions_only' if definitions_only else 'full',
+            'cached': cached
+        }
+        
+        logger.debug(f"解析 {script_name}: 定义函数 {len(functions)} 个, 调用函数 {len(calls)} 个"
+                     + ("（解析结果库命中）" if cached else ""))
+    
+    def _use_definitions_only(self, script_name: str, size_bytes: int) -> bool:
+        """根据大小阈值或上次完整解析耗时阈值判断是否只提取函数定义"""
+        if self.definitions_only_size is not None and size_bytes > self.definitions_only_size:
+            logger.info(f"文件 {script_name} 大小 {size_bytes} 字节超过阈值，仅提取函数定义")
+            return True
+        if self.definitions_only_time is not None:
+            previous = self._previous_parse_stats.get(script_name)
+            full_parse_seconds = previous.get('full_parse_seconds') if previous else None
+            if full_parse_seconds is not None and full_parse_seconds > self.definitions_only_time:
+                logger.info(f"文件 {script_name} 上次完整解析耗时 {full_parse_seconds:.3f}s 超过阈值，仅提取函数定义")
+                return True
+        return False
+    
+    def get_slowest_files(self, top_n: int = 10) -> List[Dict]:
+        """
+        获取解析开销最大的文件
+        
+        Args:
+            top_n: 返回的文件数量
+            
+        Returns:
+            按 读取+解析 总耗时降序排列的文件统计列表
+        """
+        ranked = sorted(self.file_parse_stats.values(),
+                        key=lambda st: st['read_seconds'] + st['parse_seconds'], reverse=True)
+        return [dict(st, total_seconds=st['read_seconds'] + st['parse_seconds']) for st in ranked[:top_n]]
+    
+    def print_slowest_files(self, top_n: int = 10) -> None:
+        """打印解析开销最大的文件"""
+        slowest = self.get_slowest_files(top_n)
+        print(f"\n=== 解析最慢的 {len(slowest)} 个文件 ===")
+        print(f"  {'总耗时(s)':>10}{'读取(s)':>10}{'解析(s)':>10}{'大小(KB)':>12}{'行数':>10}{'定义':>6}{'调用':>8}  模式  文件")
+        for st in slowest:
+            print(f"  {st['total_seconds']:>10.4f}{st['read_seconds']:>10.4f}{st['parse_seconds']:>10.4f}"
+                  f"{st['size_bytes'] / 1024:>12.1f}{st['line_count']:>10}{st['definition_count']:>6}"
+                  f"{st['call_count']:>8}  {st['mode']}  {st['script']}")
     
-    def _extract_functions_with_details(self, content: str, script_name: str) -> Dict[str, Dict]:
+    def _extract_functions_with_details(self, content: SourceLines, script_name: str) -> Dict[str, FunctionDefinition]:
         """
         从脚本内容中提取函数定义，包含详细信息
         
         Args:
-            content: 脚本内容
+            content: 脚本内容（字符串，或可重复迭代的行序列）
             script_name: 脚本文件名
             
         Returns:
-            函数名到定义详情的映射
+            函数名到定义记录的映射
         """
         functions = {}
-        lines = content.split('\n')
+        lines = _as_lines(content)
         
         try:
             # 统一用一个稳健的正则：
@@ -378,19 +1386,101 @@ class ImprovedMATLABScriptParser:
                 if m:
                     func_name = m.group('name') or m.group('name2')
                     if func_name and func_name.lower() not in {'function', 'end'}:
-                        functions[func_name] = {
-                            'script_file': script_name,
-                            'line_number': line_num,
-                            'line_content': line.strip(),
-                            'definition_type': 'explicit_function',
-                            'function_signature': line.strip(),
-                            'is_script_file': False
-                        }
+                        functions[sys.intern(func_name)] = FunctionDefinition(
+                            script_name, line_num, 'explicit_function',
+                            signature=line.strip() if self.keep_signatures else None)
+            
+            if functions:
+                self._classify_function_scopes(lines, functions)
         except Exception as e:
             logger.error(f"提取函数定义时出错: {e}")
         
         return functions
     
+    def _classify_function_scopes(self, lines: Iterable[str], functions: Dict[str, FunctionDefinition]) -> None:
+        """
+        按MATLAB作用域标记函数定义：primary（文件主函数）、local（本地函数）、
+        nested（嵌套函数）、method（classdef中的方法）
+        
+        Args:
+            lines: 文件内容按行拆分（列表，或可重复迭代的行序列）
+            functions: 函数名 -> 定义记录，原地补充 scope / parent_function / end_line
+        """
+        if isinstance(lines, list):
+            line_tokens = [_block_tokens(line) for line in lines]
+            iter_tokens = lambda: line_tokens
+        else:
+            # 逐行扫描的超大文件不保留整份关键字表，第二遍重新提取
+            iter_tokens = lambda: map(_block_tokens, lines)
+        
+        # 判断函数是否以end结束：块关键字与end完全配对时才按嵌套结构处理
+        depth = 0
+        balanced = True
+        for tokens in iter_tokens():
+            for token in tokens:
+                if token == 'end':
+                    depth -= 1
+                    if depth < 0:
+                        balanced = False
+                elif token in _BLOCK_KEYWORDS or token in _CLASS_BLOCK_KEYWORDS or token == 'arguments':
+                    depth += 1
+        functions_use_end = balanced and depth == 0
+        
+        by_line = {info.line_number: name for name, info in functions.items()}
+        # 第一个函数之前有可执行代码时是脚本文件，其中的函数都是本地函数
+        first_code_line, first_code = next(((i, line) for i, line in enumerate(lines, 1)
+                                            if line.strip() and not line.strip().startswith('%')), (None, None))
+        is_script_with_functions = first_code_line is not None and first_code_line not in by_line \
+            and not (_block_tokens(first_code)[:1] in (['function'], ['classdef']))
+        
+        stack: List[Tuple[str, Optional[str]]] = []  # (块类型, 函数名)
+        # classdef文件的对外入口是类（构造函数），classdef块之后的函数都是本地函数
+        is_classdef_file = first_code is not None and _block_tokens(first_code)[:1] == ['classdef']
+        has_primary = is_script_with_functions or is_classdef_file
+        current_function: Optional[str] = None  # 不以end结束时的当前函数
+        line_num = 0
+        for line_num, tokens in enumerate(iter_tokens(), 1):
+            for token in tokens:
+                if token == 'end':
+                    if stack:
+                        kind, name = stack.pop()
+                        if kind == 'function' and name in functions:
+                            functions[name].end_line = line_num
+                    continue
+                in_class = any(kind == 'classdef' for kind, _ in stack)
+                if token in _CLASS_BLOCK_KEYWORDS and not in_class:
+                    continue
+                if token == 'arguments' and not (stack and stack[-1][0] == 'function'):
+                    continue
+                if token != 'function':
+                    stack.append((token, None))
+                    continue
+                
+                name = by_line.get(line_num)
+                if functions_use_end:
+                    parent = next((n for kind, n in reversed(stack) if kind == 'function'), None)
+                    stack.append(('function', name))
+                else:
+                    if current_function in functions and name is not None:
+                        functions[current_function].end_line = line_num - 1
+                    parent = None
+                    current_function = name
+                if name is None or name not in functions:
+                    continue
+                info = functions[name]
+                if in_class:
+                    info.scope = 'method'
+                elif parent is not None:
+                    info.scope = 'nested'
+                elif not has_primary:
+                    info.scope = 'primary'
+                    has_primary = True
+                else:
+                    info.scope = 'local'
+                info.parent_function = parent
+        if current_function in functions and functions[current_function].end_line is None:
+            functions[current_function].end_line = line_num
+    
     def _extract_functions(self, content: str) -> Set[str]:
         """
         从脚本内容中提取函数定义（兼容性方法）
@@ -404,34 +1494,58 @@ class ImprovedMATLABScriptParser:
         functions = self._extract_functions_with_details(content, "unknown")
         return set(functions.keys())
     
-    def _extract_function_calls(self, content: str) -> Set[str]:
+    def _extract_imports(self, content: SourceLines) -> List[str]:
+        """
+        提取import语句导入的包或函数（如 import pkg.*、import pkg.sub.foo）
+        
+        Args:
+            content: 脚本内容（字符串，或可重复迭代的行序列）
+            
+        Returns:
+            按出现顺序的导入项列表
+        """
+        imports = []
+        for line in _as_lines(content):
+            m = _IMPORT_PATTERN.match(line) if 'import' in line else None
+            if m is None:
+                continue
+            for item in m.group(1).split():
+                if '.' in item and item not in imports:
+                    imports.append(item)
+        return imports
+    
+    def _extract_function_calls(self, content: SourceLines) -> Set[str]:
         """
         从脚本内容中提取函数调用
         
         Args:
-            content: 脚本内容
+            content: 脚本内容（字符串，或可重复迭代的行序列）
             
         Returns:
             调用的函数名集合
         """
-        calls = set()
+        return set(self._extract_function_call_sites(content))
+    
+    def _extract_function_call_sites(self, content: SourceLines) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        从脚本内容中提取函数调用及其调用点
         
-        try:
-            # 先移除注释，避免将注释中的文本当作函数调用
-            lines = content.split('\n')
-            code_lines = []
-            for line in lines:
-                # 移除行注释
-                if '%' in line:
-                    line = line[:line.index('%')]
-                code_lines.append(line)
+        Args:
+            content: 脚本内容（字符串，或可重复迭代的行序列）
             
-            clean_content = '\n'.join(code_lines)
+        Returns:
+            调用的函数名 -> 调用点列表 [(行号, 列号)]（均从1开始）
+        """
+        sites: Dict[str, List[Tuple[int, int]]] = {}
+        
+        try:
+            # 逐行移除注释，避免将注释中的文本当作函数调用（两遍扫描，不保留去注释后的整份内容）
+            lines = _as_lines(content)
             
             # 收集被赋值的变量名，便于区分索引访问与函数调用
             assigned_vars: Set[str] = set()
             assign_pattern = re.compile(r'^\s*([A-Za-z]\w*)\s*=')
-            for line in code_lines:
+            for line in _code_lines(lines):
                 m = assign_pattern.match(line)
                 if m:
                     assigned_vars.add(m.group(1))
@@ -463,49 +1577,60 @@ class ImprovedMATLABScriptParser:
             # 规则4：行首的无括号调用，不以分号结尾（脚本文件常见）
             pattern_bare_call_no_semicolon = re.compile(r'^\s*([A-Za-z]\w*)\s*$')
             
-            for line in code_lines:
+            for line_num, line in enumerate(_code_lines(lines), 1):
                 stripped = line.strip()
                 if not stripped:
                     continue
                 # 忽略以点号开始的成员/字段访问行
                 if stripped.startswith('.'):
                     continue
-                
+                # 函数声明行（function y = name(...)）不是调用点
+                if _FUNCTION_DECLARATION_PATTERN.match(line):
+                    continue
+
+                # 包/类限定调用（前缀是被赋值变量时为字段或方法访问）
+                if '.' in line:
+                    for m in _QUALIFIED_CALL_PATTERN.finditer(line):
+                        name = m.group(1)
+                        if name.split('.', 1)[0] not in assigned_vars:
+                            sites.setdefault(name, []).append((line_num, m.start(1) + 1))
+
                 # 行首调用
                 m = pattern_line_start.match(line)
                 if m:
                     name = m.group(1)
                     if name not in matlab_keywords and name not in assigned_vars and len(name) > 1:
-                        calls.add(name)
+                        sites.setdefault(name, []).append((line_num, m.start(1) + 1))
                     continue
                 
                 # 赋值右侧调用
                 for m in pattern_rhs_call.finditer(line):
                     name = m.group(1)
                     if name not in matlab_keywords and name not in assigned_vars and len(name) > 1:
-                        calls.add(name)
+                        sites.setdefault(name, []).append((line_num, m.start(1) + 1))
                 
                 # 无括号调用（整行仅为名称;）
                 m = pattern_bare_call.match(line)
                 if m:
                     name = m.group(1)
                     if name not in matlab_keywords and len(name) > 1:
-                        calls.add(name)
+                        sites.setdefault(name, []).append((line_num, m.start(1) + 1))
                 
                 # 无括号调用（整行仅为名称，不以分号结尾）
                 m = pattern_bare_call_no_semicolon.match(line)
                 if m:
                     name = m.group(1)
                     if name not in matlab_keywords and len(name) > 1:
-                        calls.add(name)
+                        sites.setdefault(name, []).append((line_num, m.start(1) + 1))
             
             # 过滤掉MATLAB关键字和内置函数
-            calls = {call for call in calls if call not in matlab_keywords}
+            sites = {sys.intern(call): call_sites for call, call_sites in sites.items()
+                     if call not in matlab_keywords}
             
         except Exception as e:
             logger.error(f"提取函数调用时出错: {e}")
         
-        return calls
+        return sites
     
     def get_function_definition(self, func_name: str, calling_script: str = None) -> Dict:
         """获取函数定义信息（支持多关联）"""
@@ -517,7 +1642,7 @@ class ImprovedMATLABScriptParser:
             }
         
         scripts = self.function_scripts[func_name]
-        primary_script = scripts[0] if scripts else None
+        primary_script = self.get_primary_script(func_name)
         
         # 基于调用上下文提供建议
         recommended_script = None
@@ -531,16 +1656,26 @@ class ImprovedMATLABScriptParser:
             'primary_script': primary_script,
             'recommended_script': recommended_script,
             'all_scripts': scripts,
+            'visible_scripts': self.get_visible_scripts(func_name),
             'definitions': {}
         }
         
         # 添加每个定义的详细信息
         for script in scripts:
             if func_name in self.function_definitions and script in self.function_definitions[func_name]:
-                result['definitions'][script] = self.function_definitions[func_name][script]
+                result['definitions'][script] = self._definition_to_dict(
+                    func_name, self.function_definitions[func_name][script])
         
         return result
     
+    def _definition_to_dict(self, func_name: str, definition: FunctionDefinition) -> Dict:
+        """将定义记录转换为详情字典，未保留签名时按字节偏移从源文件读取定义行"""
+        signature = definition.signature
+        if signature is None and not definition.is_script_file:
+            signature = self._source_lines.read_line(definition.script_file, definition.line_offset,
+                                                     self.file_encodings.get(definition.script_file, 'ascii'))
+        return definition.to_dict(func_name, signature)
+    
     def get_function_definition_for_script(self, func_name: str, calling_script: str) -> Dict:
         """
         获取函数定义信息，优先考虑调用脚本内部的定义
@@ -566,10 +1701,11 @@ class ImprovedMATLABScriptParser:
             # 检查是否是显式函数定义
             if (func_name in self.function_definitions and 
                 calling_script in self.function_definitions[func_name] and
-                self.function_definitions[func_name][calling_script]['definition_type'] == 'explicit_function'):
+                self.function_definitions[func_name][calling_script].definition_type == 'explicit_function'):
                 
                 # 返回调用脚本内部的函数定义
-                script_details = self.function_definitions[func_name][calling_script]
+                script_details = self._definition_to_dict(
+                    func_name, self.function_definitions[func_name][calling_script])
                 return {
                     'function_name': func_name,
                     'found': True,
@@ -587,25 +1723,102 @@ class ImprovedMATLABScriptParser:
     
     def _get_context_based_recommendation(self, func_name: str, calling_script: str, available_scripts: List[str]) -> Optional[str]:
         """基于调用上下文提供建议"""
-        calling_path = Path(calling_script)
-        
         # 基于MATLAB路径位置选择，不是基于路径相似性
         best_match = None
         best_path_position = 999999
         
+        if self.scope_aware:
+            # 其他文件的本地/嵌套定义对调用脚本不可见，不能作为建议
+            available_scripts = [script for script in available_scripts
+                                 if self._get_definition_scope(func_name, script) in VISIBLE_SCOPES]
         for script in available_scripts:
-            script_path = Path(script)
-            
-            # 基于MATLAB路径位置选择
-            for i, path in enumerate(self.matlab_paths):
-                if str(self.project_path / script_path.parent) == path:
-                    if i < best_path_position:
-                        best_path_position = i
-                        best_match = script
-                    break
+            path_position = self._get_script_precedence(script)[1]
+            if path_position < best_path_position:
+                best_path_position = path_position
+                best_match = script
         
         return best_match
     
+    def find_references(self, func_name: str, defined_in: Optional[str] = None) -> List[Dict]:
+        """
+        查找函数的全部调用点（直接查询解析阶段建立的索引，不读取源文件）
+        
+        Args:
+            func_name: 被调用的函数名（可为 pkg.foo 限定名），没有定义的函数也可查询
+            defined_in: 只返回解析到该脚本中定义的调用（None表示不过滤）
+            
+        Returns:
+            调用点列表，每项包含 caller_script / enclosing_function / line / column / callee /
+            resolved_script（未解析时为None）/ rule，按脚本解析顺序与位置排序
+        """
+        references = []
+        for script in self.call_references.get(func_name, ()):
+            sites = self.script_call_sites.get(script)
+            if sites is None:
+                continue
+            resolved_script, rule = self.resolve_function_call_with_rule(func_name, script)
+            if defined_in is not None and resolved_script != defined_in:
+                continue
+            for line, column in sites.sites(func_name):
+                references.append({
+                    'caller_script': script,
+                    'enclosing_function': self.get_enclosing_function(script, line),
+                    'line': line,
+                    'column': column,
+                    'callee': func_name,
+                    'resolved_script': resolved_script,
+                    'rule': rule
+                })
+        return references
+    
+    def get_enclosing_function(self, script: str, line: int) -> Optional[str]:
+        """
+        获取脚本中包含指定行的最内层函数
+        
+        Args:
+            script: 脚本文件
+            line: 行号
+            
+        Returns:
+            函数名；位于脚本文件顶层代码时返回None
+        """
+        spans = self._function_spans.get(script)
+        if spans is None:
+            spans = []
+            for name in self.script_functions.get(script, ()):
+                definition = self.function_definitions.get(name, {}).get(script)
+                if definition is None or definition.is_script_file:
+                    continue
+                end_line = definition.end_line if definition.end_line is not None else sys.maxsize
+                spans.append((definition.line_number, end_line, name))
+            spans.sort()
+            self._function_spans[script] = spans
+        enclosing = None
+        for start, end, name in spans:
+            if start > line:
+                break
+            if line <= end:
+                enclosing = name
+        return enclosing
+
+    def read_script_bytes(self, script: str) -> bytes:
+        """
+        读取脚本的原始内容（git版本从对象库读取，否则读取工作区文件）
+
+        Args:
+            script: 脚本文件
+
+        Returns:
+            文件内容；无法读取时为b""
+        """
+        try:
+            if self.git_revision is not None:
+                return self._blob_reader.read(self.blob_ids[script])
+            return (self.project_path / script).read_bytes()
+        except Exception as e:
+            logger.error(f"读取文件 {script} 失败: {e}")
+            return b""
+
     def get_script_functions(self) -> Dict[str, Set[str]]:
         """获取脚本到函数的映射"""
         return self.script_functions
@@ -625,7 +1838,121 @@ class ImprovedMATLABScriptParser:
     def get_matlab_paths(self) -> List[str]:
         """获取MATLAB搜索路径"""
         return self.matlab_paths
-    
+
+    def snapshot_options(self) -> Tuple:
+        """影响解析表内容的选项（与分析快照一起保存，选项不同的快照不能复用）"""
+        return (self.scope_aware, self.include_patterns, self.exclude_patterns, self.use_gitignore,
+                self.definitions_only_size, self.definitions_only_time, self.keep_signatures,
+                tuple(self.source_encodings), self.mapped_read_size)
+
+    def export_state(self) -> Dict:
+        """
+        导出解析结果（用于快照持久化）
+
+        Returns:
+            包含全部解析表的字典，function_scripts中的顺序即主定义顺序
+        """
+        return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    def restore_state(self, state: Dict) -> None:
+        """
+        从快照恢复解析结果，不访问工程目录
+
+        Args:
+            state: export_state() 导出的字典
+        """
+        for field in self.STATE_FIELDS:
+            setattr(self, field, state[field])
+        self.script_locations = {}
+        self._resolution_cache = {}
+        self._function_spans = {}
+        self._reset_source_lines()
+        self._rebuild_path_index()
+
+    def adopt_encoding_hints(self, encodings: Dict[str, str], file_stats: Dict[str, Tuple[int, int]],
+                             keep_pending: bool = False) -> None:
+        """
+        采用已知的文件编码作为下次扫描的首选编码（仅对stat未变化的文件生效）
+
+        Args:
+            encodings: 脚本 -> 编码（未记录的脚本为纯ASCII）
+            file_stats: 探测编码时各脚本的 (大小, mtime_ns)
+            keep_pending: 与尚未使用的提示合并，同一脚本以尚未使用的提示为准（否则直接替换）
+        """
+        if keep_pending and self._previous_file_stats:
+            pending_stats = self._previous_file_stats
+            encodings = {script: encoding for script, encoding in encodings.items() if script not in pending_stats}
+            encodings.update(self._previous_encodings)
+            file_stats = dict(file_stats)
+            file_stats.update(pending_stats)
+        self._previous_encodings = encodings
+        self._previous_file_stats = file_stats
+
+    def compute_fingerprint(self) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """
+        计算工程指纹：每个脚本及遍历到的每个目录的 (大小, 修改时间)
+        直接复用文件发现阶段的stat结果；目录修改时间用于发现新增/删除的文件，无需重新遍历整个工程
+
+        Returns:
+            {'files': {脚本: (大小, mtime_ns)}, 'dirs': {目录: (0, mtime_ns)}}；
+            git版本为 {'files': {}, 'dirs': {}, 'tree': 树对象id}
+        """
+        if self.git_revision is not None:
+            return {'files': {}, 'dirs': {}, 'tree': self.source_tree}
+        files: Dict[str, Tuple[int, int]] = {}
+        for script_name in self.script_files:
+            if script_name in self.file_stats:
+                files[script_name] = self.file_stats[script_name]
+            else:
+                st = os.stat(self.project_path / script_name)
+                files[script_name] = (st.st_size, st.st_mtime_ns)
+        dir_mtimes = self.dir_mtimes
+        if not dir_mtimes:
+            # 没有遍历记录时（如未经文件发现阶段恢复的状态）补做一次遍历：
+            # 必须包含遍历到的每个目录，不含脚本的目录下新增含.m文件的子目录也只改变该目录的修改时间
+            dir_mtimes = {}
+            for _ in discover_matlab_files(self.project_path, self.include_patterns, self.exclude_patterns,
+                                           self.use_gitignore, dir_mtimes):
+                pass
+        dirs: Dict[str, Tuple[int, int]] = {d: (0, mtime_ns) for d, mtime_ns in dir_mtimes.items()}
+        return {'files': files, 'dirs': dirs}
+
+    def fingerprint_matches(self, fingerprint: Dict[str, Dict[str, Tuple[int, int]]]) -> bool:
+        """
+        检查工程当前状态是否与指纹一致（只做stat，不读取文件内容）
+
+        Args:
+            fingerprint: compute_fingerprint() 的结果
+
+        Returns:
+            一致返回True
+        """
+        if self.git_revision is not None or 'tree' in fingerprint:
+            # git版本：版本当前解析到的树对象相同即内容相同（工作区快照与git版本快照互不匹配）
+            try:
+                tree = resolve_tree(self.project_path, self.git_revision) if self.git_revision is not None else None
+            except GitSourceError as e:
+                logger.info(f"指纹不一致: {e}")
+                return False
+            if tree != fingerprint.get('tree'):
+                logger.info(f"指纹不一致: 版本 {self.git_revision} 的内容有变化")
+                return False
+            return True
+        try:
+            for script_name, (size, mtime_ns) in fingerprint['files'].items():
+                st = os.stat(self.project_path / script_name)
+                if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                    logger.info(f"指纹不一致: {script_name} 已修改")
+                    return False
+            for script_dir, (_, mtime_ns) in fingerprint['dirs'].items():
+                if os.stat(self.project_path / script_dir).st_mtime_ns != mtime_ns:
+                    logger.info(f"指纹不一致: 目录 {script_dir} 内容有变化")
+                    return False
+        except OSError as e:
+            logger.info(f"指纹不一致: {e}")
+            return False
+        return True
+
     def print_summary(self) -> None:
         """打印解析结果摘要"""
         print("\n=== 改进的MATLAB脚本解析结果摘要（按MATLAB实际搜索路径规则）===")
@@ -647,8 +1974,11 @@ class ImprovedMATLABScriptParser:
         
         print("\n函数定义位置（支持多关联）:")
         for func, scripts in sorted(self.function_scripts.items()):
-            if len(scripts) > 1:
-                print(f"  {func} -> {scripts[0]} (主定义) + {len(scripts)-1} 个额外定义")
+            primary_script = self.get_primary_script(func)
+            if primary_script is None:
+                print(f"  {func} -> {', '.join(scripts)} (无对外可见定义)")
+            elif len(scripts) > 1:
+                print(f"  {func} -> {primary_script} (主定义) + {len(scripts)-1} 个额外定义")
             else:
                 print(f"  {func} -> {scripts[0]}")
         
@@ -669,9 +1999,10 @@ class ImprovedMATLABScriptParser:
         if multi_def_functions:
             print(f"\n多定义函数 ({len(multi_def_functions)} 个):")
             for func, scripts in sorted(multi_def_functions.items()):
-                print(f"  {func}:")
+                primary_script = self.get_primary_script(func)
+                print(f"  {func}:" + ("" if primary_script else " (无对外可见定义)"))
                 for i, script in enumerate(scripts):
-                    marker = " (主定义)" if i == 0 else ""
+                    marker = " (主定义)" if script == primary_script else ""
                     print(f"    {i+1}. {script}{marker}")
 
 
@@ -679,16 +2010,59 @@ def main():
     """主函数，用于测试"""
     import sys
     
-    if len(sys.argv) != 2:
-        print("用法: python script_parser_improved.py <MATLAB工程路径>")
+    argv, profile_output = pop_profile_option(sys.argv, "script_parser.pstats")
+    if profile_output:
+        sys.argv = argv
+        return run_profiled(main, profile_output)
+    
+    args = sys.argv[1:]
+    options = {'--slowest': None, '--defs-only-size': None, '--defs-only-time': None, '--refs': None,
+               '--mmap-size': None, '--git-rev': None, '--parse-store': None}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+    
+    if len(positional) != 1:
+        print("用法: python script_parser_improved.py <MATLAB工程路径> [--slowest N] "
+              "[--defs-only-size 字节数] [--defs-only-time 秒] [--mmap-size 字节数] [--git-rev 版本] "
+              "[--parse-store 文件] [--refs 函数名] [--profile[=输出文件]]")
         sys.exit(1)
     
-    project_path = sys.argv[1]
+    project_path = positional[0]
     
     try:
-        parser = ImprovedMATLABScriptParser(project_path)
+        parser = ImprovedMATLABScriptParser(
+            project_path,
+            definitions_only_size=int(options['--defs-only-size']) if options['--defs-only-size'] else None,
+            definitions_only_time=float(options['--defs-only-time']) if options['--defs-only-time'] else None,
+            mapped_read_size=int(options['--mmap-size']) if options['--mmap-size'] else DEFAULT_MAPPED_READ_SIZE,
+            git_revision=options['--git-rev'],
+            parse_store=ParseStore(options['--parse-store']) if options['--parse-store'] else None
+        )
         script_functions = parser.scan_project()
-        parser.print_summary()
+        if parser.parse_store is not None:
+            parser.parse_store.save()
+            print(f"解析结果库: {parser.parse_store.stats()}")
+        with profile_phase('report: print summary'):
+            parser.print_summary()
+        
+        if options['--slowest']:
+            parser.print_slowest_files(int(options['--slowest']))
+        
+        if options['--refs']:
+            references = parser.find_references(options['--refs'])
+            print(f"\n=== {options['--refs']} 的调用点 ({len(references)} 个) ===")
+            for ref in references:
+                location = f"{ref['caller_script']}:{ref['line']}:{ref['column']}"
+                enclosing = ref['enclosing_function'] or '(脚本顶层)'
+                target = ref['resolved_script'] or '(未解析)'
+                print(f"  {location}  在 {enclosing} 中  -> {target} [{ref['rule'] or '-'}]")
         
         # 测试多关联功能
         print("\n=== 测试多关联功能 ===")
@@ -698,7 +2072,7 @@ def main():
             print(f"\n测试函数: {test_func}")
             func_info = parser.get_function_definition(test_func)
             print(f"  总定义数: {func_info['total_definitions']}")
-            print(f"  主定义: {func_info['primary_script']}")
+            print(f"  主定义: {func_info['primary_script'] or '无对外可见定义'}")
             print(f"  所有定义: {func_info['all_scripts']}")
             if func_info['definitions']:
                 print("  定义详情:")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+源文件按需读取
+解析阶段只记录定义行的行号与字节偏移，需要展示定义行文本时再通过
+最近使用文件的mmap小型LRU缓存读取，避免在索引中常驻大量行文本；
+超大文件通过内存映射逐行扫描，内存中只保留当前行；
+源文件编码（UTF-8 / GBK / latin-1 混用）按文件探测，纯ASCII文件直接走快速路径
+"""
+
+import codecs
+import mmap
+import re
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 与文本模式的通用换行一致：\r\n、\r、\n 都算一个换行
+_NEWLINE_PATTERN = re.compile(rb'\r\n|\r|\n')
+
+# 超过该字节数的文件通过内存映射逐行读取
+DEFAULT_MAPPED_READ_SIZE = 8 * 1024 * 1024
+
+# 依次尝试的源文件编码（严格解码成功即采用），都失败时按latin-1逐字节解码
+DEFAULT_SOURCE_ENCODINGS: Tuple[str, ...] = ('utf-8', 'gbk')
+FALLBACK_ENCODING = 'latin-1'
+_NON_ASCII_PATTERN = re.compile(rb'[\x80-\xff]')
+_SNIFF_CHUNK_SIZE = 1024 * 1024
+
+
+def _candidate_encodings(encodings: Sequence[str], hint: Optional[str]) -> Iterator[str]:
+    """上次探测结果优先，其后按配置顺序"""
+    if hint and hint not in ('ascii', FALLBACK_ENCODING):
+        yield hint
+    for encoding in encodings:
+        if encoding != hint:
+            yield encoding
+
+
+def decode_source(data: bytes, encodings: Sequence[str] = DEFAULT_SOURCE_ENCODINGS,
+                  hint: Optional[str] = None) -> Tuple[str, str]:
+    """
+    探测编码并解码源文件内容
+
+    Args:
+        data: 文件原始字节
+        encodings: 依次尝试的编码
+        hint: 上次探测到的编码（文件未变化时直接命中，省去失败的试解码）
+
+    Returns:
+        (文本, 编码名)；纯ASCII文件的编码为'ascii'
+    """
+    if data.isascii():
+        return data.decode('ascii'), 'ascii'
+    for encoding in _candidate_encodings(encodings, hint):
+        try:
+            return data.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return data.decode(FALLBACK_ENCODING), FALLBACK_ENCODING
+
+
+def sniff_encoding(mapped: mmap.mmap, encodings: Sequence[str] = DEFAULT_SOURCE_ENCODINGS,
+                   hint: Optional[str] = None) -> str:
+    """
+    探测内存映射文件的编码（分块增量试解码，不保留解码结果）
+
+    Args:
+        mapped: 内存映射的文件
+        encodings: 依次尝试的编码
+        hint: 上次探测到的编码
+
+    Returns:
+        编码名；纯ASCII文件为'ascii'
+    """
+    if _NON_ASCII_PATTERN.search(mapped) is None:
+        return 'ascii'
+    size = len(mapped)
+    for encoding in _candidate_encodings(encodings, hint):
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            for start in range(0, size, _SNIFF_CHUNK_SIZE):
+                decoder.decode(mapped[start:start + _SNIFF_CHUNK_SIZE])
+            decoder.decode(b'', final=True)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return FALLBACK_ENCODING
+
+
+def line_start_offsets(data: bytes, line_numbers: Iterable[int]) -> Dict[int, int]:
+    """
+    计算指定行在原始字节中的起始偏移
+
+    Args:
+        data: 文件原始字节（bytes或mmap）
+        line_numbers: 需要的行号（从1开始）
+
+    Returns:
+        行号 -> 字节偏移（超出文件行数的行号不出现在结果中）
+    """
+    wanted = sorted(set(line_numbers))
+    offsets: Dict[int, int] = {}
+    if not wanted:
+        return offsets
+    line, start = 1, 0
+    newlines = _NEWLINE_PATTERN.finditer(data)
+    for target in wanted:
+        while line < target:
+            m = next(newlines, None)
+            if m is None:
+                return offsets
+            line, start = line + 1, m.end()
+        offsets[target] = start
+    return offsets
+
+
+class MappedLines:
+    """
+    内存映射文件的逐行视图
+    每次迭代都从头扫描映射区，只解码当前行（与 content.split('\\n') 的结果逐行一致，换行按通用换行处理），
+    可重复迭代，内存占用与文件大小无关
+    """
+
+    def __init__(self, mapped: mmap.mmap, encoding: str = 'utf-8'):
+        self.mapped = mapped
+        self.encoding = encoding
+        self.line_count = 0  # 最近一次完整迭代得到的行数
+
+    def __iter__(self) -> Iterator[str]:
+        mapped = self.mapped
+        encoding = self.encoding
+        size = len(mapped)
+        pos = 0
+        count = 0
+        while True:
+            end = mapped.find(b'\n', pos)
+            last = end == -1
+            if last:
+                end = size
+            raw = mapped[pos:end]
+            if not last and raw.endswith(b'\r'):
+                raw = raw[:-1]
+            for part in (raw.split(b'\r') if b'\r' in raw else (raw,)):
+                count += 1
+                yield part.decode(encoding, errors='ignore')
+            if last:
+                break
+            pos = end + 1
+        self.line_count = count
+
+
+class SourceLineCache:
+    """按字节偏移读取源文件行的LRU缓存（保留最近使用文件的mmap）"""
+
+    def __init__(self, root: Path, capacity: int = 16):
+        """
+        Args:
+            root: 工程根目录（脚本名相对于该目录）
+            capacity: 同时保持打开的文件数上限
+        """
+        self.root = Path(root)
+        self.capacity = capacity
+        self._open: "OrderedDict[str, Tuple[object, Optional[mmap.mmap]]]" = OrderedDict()
+
+    def _get(self, script_name: str) -> Optional[mmap.mmap]:
+        entry = self._open.get(script_name)
+        if entry is not None:
+            self._open.move_to_end(script_name)
+            return entry[1]
+        try:
+            f = open(self.root / script_name, 'rb')
+        except OSError as e:
+            logger.warning(f"无法打开 {script_name}: {e}")
+            return None
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件无法映射
+            mapped = None
+        self._open[script_name] = (f, mapped)
+        if len(self._open) > self.capacity:
+            _, (old_file, old_map) = self._open.popitem(last=False)
+            if old_map is not None:
+                old_map.close()
+            old_file.close()
+        return mapped
+
+    def read_line(self, script_name: str, offset: int, encoding: str = 'utf-8') -> str:
+        """
+        读取从字节偏移开始的一行（去掉首尾空白）
+
+        Args:
+            script_name: 相对工程根目录的脚本名
+            offset: 行首字节偏移
+            encoding: 文件编码
+
+        Returns:
+            行内容；文件不可读或偏移越界时返回''
+        """
+        mapped = self._get(script_name)
+        if mapped is None or offset < 0 or offset >= len(mapped):
+            return ''
+        end = len(mapped)
+        for newline in (b'\n', b'\r'):
+            pos = mapped.find(newline, offset, end)
+            if pos != -1:
+                end = pos
+        return mapped[offset:end].decode(encoding, errors='ignore').strip()
+
+    def close(self) -> None:
+        """关闭所有缓存的文件"""
+        while self._open:
+            _, (f, mapped) = self._open.popitem()
+            if mapped is not None:
+                mapped.close()
+            f.close()
@@ -0,0 +1,16 @@
+% 计数器类 - classdef文件，构造函数与文件同名
+classdef Counter
+    properties
+        count
+    end
+    
+    methods
+        function obj = Counter(start)
+            obj.count = start;
+        end
+        
+        function obj = increment(obj)
+            obj.count = obj.count + 1;
+        end
+    end
+end
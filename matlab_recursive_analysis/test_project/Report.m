@@ -0,0 +1,20 @@
+% 报表类 - classdef文件，类定义之后带有本地函数（只对本文件可见）
+classdef Report
+    properties
+        lines
+    end
+    
+    methods
+        function obj = Report()
+            obj.lines = {};
+        end
+        
+        function obj = add(obj, text)
+            obj.lines{end + 1} = format_line(text);
+        end
+    end
+end
+
+function text = format_line(text)
+    text = ['- ' text];
+end
@@ -11,6 +11,10 @@ function complex_main()
     % 第三层调用
     utils = utility_manager();
     utils.log_info('Complex main completed');
+    
+    % 构造classdef类
+    report = Report();
+    report = report.add('Complex main completed');
 end
 
 function result = basic_calculation(a, b)
@@ -10,6 +10,8 @@ function show_details(value)
     else
         fprintf('Non-positive value\n');
     end
+    % format_line 只是 Report.m 中classdef之后的本地函数，对本文件不可见
+    label = format_line('details shown');
 end
 
 function plot_data(data)
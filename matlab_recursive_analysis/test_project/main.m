@@ -11,6 +11,10 @@ function main()
     % 调用工具函数
     utils = create_utils();
     utils.print_info('Main script completed');
+    
+    % 调用classdef类的构造函数
+    counter = Counter(0);
+    counter = counter.increment();
 end
 
 function result = calculate_sum(a, b)